@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Dict, Any
 
 from pydantic import BaseModel
 
@@ -15,9 +15,16 @@ class AggregateType(BaseModel):
     # Name of the field to aggregate on
     on: Optional[str] = None
 
+    # If set, window is computed over pre-aggregated panes of this width instead of raw events,
+    # memory per key is bounded by window / pane at the cost of up to one pane of imprecision
+    pane: Optional[Duration] = None
+
     def get_type(self):
         raise NotImplementedError()
 
+    def get_params(self) -> Dict[str, Any]:
+        return {}
+
 
 class Count(AggregateType):
 
@@ -47,3 +54,39 @@ class Min(AggregateType):
 
     def get_type(self):
         return AggregationType.MIN
+
+
+# Approximate aggregates are computed with mergeable sketches of bounded size per pane,
+# so they require pane to be set
+
+class DistinctCount(AggregateType):
+    # HyperLogLog, ~1.6% relative error with default precision
+    precision: int = 12
+
+    def get_type(self):
+        return AggregationType.APPROX_DISTINCT_COUNT
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'precision': self.precision}
+
+
+class Quantile(AggregateType):
+    # q-th quantile (e.g. 0.95), KLL sketch
+    q: float
+
+    def get_type(self):
+        return AggregationType.APPROX_QUANTILE
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'q': self.q}
+
+
+class TopK(AggregateType):
+    # k most frequent values with their counts, Space-Saving
+    k: int = 10
+
+    def get_type(self):
+        return AggregationType.TOP_K
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'k': self.k}
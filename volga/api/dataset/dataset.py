@@ -2,9 +2,7 @@ import inspect
 from dataclasses import dataclass
 from typing import Callable, Type, Optional, List, cast, TypeVar, Union, Dict
 
-from decimal import Decimal
-
-from volga.common.time_utils import datetime_str_to_ts
+from volga.common.time_utils import datetime_str_to_ts_ns
 from volga.api.consts import RESERVED_FIELD_NAMES, PIPELINE_ATTR, CONNECTORS_ATTR
 from volga.api.dataset.operators import OperatorNode
 from volga.api.dataset.schema import Schema
@@ -233,9 +231,9 @@ class Dataset(OperatorNode):
         if self._timestamp_field is None:
             raise RuntimeError('Can not init source with no timestamp field')
 
-        def _extract_timestamp(record: Record) -> Decimal:
+        def _extract_timestamp(record: Record) -> int:
             dt_str = record.value[self._timestamp_field]
-            return datetime_str_to_ts(dt_str)
+            return datetime_str_to_ts_ns(dt_str)
 
         stream_source.timestamp_assigner(EventTimeAssigner(_extract_timestamp))
 
@@ -2,7 +2,6 @@ from datetime import datetime
 import functools
 from typing import Callable, Dict, Type, List, Optional, Any
 
-from volga.common.time_utils import is_time_str
 from volga.api.dataset.aggregate import AggregateType
 from volga.api.dataset.schema import Schema
 from volga.streaming.api.message.message import Record
@@ -154,15 +153,13 @@ class Aggregate(OperatorNode):
         self.parents.append(parent)
 
     def init_stream(self, output_schema: Schema):
+        # timestamp field is known from input schema, so it is not searched for in every record
+        input_ts_field = self.parents[0].schema().timestamp
 
         def _output_window_func(aggs_per_window: AggregationsPerWindow, record: Record) -> Record:
             record_value = record.value
             res = {}
 
-            # TODO this is a hacky way to infer timestamp field from the record
-            #  Ideally we need to build resulting schema for each node at compilation time and use it to
-            #  derive field names/validate correctness
-
             # copy keys
             expected_key_fields = list(output_schema.keys.keys())
             for k in expected_key_fields:
@@ -171,16 +168,9 @@ class Aggregate(OperatorNode):
                 res[k] = record_value[k]
 
             # copy timestamp
-            ts_field = output_schema.timestamp
-            ts_value = None
-            for v in record_value.values():
-                if is_time_str(v):
-                    ts_value = v
-                    break
-
-            if ts_value is None:
-                raise RuntimeError(f'Unable to locate timestamp field: {record_value}')
-            res[ts_field] = ts_value
+            if input_ts_field not in record_value:
+                raise RuntimeError(f'Unable to locate timestamp field {input_ts_field}: {record_value}')
+            res[output_schema.timestamp] = record_value[input_ts_field]
 
             # copy aggregate values
             values_fields = list(output_schema.values.keys())
@@ -205,7 +195,9 @@ class Aggregate(OperatorNode):
             duration=agg.window,
             agg_type=agg.get_type(),
             agg_on_func=functools.partial(lambda e, key: e[key], key=agg.on),
-            name=agg.into
+            name=agg.into,
+            pane=agg.pane,
+            params=agg.get_params()
         ) for agg in self.aggregates]
 
 
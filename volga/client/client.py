@@ -3,7 +3,7 @@ from typing import Dict, Optional, Tuple, Any, List
 
 import pandas as pd
 
-from volga.common.time_utils import datetime_to_ts
+from volga.common.time_utils import datetime_to_ts_ns
 from volga.api.dataset.dataset import Dataset
 from volga.api.dataset.operators import Aggregate, OperatorNodeBase
 from volga.api.dataset.schema import Schema
@@ -92,8 +92,8 @@ class Client:
     ) -> pd.DataFrame:
         if self.cold is None:
             raise ValueError('ColdStorage is not set')
-        start_ts = None if start is None else datetime_to_ts(start)
-        end_ts = None if end is None else datetime_to_ts(end)
+        start_ts = None if start is None else datetime_to_ts_ns(start)
+        end_ts = None if end is None else datetime_to_ts_ns(end)
         data = self.cold.get_data(dataset_name=dataset_name, keys=keys, start_ts=start_ts, end_ts=end_ts)
         return pd.DataFrame(data)
 
@@ -0,0 +1,78 @@
+import datetime
+import random
+import time
+import unittest
+
+from decimal import Decimal
+
+import dateutil.parser
+import numpy as np
+
+from volga.common.time_utils import datetime_str_to_ts_ns, datetime_to_ts_ns, is_time_str, duration_to_ns, \
+    NANOS_PER_SECOND, to_ts_ns
+
+
+class TestTimeUtils(unittest.TestCase):
+
+    def test_datetime_str_to_ts_ns(self):
+        random.seed(1)
+        base = datetime.datetime(2024, 5, 7, 14, 8, 26, 519626)
+        tz = datetime.timezone(datetime.timedelta(hours=-5, minutes=-30))
+        for _ in range(1000):
+            dt = base + datetime.timedelta(seconds=random.randint(0, 10 ** 7), microseconds=random.randint(0, 999999))
+            for s in [
+                str(dt),
+                dt.isoformat(),
+                dt.replace(tzinfo=datetime.timezone.utc).isoformat(),
+                dt.replace(tzinfo=tz).isoformat(),
+                dt.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                # not in fast path format
+                dt.date().isoformat(),
+                dt.strftime('%Y%m%dT%H%M%S'),
+            ]:
+                assert datetime_str_to_ts_ns(s) == datetime_to_ts_ns(dateutil.parser.isoparse(s)), s
+
+        assert datetime_str_to_ts_ns('1970-01-01T00:00:01.5Z') == 3 * NANOS_PER_SECOND // 2
+        assert datetime_str_to_ts_ns('1970-01-01T00:00:00.000000001+00:00') == 1
+        with self.assertRaises(ValueError):
+            datetime_str_to_ts_ns('2024-13-07 14:08:26')
+        assert is_time_str('2024-05-07 14:08:26.519626')
+        assert not is_time_str('username_0')
+        assert not is_time_str(100.0)
+        # fast path format, but values out of range
+        assert not is_time_str('2024-13-45T99:00:00')
+        assert not is_time_str('2024-02-30 10:00:00')
+        assert not is_time_str('2024-05-07 24:00:00Z')
+        assert not is_time_str('2024-05-07 10:60:00')
+        assert not is_time_str('2024-05-07 10:00:60')
+        assert duration_to_ns('1m30s') == 90 * NANOS_PER_SECOND
+
+        ts_ns = 1715090906519626000
+        assert to_ts_ns(ts_ns) == ts_ns
+        assert to_ts_ns(np.int64(ts_ns)) == ts_ns and type(to_ts_ns(np.int64(ts_ns))) is int
+        assert to_ts_ns(Decimal('1715090906.519626')) == ts_ns
+        assert to_ts_ns(1.5) == 3 * NANOS_PER_SECOND // 2
+        # epoch seconds passed as int
+        with self.assertWarns(UserWarning):
+            to_ts_ns(1715090906)
+        with self.assertWarns(UserWarning):
+            to_ts_ns(np.int32(1715090906))
+
+    def test_perf(self):
+        now = datetime.datetime.now()
+        strs = [str(now + datetime.timedelta(milliseconds=i)) for i in range(100000)]
+        t = time.perf_counter()
+        for s in strs:
+            datetime_to_ts_ns(dateutil.parser.isoparse(s))
+        isoparse_took = time.perf_counter() - t
+        t = time.perf_counter()
+        for s in strs:
+            datetime_str_to_ts_ns(s)
+        took = time.perf_counter() - t
+        print(f'isoparse: {int(len(strs) / isoparse_took)} strs/s, datetime_str_to_ts_ns: {int(len(strs) / took)} strs/s')
+
+
+if __name__ == '__main__':
+    t = TestTimeUtils()
+    t.test_datetime_str_to_ts_ns()
+    t.test_perf()
@@ -1,11 +1,31 @@
+import functools
+import numbers
+import re
+import warnings
 from decimal import Decimal
-from typing import List
-from datetime import datetime
+from typing import List, Union, Optional
+from datetime import datetime, timezone, timedelta
 
 import dateutil.parser
 
 Duration = str
 
+# Event time is int64 nanoseconds since epoch everywhere inside the engine (records, watermarks,
+# timers, window and storage timestamps). Seconds, datetimes and strings are converted at API boundaries
+NANOS_PER_SECOND = 10 ** 9
+MAX_TS_NS = 2 ** 63 - 1
+
+# integer event times below this (about a day after epoch) are most likely epoch seconds, millis or micros
+MIN_PLAUSIBLE_TS_NS = 10 ** 14
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# YYYY-MM-DD[T ]HH:MM:SS[.fraction][Z|+HH:MM], as produced by datetime.isoformat() and str(datetime)
+_ISO_DATETIME = re.compile(
+    r'(\d{4}-\d{2}-\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d{1,9}))?(Z|[+-]\d{2}:?\d{2})?'
+)
+
 
 def duration_to_s(duration_string: Duration) -> Decimal:
     total_seconds = Decimal('0')
@@ -38,18 +58,81 @@ def duration_to_s(duration_string: Duration) -> Decimal:
     return total_seconds
 
 
-def datetime_str_to_ts(dt_str: str) -> Decimal:
-    dt = dateutil.parser.isoparse(dt_str)
-    return datetime_to_ts(dt)
+def duration_to_ns(duration_string: Duration) -> int:
+    return s_to_ns(duration_to_s(duration_string))
+
+
+def s_to_ns(seconds: Union[int, float, Decimal]) -> int:
+    return int((Decimal(seconds) * NANOS_PER_SECOND).to_integral_value())
+
+
+def ns_to_s(ts_ns: int) -> Decimal:
+    return Decimal(ts_ns) / NANOS_PER_SECOND
+
 
+def datetime_to_ts_ns(dt: datetime) -> int:
+    # exact, dt.timestamp() float loses sub-microsecond precision for current dates.
+    # Naive datetimes are local time, same as in datetime.timestamp()
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return ((dt - _EPOCH) // _MICROSECOND) * 1000
 
-def datetime_to_ts(dt: datetime) -> Decimal:
-    return Decimal(dt.timestamp())
+
+@functools.lru_cache(maxsize=1024)
+def _minute_ts_ns(date: str, hour: str, minute: str, utc: bool) -> int:
+    # records of a stream mostly share date, hour and minute, so the datetime is built once per minute
+    dt = datetime(int(date[0:4]), int(date[5:7]), int(date[8:10]), int(hour), int(minute))
+    if utc:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return datetime_to_ts_ns(dt)
+
+
+def _parse_iso_ts_ns(dt_str: str) -> Optional[int]:
+    # fixed format fast path, None if dt_str is not in it
+    m = _ISO_DATETIME.fullmatch(dt_str)
+    if m is None:
+        return None
+    date, hour, minute, second, fraction, tz = m.groups()
+    second = int(second)
+    if second > 59:
+        return None
+    ts = _minute_ts_ns(date, hour, minute, tz is not None) + second * NANOS_PER_SECOND
+    if fraction is not None:
+        ts += int(fraction.ljust(9, '0'))
+    if tz is not None and tz != 'Z':
+        offset_s = int(tz[1:3]) * 3600 + int(tz[-2:]) * 60
+        ts += -offset_s * NANOS_PER_SECOND if tz[0] == '+' else offset_s * NANOS_PER_SECOND
+    return ts
+
+
+def datetime_str_to_ts_ns(dt_str: str) -> int:
+    ts = _parse_iso_ts_ns(dt_str)
+    if ts is not None:
+        return ts
+    return datetime_to_ts_ns(dateutil.parser.isoparse(dt_str))
+
+
+def to_ts_ns(ts: Union[int, float, Decimal, datetime, str]) -> int:
+    # integers (including NumPy ones) are nanoseconds, floats and Decimals are seconds
+    if isinstance(ts, numbers.Integral):
+        ts = int(ts)
+        if 0 < ts < MIN_PLAUSIBLE_TS_NS:
+            warnings.warn(f'Integer event time is in nanoseconds, values below {MIN_PLAUSIBLE_TS_NS} are '
+                          f'within a day after epoch, seconds should be passed as Decimal or float')
+        return ts
+    if isinstance(ts, datetime):
+        return datetime_to_ts_ns(ts)
+    if isinstance(ts, str):
+        return datetime_str_to_ts_ns(ts)
+    return s_to_ns(ts)
 
 
 def is_time_str(s: str) -> bool:
+    if not isinstance(s, str):
+        return False
+    # format alone is not enough, e.g. month or hour may be out of range
     try:
-        dateutil.parser.isoparse(s)
+        datetime_str_to_ts_ns(s)
         return True
-    except:
+    except ValueError:
         return False
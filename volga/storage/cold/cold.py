@@ -1,6 +1,5 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List
-from decimal import Decimal
 
 from volga.streaming.api.function.function import SinkFunction
 
@@ -12,5 +11,5 @@ class ColdStorage(ABC):
         pass
 
     @abstractmethod
-    def get_data(self, dataset_name: str, keys: Optional[List[Dict[str, Any]]], start_ts: Optional[Decimal], end_ts: Optional[Decimal]) -> List[Any]:
+    def get_data(self, dataset_name: str, keys: Optional[List[Dict[str, Any]]], start_ts: Optional[int], end_ts: Optional[int]) -> List[Any]:
         pass
@@ -3,11 +3,10 @@ from threading import Thread
 from typing import Dict, Any, Optional, List, Tuple
 
 import ray
-from decimal import Decimal
 from ray.actor import ActorHandle
 import time
 
-from volga.common.time_utils import datetime_str_to_ts
+from volga.common.time_utils import datetime_str_to_ts_ns
 from volga.api.dataset.schema import Schema
 from volga.storage.cold.cold import ColdStorage
 from volga.storage.common.key_index import compose_main_key, KeyIndex
@@ -39,7 +38,7 @@ class SimpleInMemoryActorStorage(ColdStorage, HotStorage):
                 output_schema=output_schema
             )
 
-    def get_data(self, dataset_name: str, keys: Optional[List[Dict[str, Any]]], start_ts: Optional[Decimal], end_ts: Optional[Decimal]) -> List[Any]:
+    def get_data(self, dataset_name: str, keys: Optional[List[Dict[str, Any]]], start_ts: Optional[int], end_ts: Optional[int]) -> List[Any]:
         if keys is not None:
             if len(keys) > 1:
                 raise ValueError('Multiple key lookup is not supported yet')
@@ -62,10 +61,10 @@ class SimpleInMemoryActorStorage(ColdStorage, HotStorage):
 @ray.remote(num_cpus=0.01)# TODO set memory request
 class SimpleInMemoryCacheActor:
     def __init__(self):
-        self.per_dataset_per_key: Dict[str, Dict[str, List[Tuple[Decimal, Any]]]] = {}
+        self.per_dataset_per_key: Dict[str, Dict[str, List[Tuple[int, Any]]]] = {}
         self.key_index_per_dataset: Dict[str, KeyIndex] = {}
 
-    def put_records(self, dataset_name: str, records: List[Tuple[Dict[str, Any], Decimal, Any]]):
+    def put_records(self, dataset_name: str, records: List[Tuple[Dict[str, Any], int, Any]]):
         if dataset_name in self.per_dataset_per_key:
             per_key = self.per_dataset_per_key[dataset_name]
             key_index = self.key_index_per_dataset[dataset_name]
@@ -95,7 +94,7 @@ class SimpleInMemoryCacheActor:
         self,
         dataset_name: str,
         keys_dict: Optional[Dict[str, Any]],
-        start: Optional[Decimal], end: Optional[Decimal],
+        start: Optional[int], end: Optional[int],
         with_timestamps: bool = False
     ) -> List:
         if dataset_name not in self.per_dataset_per_key:
@@ -164,7 +163,7 @@ class BulkSinkToCacheActorFunction(SinkFunction):
         key_fields = list(self.output_schema.keys.keys())
         keys_dict = {k: value[k] for k in key_fields}
         timestamp_field = self.output_schema.timestamp
-        ts = datetime_str_to_ts(value[timestamp_field])
+        ts = datetime_str_to_ts_ns(value[timestamp_field])
         self.buffer.append((keys_dict, ts, value))
 
     def _dump_buffer_if_needed(self):
@@ -201,6 +200,6 @@ class SingleEventSinkToCacheActorFunction(SinkFunction):
         key_fields = list(self.output_schema.keys.keys())
         keys_dict = {k: value[k] for k in key_fields}
         timestamp_field = self.output_schema.timestamp
-        ts = datetime_str_to_ts(value[timestamp_field])
+        ts = datetime_str_to_ts_ns(value[timestamp_field])
         self.cache_actor.put_records.remote(self.dataset_name, [(keys_dict, ts, value)])
 
@@ -2,7 +2,7 @@ import logging
 from abc import ABC, abstractmethod
 from typing import Any, List
 
-from volga.streaming.api.message.message import Record
+from volga.streaming.api.message.message import Record, Watermark
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +14,14 @@ class Collector(ABC):
     def collect(self, record: Record):
         pass
 
+    def collect_batch(self, records: List[Record]):
+        for record in records:
+            self.collect(record)
+
+    def emit_watermark(self, watermark: Watermark):
+        # collectors which do not cross task boundaries have nowhere to send watermarks
+        pass
+
 
 class CollectionCollector(Collector):
     def __init__(self, collector_list: List[Collector]):
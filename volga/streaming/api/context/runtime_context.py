@@ -1,7 +1,11 @@
+import copy
 from typing import Dict, Optional
 
 from ray.actor import ActorHandle
 
+from volga.streaming.api.context.timer_service import TimerService
+from volga.streaming.api.state.keyed_state import KeyedStateBackend, InMemoryKeyedStateBackend
+
 
 # Encapsulate the runtime information of a streaming task
 class RuntimeContext:
@@ -12,7 +16,8 @@ class RuntimeContext:
         parallelism: int,
         operator_id: int,
         operator_name: str,
-        job_config: Optional[Dict] = None
+        job_config: Optional[Dict] = None,
+        state_backend: Optional[KeyedStateBackend] = None
     ):
         self.task_id = task_id
         self.task_index = task_index
@@ -22,3 +27,16 @@ class RuntimeContext:
         if job_config is None:
             job_config = {}
         self.job_config = job_config
+        self.timer_service = TimerService()
+        if state_backend is None:
+            state_backend = InMemoryKeyedStateBackend()
+        self.state_backend = state_backend
+
+    def for_chained_operator(self, operator_id: int, operator_name: str) -> 'RuntimeContext':
+        # context of an operator chained into this task: task info and state backend are shared,
+        # timers are per operator so that each one sees watermarks in chain order
+        ctx = copy.copy(self)
+        ctx.operator_id = operator_id
+        ctx.operator_name = operator_name
+        ctx.timer_service = TimerService()
+        return ctx
@@ -8,6 +8,7 @@ from volga.streaming.api.function.function import CollectionSourceFunction, Loca
 from volga.streaming.api.function.kafka import KafkaSourceFunction
 from volga.streaming.api.function.mysql import MysqlSourceFunction
 from volga.streaming.api.job_graph.job_graph_builder import JobGraphBuilder
+from volga.streaming.api.job_graph.job_graph_optimizer import JobGraphOptimizer
 from volga.streaming.api.stream.stream_sink import StreamSink
 from volga.streaming.api.stream.stream_source import StreamSource
 from volga.streaming.runtime.client.job_client import JobClient
@@ -94,6 +95,7 @@ class StreamingContext:
 
     def submit(self):
         job_graph = JobGraphBuilder(stream_sinks=self.stream_sinks).build()
+        job_graph = JobGraphOptimizer(job_graph).optimize()
         logger.info(f'Built job graph for {job_graph.job_name}')
         logger.info(f'\n {job_graph.gen_digraph()}')
         job_client = JobClient()
@@ -102,6 +104,7 @@ class StreamingContext:
     # blocks until job is finished
     def execute(self):
         job_graph = JobGraphBuilder(stream_sinks=self.stream_sinks).build()
+        job_graph = JobGraphOptimizer(job_graph).optimize()
         logger.info(f'Built job graph for {job_graph.job_name}')
         logger.info(f'\n {job_graph.gen_digraph()}')
         job_client = JobClient()
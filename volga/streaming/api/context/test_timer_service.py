@@ -0,0 +1,66 @@
+import random
+import time
+import unittest
+
+from volga.streaming.api.context.timer_service import TimerService, TimerQueue
+
+
+class TestTimerService(unittest.TestCase):
+
+    def test_timer_queue(self):
+        random.seed(0)
+        q = TimerQueue()
+        expected = set()
+        for _ in range(5000):
+            key, ts = random.randint(0, 100), random.randint(0, 1000)
+            if random.random() < 0.3:
+                q.delete(key, ts)
+                expected.discard((key, ts))
+            else:
+                q.register(key, ts)
+                expected.add((key, ts))
+        assert len(q) == len(expected)
+        fired = q.pop_until(500)
+        assert [ts for _, ts in fired] == sorted(ts for _, ts in fired)
+        assert set(fired) == {t for t in expected if t[1] <= 500}
+        assert q.peek_timestamp() == min(ts for _, ts in expected if ts > 500)
+
+        # same key and timestamp is a single timer, keys do not have to be comparable
+        q = TimerQueue()
+        q.register(set, 1)
+        q.register(dict, 1)
+        q.register(dict, 1)
+        assert len(q) == 2
+
+    def test_bulk(self):
+        service = TimerService()
+        num_keys = 1000000
+        t = time.perf_counter()
+        service.register_event_time_timers((k, k % 1000) for k in range(num_keys))
+        registered = time.perf_counter() - t
+        service.delete_event_time_timers((k, k % 1000) for k in range(0, num_keys, 2))
+        deleted = time.perf_counter() - t - registered
+        # deleted timers are compacted away
+        assert len(service.event_time_timers._heap) == num_keys // 2
+        fired = service.advance_watermark(9)
+        assert len(fired) == 10 * (num_keys // 1000) // 2
+        assert all(k % 2 == 1 for k, _ in fired)
+        print(f'Registered {num_keys} timers in {registered:.2f}s, deleted half in {deleted:.2f}s')
+
+    def test_processing_time(self):
+        service = TimerService()
+        now = time.time()
+        service.register_processing_time_timer('a', now + 10)
+        service.register_processing_time_timer('b', now - 1)
+        service.delete_processing_time_timer('b', now - 1)
+        assert service.next_processing_time() == now + 10
+        assert service.advance_processing_time(now) == []
+        assert service.advance_processing_time(now + 10) == [('a', now + 10)]
+        assert service.next_processing_time() is None
+
+
+if __name__ == '__main__':
+    t = TestTimerService()
+    t.test_timer_queue()
+    t.test_bulk()
+    t.test_processing_time()
@@ -0,0 +1,141 @@
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# (key, timestamp)
+Timer = Tuple[Any, Any]
+
+# rebuild heap when it holds more deleted timers than this, and more deleted than active ones
+MIN_TOMBSTONES_TO_COMPACT = 1024
+
+
+class TimerQueue:
+    # Min-heap of timers with at most one timer per (key, timestamp).
+    # Deletion is lazy: deleted timers stay in the heap until popped or until the heap is compacted,
+    # so both register and delete are O(log n) / O(1), bulk registration heapifies in O(n)
+
+    def __init__(self):
+        # (timestamp, seq, key), seq breaks ties so keys do not have to be comparable
+        self._heap: List[Tuple[Any, int, Any]] = []
+        # active timers, (key, timestamp) -> seq of its heap entry
+        self._active: Dict[Timer, int] = {}
+        self._seq = 0
+        self._num_tombstones = 0
+
+    def __len__(self):
+        return len(self._active)
+
+    def __contains__(self, timer: Timer) -> bool:
+        return timer in self._active
+
+    def register(self, key: Any, timestamp: Any):
+        if (key, timestamp) in self._active:
+            return
+        self._seq += 1
+        self._active[(key, timestamp)] = self._seq
+        heapq.heappush(self._heap, (timestamp, self._seq, key))
+
+    def register_all(self, timers: Iterable[Timer]):
+        entries = []
+        for key, timestamp in timers:
+            if (key, timestamp) in self._active:
+                continue
+            self._seq += 1
+            self._active[(key, timestamp)] = self._seq
+            entries.append((timestamp, self._seq, key))
+        if len(entries) > len(self._heap) // 2:
+            self._heap.extend(entries)
+            heapq.heapify(self._heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+
+    def delete(self, key: Any, timestamp: Any):
+        if self._active.pop((key, timestamp), None) is not None:
+            self._num_tombstones += 1
+            self._maybe_compact()
+
+    def delete_all(self, timers: Iterable[Timer]):
+        for timer in timers:
+            if self._active.pop(timer, None) is not None:
+                self._num_tombstones += 1
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._num_tombstones < MIN_TOMBSTONES_TO_COMPACT or self._num_tombstones < len(self._active):
+            return
+        self._heap = [(timestamp, seq, key) for (key, timestamp), seq in self._active.items()]
+        heapq.heapify(self._heap)
+        self._num_tombstones = 0
+
+    def _is_active(self, entry: Tuple[Any, int, Any]) -> bool:
+        timestamp, seq, key = entry
+        return self._active.get((key, timestamp)) == seq
+
+    def peek_timestamp(self) -> Optional[Any]:
+        heap = self._heap
+        while len(heap) != 0 and not self._is_active(heap[0]):
+            heapq.heappop(heap)
+            self._num_tombstones -= 1
+        return None if len(heap) == 0 else heap[0][0]
+
+    def pop_until(self, timestamp: Any) -> List[Timer]:
+        # removes and returns timers with timestamp <= given in timestamp order
+        res = []
+        heap = self._heap
+        while len(heap) != 0 and heap[0][0] <= timestamp:
+            entry = heapq.heappop(heap)
+            if not self._is_active(entry):
+                self._num_tombstones -= 1
+                continue
+            ts, _, key = entry
+            del self._active[(key, ts)]
+            res.append((key, ts))
+        return res
+
+
+class TimerService:
+    # Per-task timers. Event time timers fire when task watermark reaches their timestamp,
+    # processing time timers (timestamps are time.time() seconds) fire when task thread is idle or
+    # between records once wall clock passes them. Timers fire on the task thread, so operators
+    # do not need to synchronize state accessed from timer callbacks
+
+    def __init__(self):
+        self.event_time_timers = TimerQueue()
+        self.processing_time_timers = TimerQueue()
+        self.current_watermark = None
+
+    def register_event_time_timer(self, key: Any, timestamp: Any):
+        self.event_time_timers.register(key, timestamp)
+
+    def register_event_time_timers(self, timers: Iterable[Timer]):
+        self.event_time_timers.register_all(timers)
+
+    def delete_event_time_timer(self, key: Any, timestamp: Any):
+        self.event_time_timers.delete(key, timestamp)
+
+    def delete_event_time_timers(self, timers: Iterable[Timer]):
+        self.event_time_timers.delete_all(timers)
+
+    def register_processing_time_timer(self, key: Any, timestamp: float):
+        self.processing_time_timers.register(key, timestamp)
+
+    def register_processing_time_timers(self, timers: Iterable[Timer]):
+        self.processing_time_timers.register_all(timers)
+
+    def delete_processing_time_timer(self, key: Any, timestamp: float):
+        self.processing_time_timers.delete(key, timestamp)
+
+    def delete_processing_time_timers(self, timers: Iterable[Timer]):
+        self.processing_time_timers.delete_all(timers)
+
+    def advance_watermark(self, watermark: Any) -> List[Timer]:
+        # returns event time timers due
+        self.current_watermark = watermark
+        return self.event_time_timers.pop_until(watermark)
+
+    def advance_processing_time(self, now: float) -> List[Timer]:
+        # returns processing time timers due
+        return self.processing_time_timers.pop_until(now)
+
+    def next_processing_time(self) -> Optional[float]:
+        return self.processing_time_timers.peek_timestamp()
@@ -0,0 +1,353 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+
+Values = Union[Sequence[Any], np.ndarray]
+
+
+def _to_array(values: Values) -> Optional[np.ndarray]:
+    # numeric NumPy arrays (and pandas Series) take vectorized paths, None for other sequences
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy()
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iufb':
+        return values
+    return None
+
+
+def _to_list(values: Values) -> Sequence[Any]:
+    # NumPy arrays (and pandas Series) as lists of python scalars, which hash and compare like values added one by one
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy()
+    if isinstance(values, np.ndarray):
+        return values.tolist()
+    return values
+
+
+def _to_hashable(v: Any) -> Any:
+    # codec decodes tuples as lists
+    if isinstance(v, list):
+        return tuple(_to_hashable(e) for e in v)
+    return v
+
+
+class Accumulator(ABC):
+    # Typed running aggregate of a single field. Accumulators of the same type are mergeable,
+    # so partials can be computed separately (e.g. by combiners) and merged downstream.
+    # Numbers are kept as native ints/floats, results are python scalars
+
+    __slots__ = ()
+
+    @abstractmethod
+    def add(self, v: Any):
+        pass
+
+    def add_many(self, values: Values):
+        for v in values:
+            self.add(v)
+
+    @abstractmethod
+    def merge(self, other: 'Accumulator'):
+        # merges other into self
+        pass
+
+    @abstractmethod
+    def get_result(self) -> Any:
+        pass
+
+    @abstractmethod
+    def to_value(self) -> Any:
+        # representation with types supported by channel codec
+        pass
+
+    @classmethod
+    @abstractmethod
+    def from_value(cls, value: Any) -> 'Accumulator':
+        pass
+
+
+class CountAccumulator(Accumulator):
+
+    __slots__ = ('count',)
+
+    def __init__(self, count: int = 0):
+        self.count = count
+
+    def add(self, v: Any):
+        self.count += 1
+
+    def add_many(self, values: Values):
+        self.count += len(values)
+
+    def merge(self, other: 'CountAccumulator'):
+        self.count += other.count
+
+    def get_result(self) -> int:
+        return self.count
+
+    def to_value(self) -> int:
+        return self.count
+
+    @classmethod
+    def from_value(cls, value: int) -> 'CountAccumulator':
+        return cls(value)
+
+
+class SumAccumulator(Accumulator):
+
+    __slots__ = ('sum',)
+
+    def __init__(self, sum: Any = 0):
+        self.sum = sum
+
+    def add(self, v: Any):
+        self.sum += v
+
+    def add_many(self, values: Values):
+        array = _to_array(values)
+        if array is None:
+            self.sum += sum(values)
+        elif len(array) != 0:
+            self.sum += array.sum().item()
+
+    def merge(self, other: 'SumAccumulator'):
+        self.sum += other.sum
+
+    def get_result(self) -> Any:
+        return self.sum
+
+    def to_value(self) -> Any:
+        return self.sum
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'SumAccumulator':
+        return cls(value)
+
+
+class AvgAccumulator(Accumulator):
+
+    __slots__ = ('sum', 'count')
+
+    def __init__(self, sum: Any = 0, count: int = 0):
+        self.sum = sum
+        self.count = count
+
+    def add(self, v: Any):
+        self.sum += v
+        self.count += 1
+
+    def add_many(self, values: Values):
+        array = _to_array(values)
+        if array is None:
+            self.sum += sum(values)
+        elif len(array) != 0:
+            self.sum += array.sum().item()
+        self.count += len(values)
+
+    def merge(self, other: 'AvgAccumulator'):
+        self.sum += other.sum
+        self.count += other.count
+
+    def get_result(self) -> Any:
+        if self.count == 0:
+            return None
+        return self.sum / self.count
+
+    def to_value(self) -> Any:
+        return [self.sum, self.count]
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'AvgAccumulator':
+        return cls(*value)
+
+
+class _ExtremumAccumulator(Accumulator):
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any = None):
+        self.value = value
+
+    @abstractmethod
+    def _better(self, new: Any, old: Any) -> bool:
+        pass
+
+    @abstractmethod
+    def _array_extremum(self, array: np.ndarray) -> Any:
+        pass
+
+    def add(self, v: Any):
+        if self.value is None or self._better(v, self.value):
+            self.value = v
+
+    def add_many(self, values: Values):
+        array = _to_array(values)
+        if array is None:
+            super().add_many(values)
+        elif len(array) != 0:
+            self.add(self._array_extremum(array).item())
+
+    def merge(self, other: '_ExtremumAccumulator'):
+        if other.value is not None:
+            self.add(other.value)
+
+    def get_result(self) -> Any:
+        return self.value
+
+    def to_value(self) -> Any:
+        return self.value
+
+    @classmethod
+    def from_value(cls, value: Any) -> '_ExtremumAccumulator':
+        return cls(value)
+
+
+class MinAccumulator(_ExtremumAccumulator):
+
+    __slots__ = ()
+
+    def _better(self, new: Any, old: Any) -> bool:
+        return new < old
+
+    def _array_extremum(self, array: np.ndarray) -> Any:
+        return array.min()
+
+
+class MaxAccumulator(_ExtremumAccumulator):
+
+    __slots__ = ()
+
+    def _better(self, new: Any, old: Any) -> bool:
+        return new > old
+
+    def _array_extremum(self, array: np.ndarray) -> Any:
+        return array.max()
+
+
+class VarianceAccumulator(Accumulator):
+    # population variance, Welford's running mean and sum of squared deviations,
+    # partials are combined with Chan's parallel formula
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, v: Any):
+        self.count += 1
+        delta = v - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (v - self.mean)
+
+    def add_many(self, values: Values):
+        array = _to_array(values)
+        if array is None:
+            super().add_many(values)
+        elif len(array) != 0:
+            mean = array.mean().item()
+            self._merge(len(array), mean, ((array - mean) ** 2).sum().item())
+
+    def merge(self, other: 'VarianceAccumulator'):
+        self._merge(other.count, other.mean, other.m2)
+
+    def _merge(self, count: int, mean: float, m2: float):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def get_result(self) -> Optional[float]:
+        if self.count == 0:
+            return None
+        return self.m2 / self.count
+
+    def to_value(self) -> Any:
+        return [self.count, self.mean, self.m2]
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'VarianceAccumulator':
+        return cls(*value)
+
+
+class DistinctCountAccumulator(Accumulator):
+    # exact, keeps all distinct values
+
+    __slots__ = ('values',)
+
+    def __init__(self, values: Optional[set] = None):
+        self.values = set() if values is None else values
+
+    def add(self, v: Any):
+        self.values.add(v)
+
+    def add_many(self, values: Values):
+        array = _to_array(values)
+        self.values.update(values if array is None else np.unique(array).tolist())
+
+    def merge(self, other: 'DistinctCountAccumulator'):
+        self.values.update(other.values)
+
+    def get_result(self) -> int:
+        return len(self.values)
+
+    def to_value(self) -> Any:
+        return list(self.values)
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'DistinctCountAccumulator':
+        return cls({_to_hashable(v) for v in value})
+
+
+class PercentileAccumulator(Accumulator):
+    # exact q-th quantile (0 <= q <= 1) with linear interpolation between closest ranks, same as
+    # numpy.quantile. Keeps all values, they are sorted lazily when result is requested
+
+    __slots__ = ('q', 'values', '_sorted')
+
+    def __init__(self, q: float = 0.5, values: Optional[list] = None):
+        if not 0 <= q <= 1:
+            raise ValueError(f'Percentile should be in [0, 1], {q} given')
+        self.q = q
+        self.values = [] if values is None else values
+        self._sorted = False
+
+    def add(self, v: Any):
+        self.values.append(v)
+        self._sorted = False
+
+    def add_many(self, values: Values):
+        array = _to_array(values)
+        self.values.extend(values if array is None else array.tolist())
+        self._sorted = False
+
+    def merge(self, other: 'PercentileAccumulator'):
+        self.values.extend(other.values)
+        self._sorted = False
+
+    def get_result(self) -> Any:
+        if len(self.values) == 0:
+            return None
+        if not self._sorted:
+            self.values.sort()
+            self._sorted = True
+        pos = self.q * (len(self.values) - 1)
+        lo = math.floor(pos)
+        hi = min(lo + 1, len(self.values) - 1)
+        if lo == hi or pos == lo:
+            return self.values[lo]
+        return self.values[lo] + (self.values[hi] - self.values[lo]) * (pos - lo)
+
+    def to_value(self) -> Any:
+        return [self.q, self.values]
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'PercentileAccumulator':
+        q, values = value
+        return cls(q, list(values))
+
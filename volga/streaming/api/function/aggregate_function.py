@@ -1,13 +1,11 @@
-import datetime
 import enum
 from abc import abstractmethod
-from dataclasses import dataclass
-from typing import Tuple, List, Optional, Any, Dict, Callable
-from decimal import Decimal
-
-from pydantic import BaseModel
+from typing import List, Any, Dict, Callable, Type
 
+from volga.streaming.api.function.accumulator import Accumulator, CountAccumulator, SumAccumulator, AvgAccumulator, \
+    MinAccumulator, MaxAccumulator, VarianceAccumulator, DistinctCountAccumulator, PercentileAccumulator
 from volga.streaming.api.function.function import Function
+from volga.streaming.api.function.sketch import HyperLogLogAccumulator, KllQuantileAccumulator, TopKAccumulator
 from volga.streaming.api.message.message import Record
 
 
@@ -17,6 +15,13 @@ class AggregationType(str, enum.Enum):
     COUNT = 'count'
     SUM = 'sum'
     AVG = 'avg'
+    VARIANCE = 'variance'
+    DISTINCT_COUNT = 'distinct_count'
+    PERCENTILE = 'percentile'
+    # approximate, bounded memory
+    APPROX_DISTINCT_COUNT = 'approx_distinct_count'
+    APPROX_QUANTILE = 'approx_quantile'
+    TOP_K = 'top_k'
 
 
 class AggregateFunction(Function):
@@ -31,6 +36,10 @@ class AggregateFunction(Function):
         # updates accumulator for every event
         pass
 
+    def add_many(self, records: List[Record], accumulator: Any):
+        for record in records:
+            self.add(record, accumulator)
+
     @abstractmethod
     def get_result(self, accumulator: Any) -> Any:
         # returns aggregation result based on accumulator state
@@ -41,61 +50,72 @@ class AggregateFunction(Function):
         # merges 2 accumulators into 1
         pass
 
+    def accumulator_to_value(self, accumulator: Any) -> Any:
+        # partial accumulators are sent between workers (see Combiner), so they should be
+        # representable with types supported by channel codec
+        return accumulator
 
-class AllAggregateFunction(AggregateFunction):
+    def accumulator_from_value(self, value: Any) -> Any:
+        return value
 
-    @dataclass
-    class _Acc:
-        aggs: Dict[AggregationType, Decimal]
 
-    def __init__(self, agg_type: AggregationType, agg_on_func: Callable):
+class AllAggregateFunction(AggregateFunction):
+    # aggregates a single field with a typed accumulator, params are passed to accumulator
+    # (e.g. q for PERCENTILE and APPROX_QUANTILE, k for TOP_K)
+
+    def __init__(self, agg_type: AggregationType, agg_on_func: Callable, **params):
         self.agg_on_func = agg_on_func
         self.agg_type = agg_type
-
-    def create_accumulator(self) -> _Acc:
-        return self._Acc(aggs={})
-
-    def add(self, record: Record, accumulator: _Acc):
-        if AggregationType.MIN == self.agg_type:
-            v = self.agg_on_func(record.value)
-            if AggregationType.MIN in accumulator.aggs:
-                accumulator.aggs[AggregationType.MIN] = min(accumulator.aggs[AggregationType.MIN], v)
-            else:
-                accumulator.aggs[AggregationType.MIN] = v
-
-        if AggregationType.MAX == self.agg_type:
-            v = self.agg_on_func(record.value)
-            if AggregationType.MAX in accumulator.aggs:
-                accumulator.aggs[AggregationType.MAX] = max(accumulator.aggs[AggregationType.MAX], v)
-            else:
-                accumulator.aggs[AggregationType.MAX] = v
-
-        if AggregationType.COUNT == self.agg_type or AggregationType.AVG == self.agg_type:
-            if AggregationType.COUNT in accumulator.aggs:
-                accumulator.aggs[AggregationType.COUNT] += Decimal(1)
-            else:
-                accumulator.aggs[AggregationType.COUNT] = Decimal(1)
-            if AggregationType.COUNT == self.agg_type:
-                return
-
-        if AggregationType.SUM == self.agg_type or AggregationType.AVG == self.agg_type:
-
-            try:
-                v = self.agg_on_func(record.value)
-            except Exception as e:
-                print(self.agg_type)
-                raise e
-
-            if AggregationType.SUM in accumulator.aggs:
-                accumulator.aggs[AggregationType.SUM] += Decimal(v)
-            else:
-                accumulator.aggs[AggregationType.SUM] = Decimal(v)
-
-            if AggregationType.AVG == self.agg_type:
-                accumulator.aggs[AggregationType.AVG] = accumulator.aggs[AggregationType.SUM]/accumulator.aggs[AggregationType.COUNT]
-
-    def get_result(self, accumulator: Any) -> Any:
-        return accumulator.aggs
-
-    def merge(self, acc1: Any, acc2: Any) -> Any:
-        raise NotImplementedError()
+        self.params = params
+
+    def create_accumulator(self) -> Accumulator:
+        return create_accumulator(self.agg_type, **self.params)
+
+    def add(self, record: Record, accumulator: Accumulator):
+        if self.agg_type == AggregationType.COUNT:
+            accumulator.add(None)
+        else:
+            accumulator.add(self.agg_on_func(record.value))
+
+    def add_many(self, records: List[Record], accumulator: Accumulator):
+        if self.agg_type == AggregationType.COUNT:
+            accumulator.add_many(records)
+        else:
+            accumulator.add_many([self.agg_on_func(r.value) for r in records])
+
+    def get_result(self, accumulator: Accumulator) -> Dict[AggregationType, Any]:
+        return {self.agg_type: accumulator.get_result()}
+
+    def merge(self, acc1: Accumulator, acc2: Accumulator) -> Accumulator:
+        # merges into acc1
+        acc1.merge(acc2)
+        return acc1
+
+    def accumulator_to_value(self, accumulator: Accumulator) -> Any:
+        return accumulator.to_value()
+
+    def accumulator_from_value(self, value: Any) -> Accumulator:
+        return ACCUMULATORS[self.agg_type].from_value(value)
+
+
+ACCUMULATORS: Dict[AggregationType, Type[Accumulator]] = {
+    AggregationType.COUNT: CountAccumulator,
+    AggregationType.SUM: SumAccumulator,
+    AggregationType.AVG: AvgAccumulator,
+    AggregationType.MIN: MinAccumulator,
+    AggregationType.MAX: MaxAccumulator,
+    AggregationType.VARIANCE: VarianceAccumulator,
+    AggregationType.DISTINCT_COUNT: DistinctCountAccumulator,
+    AggregationType.PERCENTILE: PercentileAccumulator,
+    AggregationType.APPROX_DISTINCT_COUNT: HyperLogLogAccumulator,
+    AggregationType.APPROX_QUANTILE: KllQuantileAccumulator,
+    AggregationType.TOP_K: TopKAccumulator,
+}
+
+APPROX_AGGREGATION_TYPES = [AggregationType.APPROX_DISTINCT_COUNT, AggregationType.APPROX_QUANTILE, AggregationType.TOP_K]
+
+
+def create_accumulator(agg_type: AggregationType, **params) -> Accumulator:
+    if agg_type not in ACCUMULATORS:
+        raise RuntimeError(f'Unsupported aggregation {agg_type}')
+    return ACCUMULATORS[agg_type](**params)
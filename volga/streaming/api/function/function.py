@@ -4,7 +4,7 @@ import time
 from abc import ABC, abstractmethod
 from math import ceil
 from threading import Thread
-from typing import Any
+from typing import Any, Dict, List, Sequence
 
 from ray import cloudpickle
 from ray.actor import ActorHandle
@@ -35,6 +35,11 @@ class SourceContext(ABC):
         # Emits one element from the source, without attaching a timestamp
         pass
 
+    def collect_batch(self, elements: List[Any]):
+        # Emits elements in one call, so operators chained to the source can process them as a batch
+        for element in elements:
+            self.collect(element)
+
 
 class SourceFunction(Function):
     # Interface of Source functions
@@ -68,6 +73,18 @@ class MapFunction(Function):
         pass
 
 
+class BatchMapFunction(MapFunction):
+    # Maps a batch of values in one call, so per record interpreter overhead is amortized and
+    # vectorized (NumPy/pandas) code can be used. Result should have one value per input value
+
+    @abstractmethod
+    def map_batch(self, values: List[Any]) -> Sequence[Any]:
+        pass
+
+    def map(self, value: Any):
+        return self.map_batch([value])[0]
+
+
 class FlatMapFunction(Function):
 
     @abstractmethod
@@ -83,6 +100,17 @@ class FilterFunction(Function):
         pass
 
 
+class BatchFilterFunction(FilterFunction):
+    # Filters a batch of values in one call, result is a mask with one truthy value per value to keep
+
+    @abstractmethod
+    def filter_batch(self, values: List[Any]) -> Sequence[bool]:
+        pass
+
+    def filter(self, value):
+        return self.filter_batch([value])[0]
+
+
 class KeyFunction(Function):
 
     @abstractmethod
@@ -114,6 +142,10 @@ class JoinFunction(Function):
         pass
 
 
+# values emitted by collection source per collect_batch call
+COLLECTION_SOURCE_BATCH_SIZE = 1000
+
+
 class CollectionSourceFunction(SourceFunction):
     def __init__(self, all_values):
         self.all_values = all_values
@@ -125,8 +157,8 @@ class CollectionSourceFunction(SourceFunction):
         self.num_values = len(self.values)
 
     def fetch(self, ctx: SourceContext):
-        for v in self.values:
-            ctx.collect(v)
+        for i in range(0, len(self.values), COLLECTION_SOURCE_BATCH_SIZE):
+            ctx.collect_batch(self.values[i: i + COLLECTION_SOURCE_BATCH_SIZE])
         self.values = []
 
     def num_records(self) -> int:
@@ -183,6 +215,69 @@ class SimpleMapFunction(MapFunction):
         return self.func(value)
 
 
+# field name -> values of the field, one per record
+Columns = Dict[str, Sequence[Any]]
+
+
+def values_to_columns(values: List[Dict]) -> Columns:
+    # all values should be dicts with the same fields as the first one
+    if len(values) == 0:
+        return {}
+    return {field: [v[field] for v in values] for field in values[0]}
+
+
+def columns_to_values(columns: Any) -> List[Dict]:
+    # accepts dict of sequences or anything with the same items() interface, e.g. pandas DataFrame.
+    # NumPy/pandas columns are converted to lists, so values contain python scalars
+    names = []
+    cols = []
+    for name, col in columns.items():
+        names.append(name)
+        cols.append(col.tolist() if hasattr(col, 'tolist') else col)
+    return [dict(zip(names, row)) for row in zip(*cols)]
+
+
+class SimpleBatchMapFunction(BatchMapFunction):
+    """
+    Wrap a python function as :class:`BatchMapFunction`
+
+    Args:
+        func: takes a list of values and returns a sequence of mapped values. If columnar, values
+        should be dicts, func takes them as field -> list of values and returns the same form
+        (e.g. dict of NumPy arrays or pandas DataFrame)
+        columnar: pass values as columns
+    """
+
+    def __init__(self, func, columnar: bool = False):
+        self.func = func
+        self.columnar = columnar
+
+    def map_batch(self, values: List[Any]) -> Sequence[Any]:
+        if self.columnar:
+            return columns_to_values(self.func(values_to_columns(values)))
+        return self.func(values)
+
+
+class SimpleBatchFilterFunction(BatchFilterFunction):
+    """
+    Wrap a python function as :class:`BatchFilterFunction`
+
+    Args:
+        func: takes a list of values (or columns, same as in :class:`SimpleBatchMapFunction`)
+        and returns a boolean mask
+        columnar: pass values as columns
+    """
+
+    def __init__(self, func, columnar: bool = False):
+        self.func = func
+        self.columnar = columnar
+
+    def filter_batch(self, values: List[Any]) -> Sequence[bool]:
+        if self.columnar:
+            return self.func(values_to_columns(values))
+        return self.func(values)
+
+
 class SimpleFlatMapFunction(FlatMapFunction):
     """
     Wrap a python function as :class:`FlatMapFunction`
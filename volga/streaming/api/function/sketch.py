@@ -0,0 +1,249 @@
+import math
+from typing import Any, List, Optional, Dict
+
+import numpy as np
+
+from volga.streaming.api.function.accumulator import Accumulator, Values, _to_list, _to_hashable
+from volga.streaming.api.partition.key_group import stable_hash64
+
+# Approximate mergeable accumulators with memory independent of number of values.
+# Values are hashed with a process independent hash, so sketches built by different workers can be merged
+
+
+class HyperLogLogAccumulator(Accumulator):
+    # Distinct count estimate with ~1.04 / sqrt(2 ** precision) relative error, 2 ** precision bytes.
+    # Merge is exact: sketch of merged partials is the same as the sketch of all values
+
+    __slots__ = ('precision', 'registers', '_scaled_sum', '_num_zeros')
+
+    def __init__(self, precision: int = 12, registers: Optional[np.ndarray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f'HyperLogLog precision should be in [4, 16], {precision} given')
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+        # sum of 2 ** (64 - register) (exact int) and number of zero registers, kept up to date by add
+        # so that result does not scan registers. None if should be recomputed
+        self._scaled_sum: Optional[int] = None
+        self._num_zeros = 0
+
+    def add(self, v: Any):
+        # NumPy scalars are hashed as equal python scalars
+        h = stable_hash64(v)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        # position of the leftmost 1 bit in the rest of the hash
+        rank = 64 - self.precision - rest.bit_length() + 1
+        old = int(self.registers[index])
+        if rank > old:
+            self.registers[index] = rank
+            if self._scaled_sum is not None:
+                self._scaled_sum += (1 << (64 - rank)) - (1 << (64 - old))
+                if old == 0:
+                    self._num_zeros -= 1
+
+    def add_many(self, values: Values):
+        for v in _to_list(values):
+            self.add(v)
+
+    def merge(self, other: 'HyperLogLogAccumulator'):
+        if other.precision != self.precision:
+            raise ValueError(f'Can not merge HyperLogLog sketches of precision {self.precision} and {other.precision}')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        self._scaled_sum = None
+
+    def get_result(self) -> int:
+        m = len(self.registers)
+        if self._scaled_sum is None:
+            rank_counts = np.bincount(self.registers, minlength=65).tolist()
+            self._scaled_sum = sum(c << (64 - rank) for rank, c in enumerate(rank_counts) if c != 0)
+            self._num_zeros = rank_counts[0]
+        alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / (self._scaled_sum / (1 << 64))
+        num_zeros = self._num_zeros
+        if estimate <= 2.5 * m and num_zeros != 0:
+            # small range correction, linear counting
+            estimate = m * math.log(m / num_zeros)
+        return round(estimate)
+
+    def to_value(self) -> Any:
+        return [self.precision, self.registers.tobytes()]
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'HyperLogLogAccumulator':
+        precision, registers = value
+        return cls(precision, np.frombuffer(registers, dtype=np.uint8).copy())
+
+
+class KllQuantileAccumulator(Accumulator):
+    # q-th quantile estimate (KLL sketch): level h compactor keeps items of weight 2 ** h, a full compactor
+    # sorts its items and promotes every other one to the next level. Lower levels get geometrically
+    # smaller capacities, so the sketch keeps O(k) items and rank error is about 1.7 / k.
+    # Compaction offsets alternate instead of being random, so results are reproducible
+
+    __slots__ = ('q', 'k', 'compactors', 'num_compactions', '_size', '_max_size')
+
+    _C = 2 / 3
+
+    def __init__(self, q: float = 0.5, k: int = 200, compactors: Optional[List[List[Any]]] = None, num_compactions: int = 0):
+        if not 0 <= q <= 1:
+            raise ValueError(f'Quantile should be in [0, 1], {q} given')
+        self.q = q
+        self.k = k
+        self.compactors = [[]] if compactors is None else compactors
+        self.num_compactions = num_compactions
+        self._size = sum(len(c) for c in self.compactors)
+        self._max_size = self._total_capacity()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self._C ** depth * self.k)) + 1
+
+    def _total_capacity(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def add(self, v: Any):
+        self.compactors[0].append(v)
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def add_many(self, values: Values):
+        values = _to_list(values)
+        self.compactors[0].extend(values)
+        self._size += len(values)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            items = self.compactors[level]
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self.compactors.append([])
+                self._max_size = self._total_capacity()
+            items.sort()
+            # odd item (the smallest) stays
+            start = len(items) % 2
+            offset = self.num_compactions % 2
+            self.num_compactions += 1
+            self.compactors[level + 1].extend(items[start + offset::2])
+            del items[start:]
+            self._size = sum(len(c) for c in self.compactors)
+            if self._size < self._max_size:
+                return
+
+    def merge(self, other: 'KllQuantileAccumulator'):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self._size = sum(len(c) for c in self.compactors)
+        self._max_size = self._total_capacity()
+        while self._size >= self._max_size:
+            self._compress()
+
+    def get_result(self) -> Any:
+        weighted = sorted(
+            (item, 1 << level) for level, items in enumerate(self.compactors) for item in items
+        )
+        if len(weighted) == 0:
+            return None
+        total = sum(w for _, w in weighted)
+        rank = self.q * total
+        cumulative = 0
+        for item, weight in weighted:
+            cumulative += weight
+            if cumulative >= rank:
+                return item
+        return weighted[-1][0]
+
+    def to_value(self) -> Any:
+        return [self.q, self.k, self.compactors, self.num_compactions]
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'KllQuantileAccumulator':
+        q, k, compactors, num_compactions = value
+        return cls(q, k, [list(c) for c in compactors], num_compactions)
+
+
+class TopKAccumulator(Accumulator):
+    # k most frequent values with their (over)estimated counts, Space-Saving with capacity counters:
+    # a new value replaces the least frequent one and inherits its count. Counts are exact while
+    # there are at most capacity distinct values
+
+    __slots__ = ('k', 'capacity', 'counts', '_buckets', '_min_count')
+
+    def __init__(self, k: int = 10, capacity: Optional[int] = None, counts: Optional[Dict[Any, int]] = None):
+        self.k = k
+        self.capacity = 10 * k if capacity is None else capacity
+        if self.capacity < k:
+            raise ValueError(f'TopK capacity should be at least k, {self.capacity} < {k}')
+        self.counts = {} if counts is None else counts
+        self._rebuild_buckets()
+
+    def _rebuild_buckets(self):
+        # stream summary: count -> values with this count (dict as insertion ordered set), so the least
+        # frequent value is found in O(1). Adds change a count by one, so min count is tracked incrementally
+        self._buckets: Dict[int, Dict[Any, None]] = {}
+        for v, c in self.counts.items():
+            self._buckets.setdefault(c, {})[v] = None
+        self._min_count = min(self._buckets, default=0)
+
+    def _increment(self, v: Any, count: int):
+        bucket = self._buckets[count]
+        del bucket[v]
+        if len(bucket) == 0:
+            del self._buckets[count]
+            if self._min_count == count:
+                self._min_count = count + 1
+        self._buckets.setdefault(count + 1, {})[v] = None
+        self.counts[v] = count + 1
+
+    def add(self, v: Any):
+        if isinstance(v, np.generic):
+            # same key as equal python scalar
+            v = v.item()
+        counts = self.counts
+        count = counts.get(v)
+        if count is not None:
+            self._increment(v, count)
+        elif len(counts) < self.capacity:
+            counts[v] = 1
+            self._buckets.setdefault(1, {})[v] = None
+            self._min_count = 1
+        else:
+            # oldest of the least frequent values
+            least_count = self._min_count
+            bucket = self._buckets[least_count]
+            least = next(iter(bucket))
+            del bucket[least]
+            del counts[least]
+            bucket[v] = None
+            counts[v] = least_count
+            self._increment(v, least_count)
+
+    def add_many(self, values: Values):
+        for v in _to_list(values):
+            self.add(v)
+
+    def merge(self, other: 'TopKAccumulator'):
+        counts = self.counts
+        for v, c in other.counts.items():
+            counts[v] = counts.get(v, 0) + c
+        if len(counts) > self.capacity:
+            top = sorted(counts.items(), key=lambda e: e[1], reverse=True)[:self.capacity]
+            self.counts = dict(top)
+        self._rebuild_buckets()
+
+    def get_result(self) -> List[List[Any]]:
+        top = sorted(self.counts.items(), key=lambda e: e[1], reverse=True)[:self.k]
+        return [[v, c] for v, c in top]
+
+    def to_value(self) -> Any:
+        return [self.k, self.capacity, [[v, c] for v, c in self.counts.items()]]
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'TopKAccumulator':
+        k, capacity, counts = value
+        return cls(k, capacity, {_to_hashable(v): c for v, c in counts})
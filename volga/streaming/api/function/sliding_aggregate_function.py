@@ -0,0 +1,290 @@
+import bisect
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Tuple, Callable, Optional
+
+from volga.streaming.api.function.accumulator import Accumulator
+from volga.streaming.api.function.aggregate_function import AggregationType
+
+
+class SlidingAggregate(ABC):
+    # Incremental aggregate over a sliding window: values are added in window order
+    # and evicted from the oldest end, both in amortized O(1). Sums are native ints/floats
+
+    @abstractmethod
+    def add(self, v: Any):
+        pass
+
+    @abstractmethod
+    def evict(self, v: Any):
+        # v is the oldest value in the window
+        pass
+
+    @abstractmethod
+    def get_result(self) -> Any:
+        pass
+
+    @abstractmethod
+    def reset(self):
+        pass
+
+
+class CountSlidingAggregate(SlidingAggregate):
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, v: Any):
+        self.count += 1
+
+    def evict(self, v: Any):
+        self.count -= 1
+
+    def get_result(self) -> int:
+        return self.count
+
+    def reset(self):
+        self.count = 0
+
+
+class SumSlidingAggregate(SlidingAggregate):
+
+    def __init__(self):
+        self.sum = 0
+        self.count = 0
+
+    def add(self, v: Any):
+        self.sum += v
+        self.count += 1
+
+    def evict(self, v: Any):
+        self.count -= 1
+        # empty window resets float rounding error accumulated by evictions
+        self.sum = 0 if self.count == 0 else self.sum - v
+
+    def get_result(self) -> Any:
+        return self.sum
+
+    def reset(self):
+        self.sum = 0
+        self.count = 0
+
+
+class AvgSlidingAggregate(SumSlidingAggregate):
+
+    def get_result(self) -> Any:
+        return self.sum / self.count
+
+
+class _ExtremumSlidingAggregate(SlidingAggregate):
+    # Monotonic deque of (seq, value), values which can not become the extremum
+    # before they are evicted are dropped on add, so the front is always the result
+
+    def __init__(self):
+        self._deque: Deque[Tuple[int, Any]] = deque()
+        self._num_added = 0
+        self._num_evicted = 0
+
+    @abstractmethod
+    def _dominates(self, new: Any, old: Any) -> bool:
+        pass
+
+    def add(self, v: Any):
+        while len(self._deque) != 0 and self._dominates(v, self._deque[-1][1]):
+            self._deque.pop()
+        self._deque.append((self._num_added, v))
+        self._num_added += 1
+
+    def evict(self, v: Any):
+        if len(self._deque) != 0 and self._deque[0][0] == self._num_evicted:
+            self._deque.popleft()
+        self._num_evicted += 1
+
+    def get_result(self) -> Any:
+        return self._deque[0][1]
+
+    def reset(self):
+        self._deque.clear()
+        self._num_added = 0
+        self._num_evicted = 0
+
+
+class MaxSlidingAggregate(_ExtremumSlidingAggregate):
+
+    def _dominates(self, new: Any, old: Any) -> bool:
+        return new >= old
+
+
+class MinSlidingAggregate(_ExtremumSlidingAggregate):
+
+    def _dominates(self, new: Any, old: Any) -> bool:
+        return new <= old
+
+
+_SLIDING_AGGREGATES = {
+    AggregationType.COUNT: CountSlidingAggregate,
+    AggregationType.SUM: SumSlidingAggregate,
+    AggregationType.AVG: AvgSlidingAggregate,
+    AggregationType.MAX: MaxSlidingAggregate,
+    AggregationType.MIN: MinSlidingAggregate,
+}
+
+
+# aggregations supported by exact and pane-based sliding windows
+SLIDING_AGGREGATION_TYPES = list(_SLIDING_AGGREGATES.keys())
+
+
+def create_sliding_aggregate(agg_type: AggregationType) -> SlidingAggregate:
+    if agg_type not in _SLIDING_AGGREGATES:
+        raise RuntimeError(f'Unsupported sliding aggregation {agg_type}')
+    return _SLIDING_AGGREGATES[agg_type]()
+
+
+@dataclass
+class _Pane:
+    index: int
+    count: int = 0
+    sum: Any = 0
+    extremum: Any = None
+
+
+class PaneSlidingAggregate:
+    # Approximate sliding aggregate: events are pre-aggregated into fixed-width panes and the window
+    # is answered by combining partials of panes which overlap it, so memory is bounded by
+    # length / pane width instead of number of events. Window may include up to one pane width of
+    # events older than length
+
+    def __init__(self, agg_type: AggregationType, length_ns: int, pane_ns: int):
+        if pane_ns <= 0:
+            raise ValueError(f'Pane width should be positive, {pane_ns} given')
+        if agg_type not in SLIDING_AGGREGATION_TYPES:
+            raise RuntimeError(f'Unsupported pane aggregation {agg_type}')
+        self.agg_type = agg_type
+        self.length_ns = length_ns
+        self.pane_ns = pane_ns
+        self.panes: Deque[_Pane] = deque()
+        self.count = 0
+        self.sum = 0
+        self._is_extremum = agg_type in [AggregationType.MIN, AggregationType.MAX]
+        # monotonic deque of (pane index, pane extremum)
+        self._extremums: Deque[Tuple[int, Any]] = deque()
+        self._max_event_time = None
+
+    def _dominates(self, new: Any, old: Any) -> bool:
+        return new >= old if self.agg_type == AggregationType.MAX else new <= old
+
+    def add(self, event_time: int, v: Any):
+        if self._max_event_time is None or event_time > self._max_event_time:
+            self._max_event_time = event_time
+        first_index = (self._max_event_time - self.length_ns) // self.pane_ns
+        index = event_time // self.pane_ns
+        if index < first_index:
+            # too late
+            return
+
+        if len(self.panes) == 0 or index > self.panes[-1].index:
+            pane = _Pane(index=index)
+            self.panes.append(pane)
+            in_order = True
+        else:
+            # late event for an existing or missing pane
+            pos = bisect.bisect_left(self.panes, index, key=(lambda p: p.index))
+            if pos == len(self.panes) or self.panes[pos].index != index:
+                self.panes.insert(pos, _Pane(index=index))
+            pane = self.panes[pos]
+            in_order = pos == len(self.panes) - 1
+
+        pane.count += 1
+        self.count += 1
+        if self.agg_type in [AggregationType.SUM, AggregationType.AVG]:
+            pane.sum += v
+            self.sum += v
+        if self._is_extremum:
+            if pane.extremum is None or self._dominates(v, pane.extremum):
+                pane.extremum = v
+                if in_order:
+                    while len(self._extremums) != 0 and self._dominates(v, self._extremums[-1][1]):
+                        self._extremums.pop()
+                    if len(self._extremums) == 0 or self._extremums[-1][0] != index:
+                        self._extremums.append((index, v))
+                else:
+                    self._rebuild_extremums()
+
+        # evict panes which are out of window
+        while self.panes[0].index < first_index:
+            evicted = self.panes.popleft()
+            self.count -= evicted.count
+            self.sum = 0 if self.count == 0 else self.sum - evicted.sum
+            if len(self._extremums) != 0 and self._extremums[0][0] == evicted.index:
+                self._extremums.popleft()
+
+    def _rebuild_extremums(self):
+        self._extremums.clear()
+        for pane in self.panes:
+            while len(self._extremums) != 0 and self._dominates(pane.extremum, self._extremums[-1][1]):
+                self._extremums.pop()
+            self._extremums.append((pane.index, pane.extremum))
+
+    def get_result(self) -> Any:
+        if self.agg_type == AggregationType.COUNT:
+            return self.count
+        if self.agg_type == AggregationType.SUM:
+            return self.sum
+        if self.agg_type == AggregationType.AVG:
+            return self.sum / self.count
+        return self._extremums[0][1]
+
+
+class PaneMergingAggregate:
+    # Sliding window over panes of mergeable accumulators (e.g. sketches, which can not evict values):
+    # each pane aggregates its events and result merges partials of panes which overlap the window,
+    # same window semantics as PaneSlidingAggregate. Merge of all panes is kept up to date by adding each
+    # event to it as well as to its pane, and is rebuilt from panes only when a pane expires (once per pane)
+
+    def __init__(self, create_accumulator: Callable[[], Accumulator], length_ns: int, pane_ns: int):
+        if pane_ns <= 0:
+            raise ValueError(f'Pane width should be positive, {pane_ns} given')
+        self.create_accumulator = create_accumulator
+        self.length_ns = length_ns
+        self.pane_ns = pane_ns
+        # (pane index, accumulator) in index order
+        self.panes: Deque[Tuple[int, Accumulator]] = deque()
+        # None if should be rebuilt from panes
+        self._merged: Optional[Accumulator] = None
+        self._max_event_time = None
+
+    def add(self, event_time: int, v: Any):
+        if self._max_event_time is None or event_time > self._max_event_time:
+            self._max_event_time = event_time
+        first_index = (self._max_event_time - self.length_ns) // self.pane_ns
+        index = event_time // self.pane_ns
+        if index < first_index:
+            # too late
+            return
+
+        if len(self.panes) == 0 or index > self.panes[-1][0]:
+            acc = self.create_accumulator()
+            self.panes.append((index, acc))
+        else:
+            pos = bisect.bisect_left(self.panes, index, key=(lambda p: p[0]))
+            if pos == len(self.panes) or self.panes[pos][0] != index:
+                self.panes.insert(pos, (index, self.create_accumulator()))
+            acc = self.panes[pos][1]
+        acc.add(v)
+
+        expired = False
+        while self.panes[0][0] < first_index:
+            self.panes.popleft()
+            expired = True
+        if expired:
+            self._merged = None
+        elif self._merged is not None:
+            self._merged.add(v)
+
+    def get_result(self) -> Any:
+        if self._merged is None:
+            self._merged = self.create_accumulator()
+            for _, acc in self.panes:
+                self._merged.merge(acc)
+        return self._merged.get_result()
@@ -0,0 +1,98 @@
+import math
+import random
+import time
+import unittest
+
+import numpy as np
+
+from volga.streaming.api.function.aggregate_function import AggregationType, AllAggregateFunction, create_accumulator, \
+    APPROX_AGGREGATION_TYPES
+from volga.streaming.api.message.message import Record
+from volga.streaming.runtime.transfer.codec import get_codec, CodecType
+
+
+def _expected(agg_type: AggregationType, values: list, q: float):
+    return {
+        AggregationType.COUNT: len(values),
+        AggregationType.SUM: sum(values),
+        AggregationType.AVG: sum(values) / len(values),
+        AggregationType.MIN: min(values),
+        AggregationType.MAX: max(values),
+        AggregationType.VARIANCE: np.var(values).item(),
+        AggregationType.DISTINCT_COUNT: len(set(values)),
+        AggregationType.PERCENTILE: np.quantile(values, q).item(),
+    }[agg_type]
+
+
+def _assert_close(res, expected):
+    if isinstance(expected, float):
+        assert math.isclose(res, expected, rel_tol=1e-9), (res, expected)
+    else:
+        assert res == expected, (res, expected)
+
+
+class TestAccumulator(unittest.TestCase):
+
+    def test_accumulators(self):
+        random.seed(7)
+        codec = get_codec(CodecType.MSGPACK)
+        q = 0.95
+        for values in [
+            [random.randint(-100, 100) for _ in range(1000)],
+            [random.uniform(0, 1000) for _ in range(1000)],
+        ]:
+            for agg_type in AggregationType:
+                if agg_type in APPROX_AGGREGATION_TYPES:
+                    continue
+                params = {'q': q} if agg_type == AggregationType.PERCENTILE else {}
+                expected = _expected(agg_type, values, q)
+
+                one_by_one = create_accumulator(agg_type, **params)
+                for v in values:
+                    one_by_one.add(v)
+                _assert_close(one_by_one.get_result(), expected)
+
+                # list and NumPy batches, partials merged after codec round trip
+                parts = []
+                for i, batch in enumerate([values[:300], np.asarray(values[300:700]), values[700:]]):
+                    acc = create_accumulator(agg_type, **params)
+                    acc.add_many(batch)
+                    parts.append(type(acc).from_value(codec.decode(codec.encode(acc.to_value()))))
+                merged = create_accumulator(agg_type, **params)
+                for part in parts:
+                    merged.merge(part)
+                _assert_close(merged.get_result(), expected)
+                # results are python scalars
+                assert type(merged.get_result()) in (int, float)
+
+    def test_tuple_values(self):
+        codec = get_codec(CodecType.MSGPACK)
+        acc = create_accumulator(AggregationType.DISTINCT_COUNT)
+        acc.add_many([('a', 1), ('a', 1), ('b', (2, 3))])
+        restored = type(acc).from_value(codec.decode(codec.encode(acc.to_value())))
+        restored.add(('b', (2, 3)))
+        assert restored.get_result() == 2
+
+    def test_perf(self):
+        n = 100000
+        records = [Record({'v': random.uniform(0, 1000)}) for _ in range(n)]
+        values = np.asarray([r.value['v'] for r in records])
+        for agg_type in [AggregationType.SUM, AggregationType.AVG, AggregationType.MAX, AggregationType.VARIANCE]:
+            func = AllAggregateFunction(agg_type, lambda v: v['v'])
+            acc = func.create_accumulator()
+            t = time.perf_counter()
+            for r in records:
+                func.add(r, acc)
+            add_took = time.perf_counter() - t
+            acc = func.create_accumulator()
+            t = time.perf_counter()
+            acc.add_many(values)
+            add_many_took = time.perf_counter() - t
+            print(f'{agg_type}: add {int(n / add_took)} records/s, add_many {int(n / add_many_took)} values/s')
+
+
+if __name__ == '__main__':
+    t = TestAccumulator()
+    t.test_accumulators()
+    t.test_tuple_values()
+    t.test_perf()
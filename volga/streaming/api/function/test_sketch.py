@@ -0,0 +1,165 @@
+import functools
+import random
+import time
+import unittest
+
+import numpy as np
+
+from volga.common.time_utils import NANOS_PER_SECOND
+from volga.streaming.api.function.aggregate_function import AggregationType, create_accumulator
+from volga.streaming.api.function.sketch import HyperLogLogAccumulator, KllQuantileAccumulator, TopKAccumulator
+from volga.streaming.api.function.sliding_aggregate_function import PaneMergingAggregate
+from volga.streaming.api.operator.window_operator import MultiWindowOperator, SlidingWindowConfig
+from volga.streaming.runtime.transfer.codec import get_codec, CodecType
+
+
+def _round_trip(acc):
+    codec = get_codec(CodecType.MSGPACK)
+    return type(acc).from_value(codec.decode(codec.encode(acc.to_value())))
+
+
+class TestSketch(unittest.TestCase):
+
+    def test_hyper_log_log(self):
+        for n in [10, 1000, 100000]:
+            whole = HyperLogLogAccumulator()
+            parts = [HyperLogLogAccumulator() for _ in range(4)]
+            for i in range(n):
+                v = f'user_{i}'
+                whole.add(v)
+                # duplicates do not change the estimate
+                whole.add(v)
+                parts[i % 4].add(v)
+            res = whole.get_result()
+            assert abs(res - n) <= max(1, 0.05 * n), (res, n)
+
+            merged = HyperLogLogAccumulator()
+            for part in parts:
+                merged.merge(_round_trip(part))
+            assert merged.get_result() == res
+        assert HyperLogLogAccumulator().get_result() == 0
+
+        # NumPy and python values are the same values
+        acc = HyperLogLogAccumulator()
+        acc.add_many(np.array([1, 2, 3]))
+        acc.add_many([1, 2, 3])
+        acc.add_many(np.array([1.0, 2.5]))
+        acc.add(np.int32(3))
+        assert acc.get_result() == 4
+
+    def test_kll_quantile(self):
+        random.seed(3)
+        values = [random.gauss(0, 100) for _ in range(100000)]
+        sorted_values = np.sort(values)
+        for q in [0.01, 0.5, 0.95, 0.99]:
+            acc = KllQuantileAccumulator(q=q)
+            parts = [KllQuantileAccumulator(q=q) for _ in range(8)]
+            for i, v in enumerate(values):
+                acc.add(v)
+                parts[i % 8].add(v)
+            merged = KllQuantileAccumulator(q=q)
+            for part in parts:
+                merged.merge(_round_trip(part))
+
+            for sketch in [acc, merged]:
+                # memory does not depend on number of values
+                assert sum(len(c) for c in sketch.compactors) < 1000
+                rank = np.searchsorted(sorted_values, sketch.get_result()) / len(values)
+                assert abs(rank - q) < 0.02, (q, rank)
+        assert KllQuantileAccumulator().get_result() is None
+
+    def test_top_k(self):
+        random.seed(5)
+        # zipf-like: value i is seen ~ 1 / (i + 1) times
+        values = random.choices(range(10000), weights=[1 / (i + 1) for i in range(10000)], k=100000)
+        acc = TopKAccumulator(k=5)
+        parts = [TopKAccumulator(k=5) for _ in range(4)]
+        for i, v in enumerate(values):
+            acc.add(v)
+            parts[i % 4].add(v)
+        merged = TopKAccumulator(k=5)
+        for part in parts:
+            merged.merge(_round_trip(part))
+        # every added value is counted once (Space-Saving invariant)
+        assert sum(acc.counts.values()) == len(values)
+        for sketch in [acc, merged]:
+            assert len(sketch.counts) <= sketch.capacity
+            top = [v for v, _ in sketch.get_result()]
+            assert top == [0, 1, 2, 3, 4], top
+
+        acc = TopKAccumulator(k=2)
+        acc.add_many(np.array([1, 1, 2]))
+        acc.add_many([1, 2, 2, 2])
+        assert acc.get_result() == [[2, 4], [1, 3]]
+
+        # tuple values survive codec round trip
+        acc = TopKAccumulator(k=2)
+        acc.add_many([('a', 1), ('a', 1), ('b', (2, 3))])
+        restored = _round_trip(acc)
+        restored.add(('b', (2, 3)))
+        restored.add(('b', (2, 3)))
+        assert restored.get_result() == [[('b', (2, 3)), 3], [('a', 1), 2]]
+        merged = TopKAccumulator(k=2)
+        merged.merge(restored)
+        merged.merge(_round_trip(restored))
+        assert merged.get_result() == [[('b', (2, 3)), 6], [('a', 1), 4]]
+
+    def test_pane_merging_window(self):
+        pane_ns = NANOS_PER_SECOND
+        length_ns = 10 * NANOS_PER_SECOND
+        window = PaneMergingAggregate(
+            functools.partial(create_accumulator, AggregationType.APPROX_DISTINCT_COUNT), length_ns, pane_ns
+        )
+        for i in range(1000):
+            # 10 events per second, one distinct value per second, every 7th event is late
+            ts = i * pane_ns // 10
+            if i % 7 == 0:
+                ts -= 3 * pane_ns
+            window.add(ts, i // 10)
+            assert len(window.panes) <= length_ns // pane_ns + 2
+            # incrementally kept merge is the same as merge of panes
+            merged = HyperLogLogAccumulator()
+            for _, acc in window.panes:
+                merged.merge(acc)
+            assert window.get_result() == merged.get_result()
+        # window of 10s (plus at most one extra pane) sees 10-11 distinct values
+        assert 10 <= window.get_result() <= 11
+
+        for agg_type in [AggregationType.APPROX_DISTINCT_COUNT, AggregationType.APPROX_QUANTILE]:
+            window = PaneMergingAggregate(functools.partial(create_accumulator, agg_type), length_ns, pane_ns)
+            n = 20000
+            t = time.perf_counter()
+            for i in range(n):
+                window.add(i * pane_ns // 100, i)
+                window.get_result()
+            print(f'{agg_type} window: {int(n / (time.perf_counter() - t))} events/s')
+
+        with self.assertRaises(ValueError):
+            MultiWindowOperator([SlidingWindowConfig(
+                duration='1m', agg_type=AggregationType.APPROX_QUANTILE, agg_on_func=(lambda e: e['v'])
+            )])
+        MultiWindowOperator([SlidingWindowConfig(
+            duration='1m', agg_type=AggregationType.APPROX_QUANTILE, agg_on_func=(lambda e: e['v']),
+            pane='1s', params={'q': 0.9}
+        )])
+
+    def test_perf(self):
+        codec = get_codec(CodecType.MSGPACK)
+        n = 100000
+        values = [random.randint(0, 10 ** 6) for _ in range(n)]
+        for agg_type in [AggregationType.APPROX_DISTINCT_COUNT, AggregationType.APPROX_QUANTILE, AggregationType.TOP_K]:
+            acc = create_accumulator(agg_type)
+            t = time.perf_counter()
+            for v in values:
+                acc.add(v)
+            took = time.perf_counter() - t
+            print(f'{agg_type}: {int(n / took)} values/s, {len(codec.encode(acc.to_value()))} bytes encoded')
+
+
+if __name__ == '__main__':
+    t = TestSketch()
+    t.test_hyper_log_log()
+    t.test_kll_quantile()
+    t.test_top_k()
+    t.test_pane_merging_window()
+    t.test_perf()
@@ -39,11 +39,13 @@ class JobVertex:
         parallelism: int,
         vertex_type: VertexType,
         stream_operator: StreamOperator,
+        chainable: bool = True,
     ):
         self.vertex_id = vertex_id
         self.parallelism = parallelism
         self.vertex_type = vertex_type
         self.stream_operator = stream_operator
+        self.chainable = chainable
 
         # set operator id
         self.stream_operator.id = vertex_id
@@ -2,6 +2,8 @@ import logging
 from typing import List, Dict, Optional
 
 from volga.streaming.api.job_graph.job_graph import JobGraph, JobVertex, VertexType, JobEdge
+from volga.streaming.api.operator.operator import KeyByOperator
+from volga.streaming.api.partition.partition import KeyPartition
 from volga.streaming.api.stream.data_stream import DataStream, JoinStream, UnionStream
 from volga.streaming.api.stream.stream_source import StreamSource
 from volga.streaming.api.stream.stream import Stream
@@ -27,8 +29,29 @@ class JobGraphBuilder:
     def build(self) -> JobGraph:
         for stream_sink in self.stream_sinks:
             self._process_stream(stream_sink)
+        self._insert_combiners()
         return self.job_graph
 
+    def _insert_combiners(self):
+        # keyed operators which opted in for combining get a combiner on the sending side of their
+        # keyed shuffle, i.e. in the upstream key_by operator
+        vertices = {v.vertex_id: v for v in self.job_graph.job_vertices}
+        for edge in self.job_graph.job_edges:
+            if not isinstance(edge.partition, KeyPartition):
+                continue
+            source_operator = vertices[edge.source_vertex_id].stream_operator
+            target_operator = vertices[edge.target_vertex_id].stream_operator
+            if not isinstance(source_operator, KeyByOperator) or not hasattr(target_operator, 'create_combiner'):
+                continue
+            num_out_edges = len([e for e in self.job_graph.job_edges if e.source_vertex_id == edge.source_vertex_id])
+            if num_out_edges != 1:
+                # other consumers of the keyed stream expect raw records
+                logger.info(f'Not combining before vertex {edge.target_vertex_id}, keyed stream has other consumers')
+                continue
+            combiner = target_operator.create_combiner()
+            if combiner is not None:
+                source_operator.set_combiner(combiner)
+
     def _process_stream(self, stream: Stream):
         vertex_id = stream.id
         parallelism = stream.parallelism
@@ -91,5 +114,6 @@ class JobGraphBuilder:
             vertex_id=vertex_id,
             parallelism=parallelism,
             vertex_type=vertex_type,
-            stream_operator=stream_operator
+            stream_operator=stream_operator,
+            chainable=stream.chaining_enabled
         ))
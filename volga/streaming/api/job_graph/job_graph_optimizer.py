@@ -1,4 +1,12 @@
-from volga.streaming.api.job_graph.job_graph import JobGraph
+import logging
+from typing import Dict, List
+
+from volga.streaming.api.job_graph.job_graph import JobGraph, JobEdge, JobVertex, VertexType
+from volga.streaming.api.operator.chained_operator import ChainedOperator
+from volga.streaming.api.operator.operator import OperatorType
+from volga.streaming.api.partition.partition import ForwardPartition
+
+logger = logging.getLogger(__name__)
 
 
 class JobGraphOptimizer:
@@ -7,5 +15,79 @@ class JobGraphOptimizer:
         self.job_graph = job_graph
 
     def optimize(self) -> JobGraph:
-        # TODO implement chaining and other optimizations
-        return self.job_graph
\ No newline at end of file
+        self._chain_operators()
+        return self.job_graph
+
+    def _chain_operators(self):
+        # Merges chains of vertices connected by forward edges with equal parallelism into a single vertex,
+        # so records between them are passed with a function call instead of going through the transfer layer.
+        # Merged vertex takes id of the last vertex in the chain, so downstream tasks see the same stream
+        job_graph = self.job_graph
+        vertices = {v.vertex_id: v for v in job_graph.job_vertices}
+        out_edges: Dict[int, List[JobEdge]] = {v.vertex_id: [] for v in job_graph.job_vertices}
+        in_edges: Dict[int, List[JobEdge]] = {v.vertex_id: [] for v in job_graph.job_vertices}
+        for edge in job_graph.job_edges:
+            out_edges[edge.source_vertex_id].append(edge)
+            in_edges[edge.target_vertex_id].append(edge)
+
+        def can_chain(edge: JobEdge) -> bool:
+            source = vertices[edge.source_vertex_id]
+            target = vertices[edge.target_vertex_id]
+            return type(edge.partition) == ForwardPartition and \
+                source.chainable and target.chainable and \
+                source.parallelism == target.parallelism and \
+                len(out_edges[source.vertex_id]) == 1 and \
+                len(in_edges[target.vertex_id]) == 1 and \
+                target.vertex_type in [VertexType.PROCESS, VertexType.SINK] and \
+                target.stream_operator.operator_type() == OperatorType.ONE_INPUT
+
+        chained_edges = [edge for edge in job_graph.job_edges if can_chain(edge)]
+        if len(chained_edges) == 0:
+            return
+        next_in_chain = {edge.source_vertex_id: edge.target_vertex_id for edge in chained_edges}
+        chained_targets = set(next_in_chain.values())
+
+        # vertex id -> id of merged vertex it belongs to
+        merged_ids = {}
+        new_vertices = []
+        for vertex in job_graph.job_vertices:
+            if vertex.vertex_id in chained_targets:
+                # added with its chain head
+                continue
+            if vertex.vertex_id not in next_in_chain:
+                merged_ids[vertex.vertex_id] = vertex.vertex_id
+                new_vertices.append(vertex)
+                continue
+            chain = [vertex]
+            while chain[-1].vertex_id in next_in_chain:
+                chain.append(vertices[next_in_chain[chain[-1].vertex_id]])
+            head, tail = chain[0], chain[-1]
+            vertex_type = head.vertex_type
+            if tail.vertex_type == VertexType.SINK and head.vertex_type != VertexType.SOURCE:
+                vertex_type = VertexType.SINK
+            merged = JobVertex(
+                vertex_id=tail.vertex_id,
+                parallelism=head.parallelism,
+                vertex_type=vertex_type,
+                stream_operator=ChainedOperator([v.stream_operator for v in chain]),
+            )
+            for v in chain:
+                merged_ids[v.vertex_id] = merged.vertex_id
+            new_vertices.append(merged)
+            logger.info(f'Chained {[v.get_name() for v in chain]} into vertex {merged.vertex_id}')
+
+        chained_edge_ids = set(id(edge) for edge in chained_edges)
+        new_edges = []
+        for edge in job_graph.job_edges:
+            if id(edge) in chained_edge_ids:
+                continue
+            new_edge = JobEdge(
+                source_vertex_id=merged_ids[edge.source_vertex_id],
+                target_vertex_id=merged_ids[edge.target_vertex_id],
+                partition=edge.partition
+            )
+            new_edge.is_join_right_edge = edge.is_join_right_edge
+            new_edges.append(new_edge)
+
+        job_graph.job_vertices = new_vertices
+        job_graph.job_edges = new_edges
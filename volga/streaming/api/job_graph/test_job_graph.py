@@ -1,10 +1,21 @@
 import logging
+import time
 import unittest
 
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.context.runtime_context import RuntimeContext
 from volga.streaming.api.context.streaming_context import StreamingContext
+from volga.streaming.api.function.function import SimpleMapFunction, SimpleKeyFunction, SimpleReduceFunction
 from volga.streaming.api.job_graph.job_graph import JobGraph, JobEdge, JobVertex, VertexType
 from volga.streaming.api.job_graph.job_graph_builder import JobGraphBuilder
+from volga.streaming.api.job_graph.job_graph_optimizer import JobGraphOptimizer
+from volga.streaming.api.message.message import Record, Watermark
+from volga.streaming.api.operator.chained_operator import ChainedOperator
+from volga.streaming.api.operator.combiner import ReduceCombiner
+from volga.streaming.api.operator.operator import MapOperator, KeyByOperator, ReduceOperator, SourceOperator, \
+    SinkOperator, FilterOperator
 from volga.streaming.api.partition.partition import ForwardPartition, KeyPartition
+from volga.streaming.runtime.core.processor.processor import OneInputProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +58,71 @@ class TestJobGraph(unittest.TestCase):
 
         # print_digraph(jg.gen_digraph())
 
+    def test_chaining(self):
+        jg = JobGraphOptimizer(self._build_chainable_job_graph()).optimize()
+        assert len(jg.job_vertices) == 2
+        assert len(jg.job_edges) == 1
+        source_chain, sink_chain = jg.job_vertices
+        assert source_chain.vertex_type == VertexType.SOURCE
+        assert sink_chain.vertex_type == VertexType.SINK
+        assert [type(op) for op in source_chain.stream_operator.operators] == \
+               [SourceOperator, MapOperator, FilterOperator, KeyByOperator]
+        assert [type(op) for op in sink_chain.stream_operator.operators] == \
+               [ReduceOperator, MapOperator, SinkOperator]
+        # merged vertices take ids of chain tails, inner operators keep their own
+        assert source_chain.vertex_id == source_chain.stream_operator.operators[-1].id
+        assert len(set(op.id for op in source_chain.stream_operator.operators)) == 4
+        edge = jg.job_edges[0]
+        assert isinstance(edge.partition, KeyPartition)
+        assert (edge.source_vertex_id, edge.target_vertex_id) == (source_chain.vertex_id, sink_chain.vertex_id)
+
+        # disabled chaining and different parallelism split chains
+        jg = JobGraphOptimizer(self._build_chainable_job_graph(filter_parallelism=2, disable_reduce_chaining=True)).optimize()
+        ops = [
+            [type(op) for op in v.stream_operator.operators] if isinstance(v.stream_operator, ChainedOperator)
+            else type(v.stream_operator)
+            for v in jg.job_vertices
+        ]
+        assert ops == [
+            [SourceOperator, MapOperator],
+            [FilterOperator, KeyByOperator],
+            ReduceOperator,
+            [MapOperator, SinkOperator],
+        ]
+        assert len(jg.job_edges) == 3
+
+    def test_chained_operator(self):
+        # map -> key_by with combiner -> reduce in one task
+        key_by = KeyByOperator(SimpleKeyFunction(lambda v: (v // 10) % 2))
+        key_by.set_combiner(ReduceCombiner(SimpleReduceFunction(lambda a, b: a + b), interval_s=0.01))
+        chain = ChainedOperator([
+            MapOperator(SimpleMapFunction(lambda v: v * 10)),
+            key_by,
+            ReduceOperator(SimpleReduceFunction(lambda a, b: a + b)),
+        ])
+        for i, op in enumerate(chain.operators):
+            op.id = i
+        out = ListCollector()
+        processor = OneInputProcessor(chain)
+        processor.open([out], RuntimeContext(task_id=0, task_index=0, parallelism=1, operator_id=2, operator_name='chain'))
+
+        for i in range(4):
+            processor.process(Record(value=i, event_time=i))
+        # partials are held by combiner until its timer fires
+        assert out.records == []
+        next_ts = processor.next_processing_time()
+        assert next_ts is not None
+        processor.process_processing_time(next_ts)
+        assert sorted(r.value for r in out.records) == [20, 40]
+        assert processor.next_processing_time() is None
+
+        # watermark reaches reduce after key_by flushed partials emitted before it
+        processor.process(Record(value=5, event_time=5))
+        processor.process_watermark(Watermark(5))
+        assert [r.value for r in out.records[2:]] == [90]
+        assert out.watermarks == [Watermark(5)]
+        processor.close()
+
 
     def _build_data_sync_job_graph(self) -> JobGraph:
         ctx = StreamingContext()
@@ -60,8 +136,34 @@ class TestJobGraph(unittest.TestCase):
         jgb = JobGraphBuilder(stream_sinks=[sink])
         return jgb.build()
 
+    def _build_chainable_job_graph(self, filter_parallelism: int = 1, disable_reduce_chaining: bool = False) -> JobGraph:
+        ctx = StreamingContext()
+        s = ctx.from_values(1, 2, 3, 4).map(lambda x: x + 1)
+        s = s.filter(lambda x: x > 1).set_parallelism(filter_parallelism)
+        s = s.key_by(lambda x: x % 2).reduce(lambda a, b: a + b)
+        if disable_reduce_chaining:
+            s.disable_chaining()
+        sink = s.map(lambda x: x * 2).sink(lambda x: logger.info(x))
+        jgb = JobGraphBuilder(stream_sinks=[sink])
+        return jgb.build()
+
+
+class ListCollector(Collector):
+
+    def __init__(self):
+        self.records = []
+        self.watermarks = []
+
+    def collect(self, record: Record):
+        self.records.append(record)
+
+    def emit_watermark(self, watermark: Watermark):
+        self.watermarks.append(watermark)
+
 
 if __name__ == '__main__':
     t = TestJobGraph()
     t.test_data_sync_job_graph()
     t.test_key_by_job_graph()
+    t.test_chaining()
+    t.test_chained_operator()
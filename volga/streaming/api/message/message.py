@@ -1,16 +1,18 @@
 from typing import Any, Optional
 
+from volga.common.time_utils import MAX_TS_NS
 from volga.streaming.runtime.transfer.channel import ChannelMessage
 
-from decimal import Decimal
-
 
 class Record:
-    # Data record in data stream
+    # Data record in data stream. Slots keep per record memory and allocation cost low,
+    # records are created for every element passing through a task. event_time is int nanoseconds since epoch
+
+    __slots__ = ('value', 'stream_name', 'event_time')
 
-    def __init__(self, value: Any, event_time: Optional[Decimal] = None):
+    def __init__(self, value: Any, event_time: Optional[int] = None, stream_name: Optional[str] = None):
         self.value = value
-        self.stream_name = None
+        self.stream_name = stream_name
         self.event_time = event_time
 
     def __repr__(self):
@@ -38,8 +40,12 @@ class Record:
 class KeyRecord(Record):
     # Data record in a keyed data stream
 
-    def __init__(self, key: Any, value: Any, event_time: Optional[Decimal] = None):
-        super().__init__(value=value, event_time=event_time)
+    __slots__ = ('key',)
+
+    def __init__(self, key: Any, value: Any, event_time: Optional[int] = None, stream_name: Optional[str] = None):
+        self.value = value
+        self.stream_name = stream_name
+        self.event_time = event_time
         self.key = key
 
     def __repr__(self):
@@ -68,19 +74,58 @@ class KeyRecord(Record):
         }
 
 
+class Watermark:
+    # Event time progress marker, no more records with event time earlier than
+    # watermark event_time are expected in the stream. Watermarks are broadcast to all downstream channels
+
+    __slots__ = ('event_time',)
+
+    def __init__(self, event_time: int):
+        self.event_time = event_time
+
+    def __repr__(self):
+        return f'Watermark(event_time={self.event_time})'
+
+    def __eq__(self, other):
+        if type(self) is type(other):
+            return self.event_time == other.event_time
+        return False
+
+    def __hash__(self):
+        return hash(self.event_time)
+
+
+# emitted by sources when they are finished, flushes all event time state downstream
+MAX_WATERMARK = Watermark(MAX_TS_NS)
+
+WATERMARK_KEY = 'watermark'
+CHANNEL_ID_KEY = 'channel_id'
+
+
+def watermark_to_channel_message(watermark: Watermark, stream_name: str, channel_id: str) -> ChannelMessage:
+    # channel_id lets reader track watermarks per input channel
+    return {
+        WATERMARK_KEY: watermark.event_time,
+        'stream_name': stream_name,
+        CHANNEL_ID_KEY: channel_id
+    }
+
+
+def is_watermark_message(channel_message: ChannelMessage) -> bool:
+    return WATERMARK_KEY in channel_message
+
+
 # TODO we should have proper ser/de
 def record_from_channel_message(channel_message: ChannelMessage) -> Record:
     if 'key' in channel_message:
-        record = KeyRecord(
+        return KeyRecord(
             key=channel_message['key'],
             value=channel_message['value'],
-            event_time=channel_message['event_time']
+            event_time=channel_message['event_time'],
+            stream_name=channel_message['stream_name']
         )
-    else:
-        record = Record(
-            value=channel_message['value'],
-            event_time=channel_message['event_time']
-        )
-
-    record.set_stream_name(channel_message['stream_name'])
-    return record
+    return Record(
+        value=channel_message['value'],
+        event_time=channel_message['event_time'],
+        stream_name=channel_message['stream_name']
+    )
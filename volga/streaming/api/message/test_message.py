@@ -0,0 +1,98 @@
+import time
+import tracemalloc
+import unittest
+
+from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.function.function import SimpleMapFunction, SimpleFilterFunction
+from volga.streaming.api.message.message import Record, KeyRecord, record_from_channel_message
+from volga.streaming.api.operator.chained_operator import ChainedOperator
+from volga.streaming.api.operator.operator import MapOperator, FilterOperator
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.runtime.core.processor.processor import OneInputProcessor
+from volga.streaming.runtime.transfer.codec import get_codec, CodecType
+from volga.streaming.runtime.transfer.columnar import ColumnarEncoder, ColumnarDecoder
+
+
+class _DictRecord:
+    # record layout before slots
+
+    def __init__(self, value, event_time=None):
+        self.value = value
+        self.stream_name = None
+        self.event_time = event_time
+
+
+class _CountingCollector(Collector):
+
+    def __init__(self):
+        self.num_records = 0
+
+    def collect(self, record: Record):
+        self.num_records += 1
+
+
+def _allocated_bytes_per_item(create, n: int) -> float:
+    # peak traced memory while created objects are alive
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    items = create()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(items) == n
+    return peak / n
+
+
+class TestMessage(unittest.TestCase):
+
+    def test_slots(self):
+        record = KeyRecord(key='k', value=1, event_time=1, stream_name='s')
+        with self.assertRaises(AttributeError):
+            record.other = 1
+        assert record == KeyRecord('k', 1, 1, 's')
+        assert record_from_channel_message(record.to_channel_message()) == record
+
+    def test_allocations(self):
+        n = 10000
+        dict_record = _allocated_bytes_per_item(lambda: [_DictRecord(i, i) for i in range(n)], n)
+        slots_record = _allocated_bytes_per_item(lambda: [Record(i, i) for i in range(n)], n)
+        print(f'record: {dict_record:.0f} bytes with __dict__, {slots_record:.0f} bytes with __slots__')
+        assert slots_record < dict_record
+
+        # reading a columnar frame: via per message dicts vs straight into records
+        codec = get_codec(CodecType.MSGPACK)
+        messages = [
+            KeyRecord(key=f'k{i % 10}', value={'a': i, 'b': str(i)}, event_time=i, stream_name='1').to_channel_message()
+            for i in range(n)
+        ]
+        frame = ColumnarEncoder(codec).encode(messages)
+        via_dicts = _allocated_bytes_per_item(
+            lambda: [record_from_channel_message(m) for m in ColumnarDecoder(codec).decode(frame)], n
+        )
+        direct = _allocated_bytes_per_item(lambda: ColumnarDecoder(codec).decode_records(frame), n)
+        print(f'decode: {via_dicts:.0f} bytes/record via dicts, {direct:.0f} bytes/record direct')
+        assert direct < via_dicts
+        assert ColumnarDecoder(codec).decode_records(frame) == [record_from_channel_message(m) for m in messages]
+
+        # map -> filter -> map chain, records are reused by maps
+        chain = ChainedOperator([
+            MapOperator(SimpleMapFunction(lambda v: v + 1)),
+            FilterOperator(SimpleFilterFunction(lambda v: v % 2 == 0)),
+            MapOperator(SimpleMapFunction(lambda v: v * 2)),
+        ])
+        for i, op in enumerate(chain.operators):
+            op.id = i
+        out = _CountingCollector()
+        processor = OneInputProcessor(chain)
+        processor.open([out], RuntimeContext(task_id=0, task_index=0, parallelism=1, operator_id=2, operator_name='chain'))
+        records = [Record(i, i) for i in range(n)]
+        t = time.perf_counter()
+        processor.process_batch(records)
+        took = time.perf_counter() - t
+        assert out.num_records == n // 2
+        print(f'chain: {int(n / took)} records/s')
+
+
+if __name__ == '__main__':
+    t = TestMessage()
+    t.test_slots()
+    t.test_allocations()
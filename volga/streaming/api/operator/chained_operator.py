@@ -0,0 +1,90 @@
+from typing import List, Optional
+
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.function.function import EmptyFunction
+from volga.streaming.api.message.message import Record, Watermark
+from volga.streaming.api.operator.operator import StreamOperator, OperatorType
+
+
+class ChainingCollector(Collector):
+    # passes records and watermarks to the next operator of a chain with a direct call
+
+    def __init__(self, operator: StreamOperator):
+        self.operator = operator
+
+    def collect(self, record: Record):
+        self.operator.process_element(record)
+
+    def collect_batch(self, records: List[Record]):
+        self.operator.process_batch(records)
+
+    def emit_watermark(self, watermark: Watermark):
+        self.operator.advance_watermark(watermark)
+
+
+class ChainedOperator(StreamOperator):
+    # Operators connected by forward edges with equal parallelism, run in a single task.
+    # First operator receives task input, each next one is called in-process by the previous one's
+    # collector and the last one writes to task output. Operators keep their ids (and so state names),
+    # and get their own timer services, so chaining does not change their semantics
+
+    def __init__(self, operators: List[StreamOperator]):
+        assert len(operators) > 1
+        for operator in operators[1:]:
+            assert operator.operator_type() == OperatorType.ONE_INPUT
+        super().__init__(EmptyFunction())
+        self.operators = operators
+
+    @property
+    def head_operator(self) -> StreamOperator:
+        return self.operators[0]
+
+    def operator_type(self) -> OperatorType:
+        return self.head_operator.operator_type()
+
+    def open(self, collectors: List[Collector], runtime_context: RuntimeContext):
+        super().open(collectors, runtime_context)
+        # open downstream first, head may emit on open
+        next_collectors = collectors
+        for operator in reversed(self.operators):
+            operator.open(
+                next_collectors,
+                runtime_context.for_chained_operator(operator.id, operator.__class__.__name__)
+            )
+            next_collectors = [ChainingCollector(operator)]
+
+    def process_element(self, *records: Record):
+        self.head_operator.process_element(*records)
+
+    def process_batch(self, records: List[Record]):
+        self.head_operator.process_batch(records)
+
+    def fetch(self):
+        self.head_operator.fetch()
+
+    def advance_watermark(self, watermark: Watermark):
+        # chained operators get it via ChainingCollector once the previous one has processed it
+        self.head_operator.advance_watermark(watermark)
+
+    def advance_processing_time(self, now: float):
+        for operator in self.operators:
+            operator.advance_processing_time(now)
+
+    def next_processing_time(self) -> Optional[float]:
+        res = None
+        for operator in self.operators:
+            ts = operator.next_processing_time()
+            if ts is not None and (res is None or ts < res):
+                res = ts
+        return res
+
+    def finish(self):
+        for operator in self.operators:
+            operator.finish()
+
+    def close(self):
+        # upstream first, so that records flushed on close are processed by still open operators
+        for operator in self.operators:
+            operator.close()
+        super().close()
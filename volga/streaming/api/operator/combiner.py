@@ -0,0 +1,89 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Tuple
+
+from volga.streaming.api.function.aggregate_function import AggregateFunction
+from volga.streaming.api.function.function import ReduceFunction
+from volga.streaming.api.message.message import KeyRecord
+
+# combiner is flushed early if it holds partials for more keys than this
+COMBINER_MAX_KEYS = 10000
+
+
+class Combiner(ABC):
+    # Pre-aggregates records per key on the sending side of a keyed shuffle, so that a hot key sends
+    # one partial per flush interval instead of every record. Partials are combined by the downstream
+    # operator, which makes it valid only for mergeable aggregations
+
+    def __init__(self, interval_s: float, max_keys: int = COMBINER_MAX_KEYS):
+        self.interval_s = interval_s
+        self.max_keys = max_keys
+        # key -> (partial, max event time)
+        self._partials: Dict[Any, Tuple[Any, Any]] = {}
+
+    def __len__(self):
+        return len(self._partials)
+
+    def add(self, record: KeyRecord):
+        key = record.key
+        event_time = record.event_time
+        if key in self._partials:
+            partial, max_event_time = self._partials[key]
+            partial = self._combine(partial, record)
+            if max_event_time is not None and (event_time is None or event_time < max_event_time):
+                event_time = max_event_time
+        else:
+            partial = self._create(record)
+        self._partials[key] = (partial, event_time)
+
+    def flush(self) -> List[KeyRecord]:
+        res = [
+            KeyRecord(key=key, value=self._to_value(partial), event_time=event_time)
+            for key, (partial, event_time) in self._partials.items()
+        ]
+        self._partials = {}
+        return res
+
+    @abstractmethod
+    def _create(self, record: KeyRecord) -> Any:
+        pass
+
+    @abstractmethod
+    def _combine(self, partial: Any, record: KeyRecord) -> Any:
+        pass
+
+    def _to_value(self, partial: Any) -> Any:
+        return partial
+
+
+class ReduceCombiner(Combiner):
+    # partial is the reduced value, reduce is associative so downstream reduces partials as regular values
+
+    def __init__(self, reduce_func: ReduceFunction, interval_s: float, max_keys: int = COMBINER_MAX_KEYS):
+        super().__init__(interval_s, max_keys)
+        self.reduce_func = reduce_func
+
+    def _create(self, record: KeyRecord) -> Any:
+        return record.value
+
+    def _combine(self, partial: Any, record: KeyRecord) -> Any:
+        return self.reduce_func.reduce(partial, record.value)
+
+
+class AggregateCombiner(Combiner):
+    # partial is an accumulator, downstream merges it with AggregateFunction.merge
+
+    def __init__(self, aggregate_func: AggregateFunction, interval_s: float, max_keys: int = COMBINER_MAX_KEYS):
+        super().__init__(interval_s, max_keys)
+        self.aggregate_func = aggregate_func
+
+    def _create(self, record: KeyRecord) -> Any:
+        acc = self.aggregate_func.create_accumulator()
+        self.aggregate_func.add(record, acc)
+        return acc
+
+    def _combine(self, partial: Any, record: KeyRecord) -> Any:
+        self.aggregate_func.add(record, partial)
+        return partial
+
+    def _to_value(self, partial: Any) -> Any:
+        return self.aggregate_func.accumulator_to_value(partial)
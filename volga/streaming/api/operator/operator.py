@@ -1,18 +1,28 @@
 import enum
 import logging
+import time
 from abc import ABC, abstractmethod
 from typing import List, Any, Dict, Optional
 
 from volga.streaming.api.collector.collector import Collector, CollectionCollector
 from volga.streaming.api.context.runtime_context import RuntimeContext
 from volga.streaming.api.function.function import Function, SourceContext, SourceFunction, MapFunction, \
-    FlatMapFunction, FilterFunction, KeyFunction, ReduceFunction, SinkFunction, EmptyFunction, JoinFunction
-from volga.streaming.api.message.message import Record, KeyRecord
+    FlatMapFunction, FilterFunction, KeyFunction, ReduceFunction, SinkFunction, EmptyFunction, JoinFunction, \
+    BatchMapFunction, BatchFilterFunction
+from volga.streaming.api.function.aggregate_function import AggregateFunction
+from volga.streaming.api.message.message import Record, KeyRecord, Watermark, MAX_WATERMARK
+from volga.streaming.api.operator.combiner import Combiner, ReduceCombiner, AggregateCombiner
 from volga.streaming.api.operator.timestamp_assigner import TimestampAssigner
+from volga.streaming.api.operator.watermark_generator import WatermarkGenerator
+from volga.streaming.api.state.keyed_state import KeyedState
 
 logger = logging.getLogger(__name__)
 
 
+# marks missing state values, as None can be a valid value
+_MISSING = object()
+
+
 class OperatorType(enum.Enum):
     SOURCE = 0  # Sources are where your program reads its input from
     ONE_INPUT = 1  # This operator has one data stream as it's input stream.
@@ -48,6 +58,11 @@ class OneInputOperator(Operator, ABC):
     def process_element(self, record: Record):
         pass
 
+    def process_batch(self, records: List[Record]):
+        # operators which can amortize per record overhead override this
+        for record in records:
+            self.process_element(record)
+
     def operator_type(self):
         return OperatorType.ONE_INPUT
 
@@ -84,9 +99,50 @@ class StreamOperator(Operator, ABC):
         self.func.close()
 
     def collect(self, record: Record):
+        # emitted record is owned by the receiver, which may modify and re-emit it, so operators
+        # should not keep or reuse records after emitting them
         for collector in self.collectors:
             collector.collect(record)
 
+    def collect_batch(self, records: List[Record]):
+        if len(records) == 0:
+            return
+        for collector in self.collectors:
+            collector.collect_batch(records)
+
+    def create_state(self, name: str) -> KeyedState:
+        # state names are scoped by operator, so operators running in the same task do not clash
+        return self.runtime_context.state_backend.create_state(f'{self.id}.{name}')
+
+    def process_watermark(self, watermark: Watermark):
+        # called when event time of all inputs has advanced, operators with event time state
+        # should drop expired state here before forwarding
+        self.emit_watermark(watermark)
+
+    def emit_watermark(self, watermark: Watermark):
+        for collector in self.collectors:
+            collector.emit_watermark(watermark)
+
+    def on_event_time_timer(self, key: Any, timestamp: int):
+        # timers registered with runtime_context.timer_service, fired before the watermark
+        # which triggered them is passed to process_watermark
+        pass
+
+    def on_processing_time_timer(self, key: Any, timestamp: float):
+        pass
+
+    def advance_watermark(self, watermark: Watermark):
+        for key, timestamp in self.runtime_context.timer_service.advance_watermark(watermark.event_time):
+            self.on_event_time_timer(key, timestamp)
+        self.process_watermark(watermark)
+
+    def advance_processing_time(self, now: float):
+        for key, timestamp in self.runtime_context.timer_service.advance_processing_time(now):
+            self.on_processing_time_timer(key, timestamp)
+
+    def next_processing_time(self) -> Optional[float]:
+        return self.runtime_context.timer_service.next_processing_time()
+
 
 class SourceOperator(StreamOperator):
 
@@ -97,6 +153,7 @@ class SourceOperator(StreamOperator):
             runtime_context: RuntimeContext,
             timestamp_assigner: Optional[TimestampAssigner],
             num_records: Optional[int],
+            watermark_generator: Optional[WatermarkGenerator] = None,
         ):
             self.collectors = collectors
             self.runtime_context = runtime_context
@@ -104,29 +161,76 @@ class SourceOperator(StreamOperator):
             self.num_records = num_records
             self.num_fetched_records = 0
             self.finished = False
+            self.watermark_generator = watermark_generator
+            self.last_watermark: Optional[int] = None
 
         def collect(self, value: Any):
+            event_time = None
             for collector in self.collectors:
                 record = Record(value)
                 if self.timestamp_assigner is not None:
                     record = self.timestamp_assigner.assign_timestamp(record)
+                    event_time = record.event_time
                 collector.collect(record)
             self.num_fetched_records += 1
 
+            if self.watermark_generator is not None and event_time is not None:
+                self.watermark_generator.on_event(event_time)
+                if self.watermark_generator.should_emit():
+                    self._emit_watermark(self.watermark_generator.current_watermark())
+
             # notify reached bounds
             if self.num_records == self.num_fetched_records:
                 # set finished state
                 self.finished = True
+                if self.watermark_generator is not None:
+                    # no more events, so downstream event time state can be flushed
+                    self._emit_watermark(MAX_WATERMARK.event_time)
+
+        def collect_batch(self, values: List[Any]):
+            if len(values) == 0:
+                return
+            event_time = None
+            for collector in self.collectors:
+                records = [Record(value) for value in values]
+                if self.timestamp_assigner is not None:
+                    records = [self.timestamp_assigner.assign_timestamp(record) for record in records]
+                    event_time = records[-1].event_time
+                collector.collect_batch(records)
+            self.num_fetched_records += len(values)
+
+            if self.watermark_generator is not None and event_time is not None:
+                for record in records:
+                    self.watermark_generator.on_event(record.event_time)
+                if self.watermark_generator.should_emit():
+                    self._emit_watermark(self.watermark_generator.current_watermark())
+
+            if self.num_records == self.num_fetched_records:
+                self.finished = True
+                if self.watermark_generator is not None:
+                    self._emit_watermark(MAX_WATERMARK.event_time)
+
+        def _emit_watermark(self, event_time: Optional[int]):
+            if event_time is None or (self.last_watermark is not None and event_time <= self.last_watermark):
+                return
+            self.last_watermark = event_time
+            watermark = Watermark(event_time)
+            for collector in self.collectors:
+                collector.emit_watermark(watermark)
 
     def __init__(self, func: SourceFunction):
         assert isinstance(func, SourceFunction)
         super().__init__(func)
         self.source_context: Optional[SourceOperator.SourceContextImpl] = None
         self.timestamp_assigner: Optional[TimestampAssigner] = None
+        self.watermark_generator: Optional[WatermarkGenerator] = None
 
     def set_timestamp_assigner(self, timestamp_assigner: TimestampAssigner):
         self.timestamp_assigner = timestamp_assigner
 
+    def set_watermark_generator(self, watermark_generator: WatermarkGenerator):
+        self.watermark_generator = watermark_generator
+
     def open(self, collectors: List[Collector], runtime_context: RuntimeContext):
         super().open(collectors, runtime_context)
         assert isinstance(self.func, SourceFunction)
@@ -143,7 +247,8 @@ class SourceOperator(StreamOperator):
             collectors,
             runtime_context=runtime_context,
             timestamp_assigner=self.timestamp_assigner,
-            num_records=num_records
+            num_records=num_records,
+            watermark_generator=self.watermark_generator
         )
 
     def fetch(self):
@@ -160,7 +265,31 @@ class MapOperator(StreamOperator, OneInputOperator):
         super().__init__(map_func)
 
     def process_element(self, record):
-        self.collect(Record(value=self.func.map(record.value), event_time=record.event_time))
+        value = self.func.map(record.value)
+        if type(record) is Record:
+            # input record is not used after this, so it is reused for output
+            record.value = value
+            self.collect(record)
+        else:
+            # keyed records become plain records
+            self.collect(Record(value=value, event_time=record.event_time))
+
+    def process_batch(self, records: List[Record]):
+        if isinstance(self.func, BatchMapFunction):
+            values = self.func.map_batch([record.value for record in records])
+            if len(values) != len(records):
+                raise RuntimeError(f'Batch map function returned {len(values)} values for {len(records)} records')
+        else:
+            map_func = self.func.map
+            values = [map_func(record.value) for record in records]
+        out = []
+        for value, record in zip(values, records):
+            if type(record) is Record:
+                record.value = value
+            else:
+                record = Record(value=value, event_time=record.event_time)
+            out.append(record)
+        self.collect_batch(out)
 
 
 class FlatMapOperator(StreamOperator, OneInputOperator):
@@ -188,39 +317,136 @@ class FilterOperator(StreamOperator, OneInputOperator):
         if self.func.filter(record.value):
             self.collect(record)
 
+    def process_batch(self, records: List[Record]):
+        if isinstance(self.func, BatchFilterFunction):
+            mask = self.func.filter_batch([record.value for record in records])
+            if len(mask) != len(records):
+                raise RuntimeError(f'Batch filter function returned {len(mask)} flags for {len(records)} records')
+        else:
+            filter_func = self.func.filter
+            mask = [filter_func(record.value) for record in records]
+        self.collect_batch([record for record, keep in zip(records, mask) if keep])
+
 
 class KeyByOperator(StreamOperator, OneInputOperator):
 
+    # timer key for combiner flushes
+    _COMBINER_FLUSH = 'combiner_flush'
+
     def __init__(self, key_func: KeyFunction):
         assert isinstance(key_func, KeyFunction)
         super().__init__(key_func)
+        # set by JobGraphBuilder if downstream keyed operator is combinable
+        self.combiner: Optional[Combiner] = None
+        self._flush_ts: Optional[float] = None
+
+    def set_combiner(self, combiner: Combiner):
+        self.combiner = combiner
 
     def process_element(self, record: Record):
         key = self.func.key_by(record.value)
-        self.collect(KeyRecord(key, record.value, record.event_time))
+        key_record = KeyRecord(key, record.value, record.event_time)
+        if self.combiner is None:
+            self.collect(key_record)
+            return
+        self.combiner.add(key_record)
+        if len(self.combiner) >= self.combiner.max_keys:
+            self._flush_combiner()
+        elif self._flush_ts is None:
+            self._flush_ts = time.time() + self.combiner.interval_s
+            self.runtime_context.timer_service.register_processing_time_timer(self._COMBINER_FLUSH, self._flush_ts)
+
+    def _flush_combiner(self):
+        if self._flush_ts is not None:
+            self.runtime_context.timer_service.delete_processing_time_timer(self._COMBINER_FLUSH, self._flush_ts)
+            self._flush_ts = None
+        for record in self.combiner.flush():
+            self.collect(record)
+
+    def on_processing_time_timer(self, key: Any, timestamp: float):
+        if key == self._COMBINER_FLUSH:
+            self._flush_ts = None
+            self._flush_combiner()
+
+    def process_watermark(self, watermark: Watermark):
+        # partials are emitted before the watermark, so they are not late downstream
+        if self.combiner is not None:
+            self._flush_combiner()
+        super().process_watermark(watermark)
+
+    def close(self):
+        if self.combiner is not None:
+            self._flush_combiner()
+        super().close()
 
 
 class ReduceOperator(StreamOperator, OneInputOperator):
 
-    def __init__(self, reduce_func: ReduceFunction):
+    def __init__(self, reduce_func: ReduceFunction, combine_interval_s: Optional[float] = None):
         assert isinstance(reduce_func, ReduceFunction)
         super().__init__(reduce_func)
-        self.reduce_state = {}
+        self.reduce_state: Optional[KeyedState] = None
+        # if set, records are pre-reduced per key upstream of the shuffle for this long
+        self.combine_interval_s = combine_interval_s
+
+    def create_combiner(self) -> Optional[Combiner]:
+        if self.combine_interval_s is None:
+            return None
+        return ReduceCombiner(self.func, self.combine_interval_s)
 
     def open(self, collectors: List[Collector], runtime_context: RuntimeContext):
         super().open(collectors, runtime_context)
+        self.reduce_state = self.create_state('reduce')
 
     def process_element(self, record: KeyRecord):
         key = record.key
         value = record.value
-        if key in self.reduce_state:
-            old_value = self.reduce_state[key]
+        old_value = self.reduce_state.get(key, _MISSING)
+        if old_value is not _MISSING:
             new_value = self.func.reduce(old_value, value)
-            self.reduce_state[key] = new_value
-            self.collect(Record(value=new_value, event_time=record.event_time))
+            self.reduce_state.put(key, new_value)
+            # input record is reused for output, so every output record is keyed, same as the first one
+            record.value = new_value
         else:
-            self.reduce_state[key] = value
-            self.collect(record)
+            self.reduce_state.put(key, value)
+        self.collect(record)
+
+
+class AggregateOperator(StreamOperator, OneInputOperator):
+    # running per key aggregate, emits current result on every input record
+
+    def __init__(self, aggregate_func: AggregateFunction, combine_interval_s: Optional[float] = None):
+        assert isinstance(aggregate_func, AggregateFunction)
+        super().__init__(aggregate_func)
+        self.acc_state: Optional[KeyedState] = None
+        # if set, records are pre-aggregated per key upstream of the shuffle for this long,
+        # and this operator receives partial accumulators instead of records
+        self.combine_interval_s = combine_interval_s
+        self.combined_input = False
+
+    def create_combiner(self) -> Optional[Combiner]:
+        if self.combine_interval_s is None:
+            return None
+        self.combined_input = True
+        return AggregateCombiner(self.func, self.combine_interval_s)
+
+    def open(self, collectors: List[Collector], runtime_context: RuntimeContext):
+        super().open(collectors, runtime_context)
+        self.acc_state = self.create_state('aggregate')
+
+    def process_element(self, record: KeyRecord):
+        acc = self.acc_state.get(record.key)
+        if self.combined_input:
+            partial = self.func.accumulator_from_value(record.value)
+            acc = partial if acc is None else self.func.merge(acc, partial)
+        else:
+            if acc is None:
+                acc = self.func.create_accumulator()
+            self.func.add(record, acc)
+        self.acc_state.put(record.key, acc)
+        # input record is reused for output, so results are keyed, same as in ReduceOperator
+        record.value = self.func.get_result(acc)
+        self.collect(record)
 
 
 class SinkOperator(StreamOperator, OneInputOperator):
@@ -246,27 +472,24 @@ class JoinOperator(StreamOperator, TwoInputOperator):
 
     def __init__(self, join_func: Optional[JoinFunction] = None):
         super().__init__(join_func)
-        self.left_records_dict: Dict[Any, List[Record]] = {}
-        self.right_records_dict: Dict[Any, List[Record]] = {}
+        # key -> list of records
+        self.left_records_dict: Optional[KeyedState] = None
+        self.right_records_dict: Optional[KeyedState] = None
         self.i = 0
 
+    def open(self, collectors: List[Collector], runtime_context: RuntimeContext):
+        super().open(collectors, runtime_context)
+        self.left_records_dict = self.create_state('left')
+        self.right_records_dict = self.create_state('right')
+
     def process_element(self, left: KeyRecord, right: KeyRecord):
         if left is not None:
             key = left.key
         else:
             key = right.key
 
-        if key in self.left_records_dict:
-            left_records = self.left_records_dict[key]
-        else:
-            left_records = []
-            self.left_records_dict[key] = left_records
-
-        if key in self.right_records_dict:
-            right_records = self.right_records_dict[key]
-        else:
-            right_records = []
-            self.right_records_dict[key] = right_records
+        left_records = self.left_records_dict.get(key, [])
+        right_records = self.right_records_dict.get(key, [])
 
         # use left stream event time by default
         # TODO we should infer event time from values when we schema is implemented
@@ -276,11 +499,13 @@ class JoinOperator(StreamOperator, TwoInputOperator):
             lv = left.value
             event_time = left.event_time
             left_records.append(left)
+            self.left_records_dict.put(key, left_records)
             for right_r in right_records:
                 self.collect(Record(value=self.func.join(lv, right_r.value), event_time=event_time))
         else:
             rv = right.value
             right_records.append(right)
+            self.right_records_dict.put(key, right_records)
             for left_r in left_records:
                 event_time = left_r.event_time
                 self.collect(Record(value=self.func.join(left_r.value, rv), event_time=event_time))
@@ -0,0 +1,116 @@
+import unittest
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from volga.common.time_utils import NANOS_PER_SECOND
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.function.function import SimpleBatchMapFunction, SimpleBatchFilterFunction, \
+    SimpleMapFunction, SimpleFilterFunction, CollectionSourceFunction
+from volga.streaming.api.message.message import Record, Watermark, MAX_WATERMARK
+from volga.streaming.api.operator.chained_operator import ChainedOperator
+from volga.streaming.api.operator.operator import MapOperator, FilterOperator, SourceOperator
+from volga.streaming.api.operator.timestamp_assigner import EventTimeAssigner
+from volga.streaming.api.operator.watermark_generator import BoundedOutOfOrdernessWatermarkGenerator
+from volga.streaming.runtime.core.processor.processor import OneInputProcessor, SourceProcessor
+
+
+class ListCollector(Collector):
+
+    def __init__(self):
+        self.records = []
+        self.num_batches = 0
+        self.watermarks = []
+
+    def collect(self, record: Record):
+        self.records.append(record)
+
+    def collect_batch(self, records):
+        self.num_batches += 1
+        self.records.extend(records)
+
+    def emit_watermark(self, watermark: Watermark):
+        self.watermarks.append(watermark)
+
+
+def _runtime_context() -> RuntimeContext:
+    return RuntimeContext(task_id=0, task_index=0, parallelism=1, operator_id=0, operator_name='op')
+
+
+def _open_chain(operators, out: Collector) -> OneInputProcessor:
+    for i, op in enumerate(operators):
+        op.id = i
+    processor = OneInputProcessor(ChainedOperator(operators))
+    processor.open([out], _runtime_context())
+    return processor
+
+
+class TestBatchOperator(unittest.TestCase):
+
+    def test_batch_map_filter(self):
+        def records():
+            # operators reuse input records, so each run gets its own
+            return [Record(value={'a': i, 'b': i * 0.5}, event_time=i) for i in range(1000)]
+
+        def vectorized():
+            return [
+                MapOperator(SimpleBatchMapFunction(
+                    lambda cols: pd.DataFrame({'a': cols['a'], 's': np.asarray(cols['a']) + np.asarray(cols['b'])}),
+                    columnar=True
+                )),
+                FilterOperator(SimpleBatchFilterFunction(lambda cols: np.asarray(cols['a']) % 3 == 0, columnar=True)),
+                MapOperator(SimpleBatchMapFunction(lambda values: [v['s'] for v in values])),
+            ]
+
+        def per_record():
+            return [
+                MapOperator(SimpleMapFunction(lambda v: {'a': v['a'], 's': v['a'] + v['b']})),
+                FilterOperator(SimpleFilterFunction(lambda v: v['a'] % 3 == 0)),
+                MapOperator(SimpleMapFunction(lambda v: v['s'])),
+            ]
+
+        expected_out = ListCollector()
+        processor = _open_chain(per_record(), expected_out)
+        for record in records():
+            processor.process(record)
+
+        out = ListCollector()
+        processor = _open_chain(vectorized(), out)
+        batch = records()
+        processor.process_batch(batch[:600])
+        processor.process_batch(batch[600:])
+        assert out.num_batches == 2
+        assert [(r.value, r.event_time) for r in out.records] == \
+               [(r.value, r.event_time) for r in expected_out.records]
+        # values are python scalars, so they can be serialized by any codec
+        assert all(type(r.value) is float for r in out.records)
+
+        # batch functions also work record by record
+        single_out = ListCollector()
+        processor = _open_chain(vectorized(), single_out)
+        for record in records():
+            processor.process(record)
+        assert [r.value for r in single_out.records] == [r.value for r in expected_out.records]
+
+    def test_source_collect_batch(self):
+        n = 2500
+        source = SourceOperator(CollectionSourceFunction([{'ts': i} for i in range(n)]))
+        source.set_timestamp_assigner(EventTimeAssigner(lambda r: Decimal(r.value['ts'])))
+        source.set_watermark_generator(BoundedOutOfOrdernessWatermarkGenerator(interval_s=0))
+        out = ListCollector()
+        processor = SourceProcessor(source)
+        processor.open([out], _runtime_context())
+        processor.process(Record(value=None))
+        assert out.num_batches == 3
+        # assigned seconds are converted to nanoseconds
+        assert [r.event_time for r in out.records] == [i * NANOS_PER_SECOND for i in range(n)]
+        assert source.source_context.finished
+        assert out.watermarks[-1] == MAX_WATERMARK
+
+
+if __name__ == '__main__':
+    t = TestBatchOperator()
+    t.test_batch_map_filter()
+    t.test_source_collect_batch()
@@ -0,0 +1,141 @@
+import logging
+import math
+import random
+import unittest
+
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.context.streaming_context import StreamingContext
+from volga.streaming.api.function.aggregate_function import AggregationType, AllAggregateFunction, APPROX_AGGREGATION_TYPES
+from volga.streaming.api.function.function import SimpleKeyFunction, SimpleReduceFunction
+from volga.streaming.api.job_graph.job_graph_builder import JobGraphBuilder
+from volga.streaming.api.message.message import Record, KeyRecord, Watermark
+from volga.streaming.api.operator.combiner import ReduceCombiner, AggregateCombiner
+from volga.streaming.api.operator.operator import KeyByOperator, ReduceOperator, AggregateOperator
+from volga.streaming.runtime.transfer.codec import get_codec, CodecType
+
+logger = logging.getLogger(__name__)
+
+
+class ListCollector(Collector):
+
+    def __init__(self):
+        self.records = []
+
+    def collect(self, record: Record):
+        self.records.append(record)
+
+
+def _runtime_context() -> RuntimeContext:
+    return RuntimeContext(task_id=0, task_index=0, parallelism=1, operator_id=0, operator_name='op')
+
+
+# approximate aggregations depend on merge order, see test_sketch
+EXACT_AGGREGATION_TYPES = [t for t in AggregationType if t not in APPROX_AGGREGATION_TYPES]
+
+
+def _assert_same_results(res1: dict, res2: dict):
+    # floats (variance) depend on merge order
+    assert res1.keys() == res2.keys()
+    for k in res1:
+        if isinstance(res1[k], float):
+            assert math.isclose(res1[k], res2[k]), (k, res1[k], res2[k])
+        else:
+            assert res1[k] == res2[k], (k, res1[k], res2[k])
+
+
+class TestCombiner(unittest.TestCase):
+
+    def test_merge(self):
+        random.seed(6)
+        values = [random.randint(-100, 100) for _ in range(100)]
+        for agg_type in EXACT_AGGREGATION_TYPES:
+            func = AllAggregateFunction(agg_type, lambda v: v)
+            whole = func.create_accumulator()
+            parts = [func.create_accumulator() for _ in range(3)]
+            for i, v in enumerate(values):
+                func.add(Record(v), whole)
+                func.add(Record(v), parts[i % 3])
+            merged = func.merge(func.merge(parts[0], func.create_accumulator()), func.merge(parts[1], parts[2]))
+            _assert_same_results(func.get_result(merged), func.get_result(whole))
+
+    def _run(self, combiner, downstream, num_records: int):
+        # key_by with combiner -> codec -> keyed downstream operator
+        codec = get_codec(CodecType.MSGPACK)
+        key_by = KeyByOperator(SimpleKeyFunction(lambda v: v['k']))
+        shuffled = ListCollector()
+        key_by.open([shuffled], _runtime_context())
+        if combiner is not None:
+            key_by.set_combiner(combiner)
+        out = ListCollector()
+        downstream.open([out], _runtime_context())
+        for i in range(num_records):
+            key_by.process_element(Record(value={'k': i % 3, 'v': i}, event_time=i))
+            if i % 100 == 99:
+                key_by.process_watermark(Watermark(i))
+        for record in shuffled.records:
+            record.value = codec.decode(codec.encode(record.value))
+            downstream.process_element(record)
+        return shuffled.records, out.records, downstream
+
+    def test_reduce_combiner(self):
+        def reduce_func():
+            return SimpleReduceFunction(lambda a, b: {'k': a['k'], 'v': a['v'] + b['v']})
+        _, expected, op = self._run(None, ReduceOperator(reduce_func()), 1000)
+        expected_state = dict(op.reduce_state.items())
+        shuffled, res, op = self._run(ReduceCombiner(reduce_func(), interval_s=100), ReduceOperator(reduce_func()), 1000)
+        # one partial per key per watermark, with max event time of combined records
+        assert len(shuffled) == 30 and len(res) == 30
+        assert max(r.event_time for r in shuffled) == 999
+        assert dict(op.reduce_state.items()) == expected_state
+
+    def test_aggregate_combiner(self):
+        for agg_type in EXACT_AGGREGATION_TYPES:
+            def agg_func():
+                return AllAggregateFunction(agg_type, lambda v: v['v'])
+            _, out, op = self._run(None, AggregateOperator(agg_func()), 1000)
+            expected = {k: op.func.get_result(acc) for k, acc in op.acc_state.items()}
+            # one keyed result per input record, last one per key is the final result
+            assert len(out) == 1000 and all(isinstance(r, KeyRecord) for r in out)
+            last_per_key = {r.key: r.value for r in out}
+            assert last_per_key.keys() == expected.keys()
+            for k in last_per_key:
+                _assert_same_results(last_per_key[k], expected[k])
+
+            downstream = AggregateOperator(agg_func(), combine_interval_s=100)
+            combiner = downstream.create_combiner()
+            assert isinstance(combiner, AggregateCombiner)
+            shuffled, out, op = self._run(combiner, downstream, 1000)
+            assert len(shuffled) == 30 and len(out) == 30
+            res = {k: op.func.get_result(acc) for k, acc in op.acc_state.items()}
+            assert res.keys() == expected.keys()
+            last_per_key = {r.key: r.value for r in out}
+            for k in res:
+                _assert_same_results(res[k], expected[k])
+                _assert_same_results(last_per_key[k], expected[k])
+
+    def test_job_graph_inserts_combiner(self):
+        ctx = StreamingContext()
+        keyed = ctx.from_values(1, 2, 3).key_by(lambda x: x)
+        sink = keyed.reduce(lambda a, b: a + b, combine_interval='0.1s').sink(lambda x: logger.info(x))
+        JobGraphBuilder(stream_sinks=[sink]).build()
+        assert isinstance(keyed.stream_operator.combiner, ReduceCombiner)
+        assert keyed.stream_operator.combiner.interval_s == 0.1
+
+        # keyed stream with other consumers is not combined
+        ctx = StreamingContext()
+        keyed = ctx.from_values(1, 2, 3).key_by(lambda x: x)
+        sinks = [
+            keyed.reduce(lambda a, b: a + b, combine_interval='0.1s').sink(lambda x: logger.info(x)),
+            keyed.sink(lambda x: logger.info(x))
+        ]
+        JobGraphBuilder(stream_sinks=sinks).build()
+        assert keyed.stream_operator.combiner is None
+
+
+if __name__ == '__main__':
+    t = TestCombiner()
+    t.test_merge()
+    t.test_reduce_combiner()
+    t.test_aggregate_combiner()
+    t.test_job_graph_inserts_combiner()
@@ -0,0 +1,114 @@
+import random
+import unittest
+from typing import List, Tuple
+
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.function.function import SimpleJoinFunction
+from volga.streaming.api.message.message import Record, KeyRecord, Watermark, MAX_WATERMARK
+from volga.streaming.api.operator.timed_join_operator import IntervalJoinOperator, AsOfJoinOperator, TimedRecords
+from volga.streaming.runtime.core.processor.processor import TwoInputProcessor
+
+
+class ListCollector(Collector):
+
+    def __init__(self):
+        self.records = []
+
+    def collect(self, record: Record):
+        self.records.append(record)
+
+
+def _run(op, events: List[Tuple[str, int, int, int]], max_out_of_orderness: int) -> List[Record]:
+    # events are (side, key, event_time in ns, value), watermark trails max event time
+    processor = TwoInputProcessor(op)
+    processor.left_stream_name = 'left'
+    processor.right_stream_name = 'right'
+    collector = ListCollector()
+    processor.open([collector], RuntimeContext(task_id=0, task_index=0, parallelism=1, operator_id=0, operator_name='join'))
+    max_t = None
+    for side, key, t, v in events:
+        record = KeyRecord(key=key, value=(side, t, v), event_time=t)
+        record.set_stream_name(side)
+        processor.process(record)
+        max_t = t if max_t is None else max(max_t, t)
+        processor.process_watermark(Watermark(max_t - max_out_of_orderness))
+    # end of input
+    processor.process_watermark(MAX_WATERMARK)
+    return collector.records
+
+
+def _events(num: int, max_out_of_orderness: int) -> List[Tuple[str, int, int, int]]:
+    res = []
+    for i in range(num):
+        t = i - random.randint(0, max_out_of_orderness)
+        res.append((random.choice(['left', 'right']), random.randint(0, 3), t, i))
+    return res
+
+
+class TestTimedJoinOperator(unittest.TestCase):
+
+    def test_timed_records(self):
+        records = TimedRecords()
+        for t in [1, 3, 2, 5, 3]:
+            records.add(t, t)
+        assert records.times == [1, 2, 3, 3, 5]
+        assert [t for t, _ in records.range(2, 3)] == [2, 3, 3]
+        assert records.latest(4) == (3, 3)
+        assert records.latest(0) is None
+        records.evict_before(3)
+        assert records.times == [3, 3, 5]
+
+    def test_interval_join(self):
+        random.seed(3)
+        events = _events(2000, 5)
+        op = IntervalJoinOperator(before_ns=3, after_ns=2, join_func=SimpleJoinFunction(lambda l, r: (l, r)))
+        res = _run(op, events, 5)
+        # with watermark trailing by max out of orderness nothing is late, so result is exact
+        expected = set()
+        for ls, lk, lt, lv in events:
+            for rs, rk, rt, rv in events:
+                if ls == 'left' and rs == 'right' and lk == rk and lt - 3 <= rt <= lt + 2:
+                    expected.add(((ls, lt, lv), (rs, rt, rv)))
+        assert len(res) == len(expected)
+        assert set(r.value for r in res) == expected
+
+        # only records within the interval of the watermark are kept
+        for _, state in op.state.items():
+            assert len(state.left) + len(state.right) <= 4 * (5 + 3 + 2 + 1)
+
+    def test_as_of_join(self):
+        random.seed(4)
+        events = _events(2000, 0)
+        op = AsOfJoinOperator(join_func=SimpleJoinFunction(lambda l, r: (l, r)))
+        res = _run(op, events, 0)
+        expected = []
+        for i, (side, key, t, v) in enumerate(events):
+            if side != 'left':
+                continue
+            rights = [e for e in events[:i] if e[0] == 'right' and e[1] == key and e[2] <= t]
+            if len(rights) != 0:
+                latest = max(rights, key=lambda e: (e[2], e[3]))
+                expected.append(((side, t, v), ('right', latest[2], latest[3])))
+        assert [r.value for r in res] == expected
+        # a single latest record per key
+        assert all(len(s.right) == 1 and len(s.left) == 0 for _, s in op.state.items())
+
+        # right record arrives after left one, but is earlier in event time
+        op = AsOfJoinOperator(join_func=SimpleJoinFunction(lambda l, r: (l, r)))
+        res = _run(op, [('left', 0, 10, 0), ('right', 0, 8, 1), ('right', 0, 12, 2), ('left', 0, 1, 3)], 5)
+        assert [r.value for r in res] == [(('left', 10, 0), ('right', 8, 1))]
+        assert res[0].event_time == 10
+
+        # records older than tolerance are not joined and are evicted
+        op = AsOfJoinOperator(tolerance_ns=1, join_func=SimpleJoinFunction(lambda l, r: (l, r)))
+        res = _run(op, [('right', 0, 0, 0), ('left', 0, 1, 1), ('left', 0, 2, 2), ('left', 1, 3, 3)], 0)
+        assert [r.value[0][2] for r in res] == [1]
+        assert len(op.state) == 0
+
+
+if __name__ == '__main__':
+    t = TestTimedJoinOperator()
+    t.test_timed_records()
+    t.test_interval_join()
+    t.test_as_of_join()
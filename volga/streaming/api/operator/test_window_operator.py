@@ -0,0 +1,200 @@
+import random
+import time
+import unittest
+from decimal import Decimal
+from typing import List
+
+from volga.common.time_utils import NANOS_PER_SECOND
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.function.aggregate_function import AggregationType, AllAggregateFunction
+from volga.streaming.api.function.sliding_aggregate_function import SLIDING_AGGREGATION_TYPES
+from volga.streaming.api.function.window_function import AllAggregateApplyWindowFunction
+from volga.streaming.api.message.message import Record, KeyRecord, Watermark, MAX_WATERMARK
+from volga.streaming.api.operator.window_operator import MultiWindowOperator, SlidingWindowConfig
+from volga.streaming.runtime.core.processor.processor import OneInputProcessor
+
+
+class ListCollector(Collector):
+
+    def __init__(self):
+        self.records = []
+
+    def collect(self, record: Record):
+        self.records.append(record)
+
+
+def _ts(seconds: int) -> int:
+    return seconds * NANOS_PER_SECOND
+
+
+def _runtime_context() -> RuntimeContext:
+    return RuntimeContext(task_id=0, task_index=0, parallelism=1, operator_id=0, operator_name='window')
+
+
+def _configs() -> List[SlidingWindowConfig]:
+    res = []
+    for duration in ['10s', '1m']:
+        for agg_type in SLIDING_AGGREGATION_TYPES:
+            res.append(SlidingWindowConfig(
+                duration=duration,
+                agg_type=agg_type,
+                agg_on_func=(lambda e: e['v']),
+                name=f'{agg_type}_{duration}'
+            ))
+    return res
+
+
+def _reference_aggs(configs: List[SlidingWindowConfig], records: List[KeyRecord]) -> List[dict]:
+    # recomputes every window from scratch on each event
+    lengths = {'10s': _ts(10), '1m': _ts(60)}
+    windows = {conf.name: [] for conf in configs}
+    res = []
+    for record in records:
+        aggs = {}
+        for conf in configs:
+            w = windows[conf.name]
+            w.append(record)
+            w.sort(key=lambda r: r.event_time)
+            while w[-1].event_time - w[0].event_time > lengths[conf.duration]:
+                w.pop(0)
+            acc = AllAggregateApplyWindowFunction(AllAggregateFunction(conf.agg_type, conf.agg_on_func)).apply(w)
+            aggs[conf.name] = acc.get_result()
+        res.append(aggs)
+    return res
+
+
+class TestWindowOperator(unittest.TestCase):
+
+    def _run(self, records: List[KeyRecord]) -> List[dict]:
+        op = MultiWindowOperator(_configs())
+        collector = ListCollector()
+        op.open([collector], _runtime_context())
+        for r in records:
+            op.process_element(r)
+        return [r.value for r in collector.records]
+
+    def test_in_order(self):
+        records = [KeyRecord(key=0, value={'v': random.randint(0, 100)}, event_time=_ts(i)) for i in range(300)]
+        assert self._run(records) == _reference_aggs(_configs(), records)
+
+    def test_out_of_order(self):
+        random.seed(1)
+        records = []
+        for i in range(300):
+            # some events are late, some of them later than the shortest window
+            t = i - random.choice([0, 0, 0, 3, 15])
+            records.append(KeyRecord(key=0, value={'v': random.randint(0, 100)}, event_time=_ts(t)))
+        assert self._run(records) == _reference_aggs(_configs(), records)
+
+    def test_shared_buffer(self):
+        op = MultiWindowOperator(_configs())
+        op.open([ListCollector()], _runtime_context())
+        for i in range(300):
+            op.process_element(KeyRecord(key=i % 2, value={'v': i}, event_time=_ts(i)))
+        buffer = op.buffers_per_key.get(0)
+        # one buffer per key, sized by the longest window (1m, events every 2s)
+        assert len(buffer.entries) == 31
+        assert buffer.entries[0][0] == _ts(238)
+        cursors = {w.name: w.cursor - buffer.offset for w in buffer.windows}
+        assert cursors[f'{AggregationType.COUNT}_1m'] == 0
+        assert cursors[f'{AggregationType.COUNT}_10s'] == 25
+
+    def test_panes(self):
+        random.seed(2)
+        pane_ns, length_ns = _ts(5), _ts(60)
+        configs = [
+            SlidingWindowConfig(duration='1m', agg_type=t, agg_on_func=(lambda e: e['v']), name=str(t), pane='5s')
+            for t in SLIDING_AGGREGATION_TYPES
+        ]
+        op = MultiWindowOperator(configs)
+        collector = ListCollector()
+        op.open([collector], _runtime_context())
+        events = []
+        for i in range(500):
+            t = i - random.choice([0, 0, 0, 2, 7, 80])
+            events.append((_ts(t), random.randint(0, 100)))
+        for t, v in events:
+            op.process_element(KeyRecord(key=0, value={'v': v}, event_time=t))
+
+        # window includes all panes which overlap [max event time - length, max event time]
+        max_t = None
+        for i in range(len(events)):
+            max_t = events[i][0] if max_t is None else max(max_t, events[i][0])
+            first_pane = (max_t - length_ns) // pane_ns
+            values = [v for t, v in events[:i + 1] if t // pane_ns >= first_pane]
+            aggs = collector.records[i].value
+            assert aggs[str(AggregationType.COUNT)] == len(values)
+            assert aggs[str(AggregationType.SUM)] == sum(values)
+            assert aggs[str(AggregationType.AVG)] == sum(values) / len(values)
+            assert aggs[str(AggregationType.MAX)] == max(values)
+            assert aggs[str(AggregationType.MIN)] == min(values)
+
+        # memory is bounded by number of panes
+        for w in op.buffers_per_key.get(0).pane_windows:
+            assert len(w.aggregate.panes) <= length_ns // pane_ns + 1
+        assert len(op.buffers_per_key.get(0).entries) == 0
+
+    def test_watermark_eviction(self):
+        op = MultiWindowOperator(_configs())
+        processor = OneInputProcessor(op)
+        processor.open([ListCollector()], _runtime_context())
+        for i in range(100):
+            processor.process(KeyRecord(key=i % 50, value={'v': i}, event_time=_ts(i)))
+        # one expiry timer per key
+        assert len(op.runtime_context.timer_service.event_time_timers) == 50
+        # keys with no events within the longest window (1m) before watermark are dropped,
+        # keys which got newer events after their timer was registered are kept
+        processor.process_watermark(Watermark(_ts(100)))
+        assert sorted(op.buffers_per_key.keys()) == list(range(50))
+        processor.process_watermark(Watermark(_ts(130)))
+        assert sorted(op.buffers_per_key.keys()) == list(range(20, 50))
+        processor.process_watermark(MAX_WATERMARK)
+        assert len(op.buffers_per_key) == 0
+
+    def test_perf(self):
+        # per event cost should not depend on window size
+        configs = [SlidingWindowConfig(duration='7d', agg_type=t, agg_on_func=(lambda e: e['v'])) for t in SLIDING_AGGREGATION_TYPES]
+        op = MultiWindowOperator(configs)
+        op.open([ListCollector()], _runtime_context())
+        num_events = 50000
+        t = time.perf_counter()
+        for i in range(num_events):
+            op.process_element(KeyRecord(key=0, value={'v': i % 1000}, event_time=_ts(i)))
+        took = time.perf_counter() - t
+        print(f'{int(num_events / took)} events/s with {num_events} events in window')
+
+    def test_event_time_throughput(self):
+        # same windows fed with int nanosecond event times vs Decimal ones (representation before ints)
+        configs = [
+            SlidingWindowConfig(duration=d, agg_type=t, agg_on_func=(lambda e: e['v']), name=f'{t}_{d}_{p}', pane=p)
+            for d, p in [('1m', None), ('1h', '1m')] for t in [AggregationType.COUNT, AggregationType.MAX]
+        ]
+        num_events = 50000
+        results = {}
+        for name, to_event_time in [('decimal', Decimal), ('int', int)]:
+            op = MultiWindowOperator(configs)
+            collector = ListCollector()
+            op.open([collector], _runtime_context())
+            records = [
+                KeyRecord(key=i % 10, value={'v': i % 1000}, event_time=to_event_time(_ts(i) // 10))
+                for i in range(num_events)
+            ]
+            t = time.perf_counter()
+            for record in records:
+                op.process_element(record)
+            took = time.perf_counter() - t
+            results[name] = [r.value for r in collector.records]
+            print(f'{name} event time: {int(num_events / took)} events/s')
+        assert results['decimal'] == results['int']
+
+
+if __name__ == '__main__':
+    t = TestWindowOperator()
+    t.test_in_order()
+    t.test_out_of_order()
+    t.test_shared_buffer()
+    t.test_panes()
+    t.test_watermark_eviction()
+    t.test_perf()
+    t.test_event_time_throughput()
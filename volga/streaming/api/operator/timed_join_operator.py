@@ -0,0 +1,239 @@
+import bisect
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.function.function import JoinFunction
+from volga.streaming.api.message.message import Record, KeyRecord
+from volga.streaming.api.operator.operator import StreamOperator, TwoInputOperator
+from volga.streaming.api.state.keyed_state import KeyedState
+
+
+@dataclass
+class TimedRecords:
+    # per key record values indexed by event time, appends in event time order are O(1)
+    times: List[int] = field(default_factory=list)
+    values: List[Any] = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, event_time: int, value: Any):
+        if len(self.times) == 0 or event_time >= self.times[-1]:
+            self.times.append(event_time)
+            self.values.append(value)
+        else:
+            pos = bisect.bisect_right(self.times, event_time)
+            self.times.insert(pos, event_time)
+            self.values.insert(pos, value)
+
+    def range(self, start: int, end: int) -> List[Tuple[int, Any]]:
+        # records with start <= event_time <= end
+        lo = bisect.bisect_left(self.times, start)
+        hi = bisect.bisect_right(self.times, end)
+        return list(zip(self.times[lo:hi], self.values[lo:hi]))
+
+    def latest(self, end: int) -> Optional[Tuple[int, Any]]:
+        # record with the greatest event_time <= end
+        pos = bisect.bisect_right(self.times, end) - 1
+        if pos < 0:
+            return None
+        return self.times[pos], self.values[pos]
+
+    def evict_before(self, event_time: int):
+        # drops records with event_time < given
+        pos = bisect.bisect_left(self.times, event_time)
+        if pos != 0:
+            del self.times[:pos]
+            del self.values[:pos]
+
+
+@dataclass
+class _IntervalJoinState:
+    left: TimedRecords = field(default_factory=TimedRecords)
+    right: TimedRecords = field(default_factory=TimedRecords)
+    timer_ts: Optional[int] = None
+
+
+class IntervalJoinOperator(StreamOperator, TwoInputOperator):
+    # Joins left and right records of the same key with
+    # left.event_time - before_ns <= right.event_time <= left.event_time + after_ns.
+    # A record is kept only while a future record of the other side can still match it, i.e. until
+    # the watermark passes it by the interval, so state is bounded by the interval and not by stream length.
+    # Records which arrive already past that point are dropped. Without watermarks state is never evicted
+
+    def __init__(self, before_ns: int, after_ns: int, join_func: Optional[JoinFunction] = None):
+        super().__init__(join_func)
+        if before_ns < 0 or after_ns < 0:
+            raise ValueError(f'Join interval bounds should be non-negative, before {before_ns}, after {after_ns} given')
+        self.before_ns = before_ns
+        self.after_ns = after_ns
+        # key -> _IntervalJoinState
+        self.state: Optional[KeyedState] = None
+
+    def open(self, collectors: List[Collector], runtime_context: RuntimeContext):
+        super().open(collectors, runtime_context)
+        self.state = self.create_state('interval_join')
+
+    def process_element(self, left: KeyRecord, right: KeyRecord):
+        watermark = self.runtime_context.timer_service.current_watermark
+        if left is not None:
+            if watermark is not None and left.event_time + self.after_ns < watermark:
+                return
+            state = self._get_state(left.key)
+            state.left.add(left.event_time, left.value)
+            # use left stream event time, same as JoinOperator
+            for _, rv in state.right.range(left.event_time - self.before_ns, left.event_time + self.after_ns):
+                self.collect(Record(value=self.func.join(left.value, rv), event_time=left.event_time))
+            self._schedule_eviction(left.key, state, left.event_time + self.after_ns)
+            self.state.put(left.key, state)
+        else:
+            if watermark is not None and right.event_time + self.before_ns < watermark:
+                return
+            state = self._get_state(right.key)
+            state.right.add(right.event_time, right.value)
+            for lt, lv in state.left.range(right.event_time - self.after_ns, right.event_time + self.before_ns):
+                self.collect(Record(value=self.func.join(lv, right.value), event_time=lt))
+            self._schedule_eviction(right.key, state, right.event_time + self.before_ns)
+            self.state.put(right.key, state)
+
+    def _get_state(self, key: Any) -> _IntervalJoinState:
+        state = self.state.get(key)
+        if state is None:
+            state = _IntervalJoinState()
+        return state
+
+    def _schedule_eviction(self, key: Any, state: _IntervalJoinState, expires_at: int):
+        # one timer per key, records which expire earlier than it are evicted when it fires
+        if state.timer_ts is None:
+            state.timer_ts = expires_at
+            self.runtime_context.timer_service.register_event_time_timer(key, expires_at)
+
+    def on_event_time_timer(self, key: Any, timestamp: int):
+        state = self.state.get(key)
+        if state is None:
+            return
+        watermark = self.runtime_context.timer_service.current_watermark
+        state.left.evict_before(watermark - self.after_ns)
+        state.right.evict_before(watermark - self.before_ns)
+        state.timer_ts = None
+        if len(state.left) == 0 and len(state.right) == 0:
+            self.state.delete(key)
+            return
+        expires = []
+        if len(state.left) != 0:
+            expires.append(state.left.times[0] + self.after_ns)
+        if len(state.right) != 0:
+            expires.append(state.right.times[0] + self.before_ns)
+        self._schedule_eviction(key, state, min(expires))
+        self.state.put(key, state)
+
+
+@dataclass
+class _AsOfJoinState:
+    # left records wait for the watermark to pass them
+    left: TimedRecords = field(default_factory=TimedRecords)
+    right: TimedRecords = field(default_factory=TimedRecords)
+    timer_ts: Optional[int] = None
+
+
+class AsOfJoinOperator(StreamOperator, TwoInputOperator):
+    # Joins each left record with the latest right record of the same key with
+    # right.event_time <= left.event_time (and not older than tolerance_ns, if set).
+    # Left records are buffered until the watermark passes them, i.e. until all right records they can match
+    # have arrived, so the result depends on event time and not on which stream is ahead. Left records which
+    # arrive behind the watermark are late and dropped. Right records older than the latest one behind the
+    # watermark can not be the latest for any buffered or future left record and are evicted, so with no
+    # tolerance state is a single right record per key plus left records ahead of the watermark.
+    # Without watermarks left records are never joined
+
+    def __init__(self, tolerance_ns: Optional[int] = None, join_func: Optional[JoinFunction] = None):
+        super().__init__(join_func)
+        self.tolerance_ns = tolerance_ns
+        # key -> _AsOfJoinState
+        self.state: Optional[KeyedState] = None
+
+    def open(self, collectors: List[Collector], runtime_context: RuntimeContext):
+        super().open(collectors, runtime_context)
+        self.state = self.create_state('as_of_join')
+
+    def process_element(self, left: KeyRecord, right: KeyRecord):
+        if left is not None:
+            watermark = self.runtime_context.timer_service.current_watermark
+            if watermark is not None and left.event_time < watermark:
+                return
+            key = left.key
+            state = self._get_state(key)
+            state.left.add(left.event_time, left.value)
+        else:
+            key = right.key
+            state = self._get_state(key)
+            state.right.add(right.event_time, right.value)
+        self._schedule(key, state)
+        self.state.put(key, state)
+
+    def _get_state(self, key: Any) -> _AsOfJoinState:
+        state = self.state.get(key)
+        if state is None:
+            state = _AsOfJoinState()
+        return state
+
+    def _join(self, lt: int, lv: Any, right: TimedRecords):
+        latest = right.latest(lt)
+        if latest is None:
+            return
+        rt, rv = latest
+        if self.tolerance_ns is not None and lt - rt > self.tolerance_ns:
+            return
+        self.collect(Record(value=self.func.join(lv, rv), event_time=lt))
+
+    def _next_timer(self, state: _AsOfJoinState) -> Optional[int]:
+        # first left record is joined once watermark passes it, first right record is evicted
+        # once watermark passes the next one or its tolerance
+        timestamps = []
+        if len(state.left) != 0:
+            timestamps.append(state.left.times[0] + 1)
+        times = state.right.times
+        if len(times) > 1:
+            timestamps.append(times[1])
+        if self.tolerance_ns is not None and len(times) != 0:
+            timestamps.append(times[0] + self.tolerance_ns)
+        return min(timestamps, default=None)
+
+    def _schedule(self, key: Any, state: _AsOfJoinState):
+        # one timer per key, an earlier timer reschedules when it fires
+        timer_ts = self._next_timer(state)
+        if timer_ts is None or (state.timer_ts is not None and state.timer_ts <= timer_ts):
+            return
+        timer_service = self.runtime_context.timer_service
+        if state.timer_ts is not None:
+            timer_service.delete_event_time_timer(key, state.timer_ts)
+        state.timer_ts = timer_ts
+        timer_service.register_event_time_timer(key, timer_ts)
+
+    def on_event_time_timer(self, key: Any, timestamp: int):
+        state = self.state.get(key)
+        if state is None:
+            return
+        state.timer_ts = None
+        watermark = self.runtime_context.timer_service.current_watermark
+        left = state.left
+        right = state.right
+        # right records of left records behind watermark have arrived
+        ready = bisect.bisect_left(left.times, watermark)
+        for lt, lv in zip(left.times[:ready], left.values[:ready]):
+            self._join(lt, lv, right)
+        left.evict_before(watermark)
+        # keep the latest record not after watermark, buffered and future left records are not earlier than watermark
+        latest_pos = bisect.bisect_right(right.times, watermark) - 1
+        if latest_pos > 0:
+            del right.times[:latest_pos]
+            del right.values[:latest_pos]
+        if self.tolerance_ns is not None:
+            right.evict_before(watermark - self.tolerance_ns)
+        if len(left) == 0 and len(right) == 0:
+            self.state.delete(key)
+            return
+        self._schedule(key, state)
+        self.state.put(key, state)
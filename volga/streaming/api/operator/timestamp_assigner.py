@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Callable
+from datetime import datetime
+from typing import Callable, Union
 from decimal import Decimal
 
+from volga.common.time_utils import to_ts_ns
 from volga.streaming.api.message.message import Record
 
 
@@ -13,11 +15,13 @@ class TimestampAssigner(ABC):
 
 
 class EventTimeAssigner(TimestampAssigner):
+    # func may return integer (int or NumPy) nanoseconds, seconds as Decimal/float, datetime or ISO string,
+    # records get int nanoseconds. Note that integers used to be seconds: epoch seconds returned as int
+    # (e.g. int(time.time())) are read as nanoseconds, to_ts_ns warns about such implausibly small values
 
-    def __init__(self, func: Callable[[Record], Decimal]):
+    def __init__(self, func: Callable[[Record], Union[int, Decimal, float, datetime, str]]):
         self.func = func
 
     def assign_timestamp(self, record: Record) -> Record:
-        ts = self.func(record)
-        record.event_time = ts
+        record.event_time = to_ts_ns(self.func(record))
         return record
@@ -0,0 +1,48 @@
+import time
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Optional, Union
+
+from volga.common.time_utils import s_to_ns
+
+
+class WatermarkGenerator(ABC):
+    # Tracks event times seen by a source and derives watermarks from them.
+    # Source emits current watermark at most once per interval_s, and only when it advances
+
+    def __init__(self, interval_s: float):
+        self.interval_s = interval_s
+        self._last_emit_ts = None
+
+    @abstractmethod
+    def on_event(self, event_time: int):
+        pass
+
+    @abstractmethod
+    def current_watermark(self) -> Optional[int]:
+        pass
+
+    def should_emit(self) -> bool:
+        now = time.monotonic()
+        if self._last_emit_ts is None or now - self._last_emit_ts >= self.interval_s:
+            self._last_emit_ts = now
+            return True
+        return False
+
+
+class BoundedOutOfOrdernessWatermarkGenerator(WatermarkGenerator):
+    # assumes events arrive at most max_out_of_orderness_s later than events with greater event time
+
+    def __init__(self, max_out_of_orderness_s: Union[int, float, Decimal] = 0, interval_s: float = 0.2):
+        super().__init__(interval_s)
+        self.max_out_of_orderness_ns = s_to_ns(max_out_of_orderness_s)
+        self._max_event_time = None
+
+    def on_event(self, event_time: int):
+        if self._max_event_time is None or event_time > self._max_event_time:
+            self._max_event_time = event_time
+
+    def current_watermark(self) -> Optional[int]:
+        if self._max_event_time is None:
+            return None
+        return self._max_event_time - self.max_out_of_orderness_ns
@@ -1,38 +1,77 @@
 import bisect
+import functools
 from collections import deque
 from dataclasses import dataclass
-from typing import List, Optional, Callable, Deque, Dict
+from itertools import islice
+from typing import List, Optional, Callable, Deque, Dict, Tuple, Any, Union
 
 from pydantic import BaseModel
-from decimal import Decimal
 
-from volga.common.time_utils import Duration, duration_to_s
+from volga.common.time_utils import Duration, duration_to_ns
 from volga.streaming.api.collector.collector import Collector
 from volga.streaming.api.context.runtime_context import RuntimeContext
-from volga.streaming.api.function.aggregate_function import AggregationType, AllAggregateFunction
+from volga.streaming.api.function.aggregate_function import AggregationType, create_accumulator
 from volga.streaming.api.function.function import EmptyFunction
-from volga.streaming.api.function.window_function import WindowFunction, AllAggregateApplyWindowFunction
+from volga.streaming.api.function.sliding_aggregate_function import SlidingAggregate, create_sliding_aggregate, \
+    PaneSlidingAggregate, PaneMergingAggregate, SLIDING_AGGREGATION_TYPES
 from volga.streaming.api.message.message import Record, KeyRecord
 from volga.streaming.api.operator.operator import StreamOperator, OneInputOperator
+from volga.streaming.api.state.keyed_state import KeyedState
 
 
 @dataclass
 class Window:
-    records: List
-    length_s: Decimal
-    window_func: WindowFunction
+    # absolute index of the first WindowBuffer entry which belongs to this window
+    cursor: int
+    length_ns: int
+    aggregate: SlidingAggregate
+    agg_on_func: Optional[Callable]
     name: str
     agg_type: AggregationType
 
+    def agg_value(self, value: Any) -> Any:
+        return None if self.agg_type == AggregationType.COUNT else self.agg_on_func(value)
+
+
+@dataclass
+class PaneWindow:
+    aggregate: Union[PaneSlidingAggregate, PaneMergingAggregate]
+    agg_on_func: Optional[Callable]
+    name: str
+    agg_type: AggregationType
+
+    def agg_value(self, value: Any) -> Any:
+        return None if self.agg_type == AggregationType.COUNT else self.agg_on_func(value)
+
+
+@dataclass
+class WindowBuffer:
+    # per key events shared by all exact windows, holds as many events as the longest window needs
+    entries: Deque[Tuple[int, Any]]  # (event_time, record value) in event time order
+    offset: int  # absolute index of entries[0]
+    max_length_ns: int
+    windows: List[Window]
+    # pane-based windows do not keep events
+    pane_windows: List[PaneWindow]
+    # all windows in config order
+    all_windows: List[Any]
+    max_event_time: Optional[int] = None
+
 
 class SlidingWindowConfig(BaseModel):
     duration: Duration
     agg_type: AggregationType
     agg_on_func: Optional[Callable]
     name: Optional[str] = None
+    # if set, events are pre-aggregated into panes of this width and only pane partials are kept,
+    # trading precision (window may include up to one extra pane of events) for bounded memory.
+    # Required for aggregations which can not evict events (e.g. sketches), their pane partials are merged
+    pane: Optional[Duration] = None
+    # passed to accumulator of pane merged aggregations, e.g. q of APPROX_QUANTILE
+    params: Dict[str, Any] = {}
 
 
-AggregationsPerWindow = Dict[str, Decimal]  # window name agg value
+AggregationsPerWindow = Dict[str, Any]  # window name agg value
 OutputWindowFunc = Callable[[AggregationsPerWindow, Record], Record] # forms output record
 
 
@@ -45,36 +84,41 @@ class MultiWindowOperator(StreamOperator, OneInputOperator):
         output_func: Optional[OutputWindowFunc] = None
     ):
         super().__init__(EmptyFunction())
+        for conf in configs:
+            if conf.pane is None and conf.agg_type not in SLIDING_AGGREGATION_TYPES:
+                raise ValueError(f'{conf.agg_type} window aggregation requires pane, it is computed by merging pane partials')
         self.configs = configs
-        self.windows_per_key = {}
+        # key -> WindowBuffer
+        self.buffers_per_key: Optional[KeyedState] = None
         self.output_func = output_func
+        # events of a key are needed only while they can be in the same window as future events
+        self.max_length_ns = max([duration_to_ns(conf.duration) for conf in configs], default=0)
 
     def open(self, collectors: List[Collector], runtime_context: RuntimeContext):
         super().open(collectors, runtime_context)
+        self.buffers_per_key = self.create_state('window_buffers')
 
     def process_element(self, record: Record):
         assert isinstance(record, KeyRecord)
         key = record.key
-        if key in self.windows_per_key:
-            windows = self.windows_per_key[key]
-        else:
-            windows = self._create_windows()
-            self.windows_per_key[key] = windows
+        buffer = self.buffers_per_key.get(key)
+        if buffer is None:
+            buffer = self._create_buffer()
+            self.runtime_context.timer_service.register_event_time_timer(key, record.event_time + self.max_length_ns)
+        if buffer.max_event_time is None or record.event_time > buffer.max_event_time:
+            buffer.max_event_time = record.event_time
+
+        if len(buffer.windows) != 0:
+            self._add_to_buffer(buffer, record)
+        for w in buffer.pane_windows:
+            w.aggregate.add(record.event_time, w.agg_value(record.value))
+        self.buffers_per_key.put(key, buffer)
 
         aggs_per_window: AggregationsPerWindow = {}
-        for w in windows:
-
-            # this is O(logn) search + O(n) insert
-            bisect.insort_right(w.records, record, key=(lambda r: r.event_time))
-
-            # remove out of time events
-            while w.records[-1].event_time - w.records[0].event_time > w.length_s:
-                w.records.pop(0)
+        for w in buffer.all_windows:
             if w.name in aggs_per_window:
                 raise RuntimeError(f'Duplicate window names: {w.name}')
-            accum = w.window_func.apply(w.records)
-            assert isinstance(accum, AllAggregateFunction._Acc)
-            aggs_per_window[w.name] = accum.aggs[w.agg_type]
+            aggs_per_window[w.name] = w.aggregate.get_result()
 
         if self.output_func is None:
             output_record = Record(value=aggs_per_window, event_time=record.event_time)
@@ -82,19 +126,108 @@ class MultiWindowOperator(StreamOperator, OneInputOperator):
             output_record = self.output_func(aggs_per_window, record)
         self.collect(output_record)
 
-    def _create_windows(self) -> List[Window]:
+    def on_event_time_timer(self, key: Any, timestamp: int):
+        # events of keys idle for longer than the longest window can not be in a window with
+        # any on-time event, so the whole key state is dropped. Timer is not moved on every event,
+        # instead it is re-registered on fire if the key got newer events
+        buffer = self.buffers_per_key.get(key)
+        if buffer is None:
+            return
+        expires_at = buffer.max_event_time + self.max_length_ns
+        if expires_at < self.runtime_context.timer_service.current_watermark:
+            self.buffers_per_key.delete(key)
+        else:
+            self.runtime_context.timer_service.register_event_time_timer(key, expires_at)
+
+    def _add_to_buffer(self, buffer: WindowBuffer, record: Record):
+        event_time = record.event_time
+        entries = buffer.entries
+        if len(entries) == 0 or event_time >= entries[-1][0]:
+            # in order, O(1) amortized per window
+            entries.append((event_time, record.value))
+            for w in buffer.windows:
+                w.aggregate.add(w.agg_value(record.value))
+                self._evict(buffer, w)
+        else:
+            # out of order
+            if entries[-1][0] - event_time > buffer.max_length_ns:
+                # too late for all windows
+                return
+            pos = bisect.bisect_right(entries, event_time, key=(lambda e: e[0]))
+            entries.insert(pos, (event_time, record.value))
+            abs_pos = buffer.offset + pos
+            for w in buffer.windows:
+                if abs_pos < w.cursor:
+                    # inserted before the window start, so it is too late for this window
+                    w.cursor += 1
+                    continue
+                # rebuild since incremental aggregates support eviction from the oldest end only
+                w.aggregate.reset()
+                for _, value in islice(entries, w.cursor - buffer.offset, None):
+                    w.aggregate.add(w.agg_value(value))
+                self._evict(buffer, w)
+
+        # drop events which are out of all windows
+        min_cursor = min(w.cursor for w in buffer.windows)
+        while buffer.offset < min_cursor:
+            entries.popleft()
+            buffer.offset += 1
+
+    @staticmethod
+    def _evict(buffer: WindowBuffer, w: Window):
+        entries = buffer.entries
+        last_event_time = entries[-1][0]
+        while True:
+            event_time, value = entries[w.cursor - buffer.offset]
+            if last_event_time - event_time <= w.length_ns:
+                return
+            w.aggregate.evict(w.agg_value(value))
+            w.cursor += 1
+
+    def _create_buffer(self) -> WindowBuffer:
+        all_windows = self._create_windows()
+        windows = [w for w in all_windows if isinstance(w, Window)]
+        return WindowBuffer(
+            entries=deque(),
+            offset=0,
+            max_length_ns=max([w.length_ns for w in windows], default=0),
+            windows=windows,
+            pane_windows=[w for w in all_windows if isinstance(w, PaneWindow)],
+            all_windows=all_windows
+        )
+
+    def _create_windows(self) -> List[Any]:
         res = []
         for conf in self.configs:
             if conf.name is None:
                 name = f'{conf.agg_type}_{conf.duration}'
             else:
                 name = conf.name
-            agg_func = AllAggregateFunction(conf.agg_type, conf.agg_on_func)
-            window_func = AllAggregateApplyWindowFunction(agg_func)
+            if conf.pane is not None:
+                if conf.agg_type in SLIDING_AGGREGATION_TYPES:
+                    aggregate = PaneSlidingAggregate(
+                        agg_type=conf.agg_type,
+                        length_ns=duration_to_ns(conf.duration),
+                        pane_ns=duration_to_ns(conf.pane)
+                    )
+                else:
+                    aggregate = PaneMergingAggregate(
+                        create_accumulator=functools.partial(create_accumulator, conf.agg_type, **conf.params),
+                        length_ns=duration_to_ns(conf.duration),
+                        pane_ns=duration_to_ns(conf.pane)
+                    )
+                res.append(PaneWindow(
+                    aggregate=aggregate,
+                    agg_on_func=conf.agg_on_func,
+                    name=name,
+                    agg_type=conf.agg_type
+                ))
+                continue
             res.append(Window(
-                records=[],
-                length_s=duration_to_s(conf.duration),
-                window_func=window_func,
+                cursor=0,
+                length_ns=duration_to_ns(conf.duration),
+                aggregate=create_sliding_aggregate(conf.agg_type),
+                agg_on_func=conf.agg_on_func,
                 name=name,
                 agg_type=conf.agg_type
             ))
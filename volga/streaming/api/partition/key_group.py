@@ -0,0 +1,116 @@
+import hashlib
+import struct
+import zlib
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from volga.common.time_utils import datetime_to_ts_ns
+
+# Keys are hashed into a fixed number of key groups, each downstream task owns a contiguous range of them.
+# Number of key groups is the max parallelism of keyed operators: it should stay the same for the lifetime
+# of a job, so that changing parallelism only moves whole key groups (and their state) between tasks
+DEFAULT_NUM_KEY_GROUPS = 128
+
+_FLOAT = struct.Struct('<d')
+
+# type tags, so that e.g. 1 and '1' do not collide
+_NONE = b'\x00'
+_STR = b'\x01'
+_BYTES = b'\x02'
+_INT = b'\x03'
+_FLOAT_TAG = b'\x04'
+_TUPLE = b'\x05'
+_SET = b'\x06'
+_DATETIME = b'\x07'
+_DATE = b'\x08'
+_TIME = b'\x09'
+_TIMEDELTA = b'\x0a'
+
+
+def _key_bytes(key: Any) -> bytes:
+    # deterministic across processes, unlike builtin hash() of str/bytes
+    t = type(key)
+    if t is str:
+        return _STR + key.encode()
+    if t is int or t is bool:
+        return _INT + key.to_bytes((key.bit_length() + 8) // 8, 'little', signed=True)
+    if t is bytes:
+        return _BYTES + key
+    if t is float:
+        if key.is_integer():
+            # equal numbers are the same key
+            return _key_bytes(int(key))
+        return _FLOAT_TAG + _FLOAT.pack(key)
+    if t is tuple or t is list:
+        return _TUPLE + _join([_key_bytes(k) for k in key])
+    if key is None:
+        return _NONE
+    if t is set or t is frozenset:
+        # iteration order of a set depends on PYTHONHASHSEED
+        return _SET + _join(sorted(_key_bytes(k) for k in key))
+    if isinstance(key, np.generic):
+        # NumPy scalars are the same key as equal python scalars
+        return _key_bytes(key.item())
+    if t is Decimal:
+        return _key_bytes(int(key) if key == key.to_integral_value() else float(key))
+    if isinstance(key, Enum):
+        return _key_bytes(key.value)
+    if isinstance(key, datetime):
+        # equal aware datetimes in different timezones are the same key,
+        # naive ones are not converted since local timezone may differ between workers
+        if key.tzinfo is None:
+            return _DATETIME + key.isoformat().encode()
+        return _DATETIME + _key_bytes(datetime_to_ts_ns(key))
+    if isinstance(key, date):
+        return _DATE + key.isoformat().encode()
+    if isinstance(key, time):
+        return _TIME + key.isoformat().encode()
+    if isinstance(key, timedelta):
+        return _TIMEDELTA + _key_bytes(key // timedelta(microseconds=1))
+    # repr() may embed memory addresses or depend on hash seed, so the same key would go to different tasks
+    raise TypeError(f'Key of type {t.__name__} has no stable hash, use str, bytes, numbers, dates, times, enums, '
+                    f'None or tuples of them')
+
+
+def _join(parts: List[bytes]) -> bytes:
+    return b''.join(len(p).to_bytes(4, 'little') + p for p in parts)
+
+
+def _fmix32(h: int) -> int:
+    # murmur3 finalizer, spreads crc bits so that modulo of small numbers is uniform
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & 0xffffffff
+    h ^= h >> 16
+    return h
+
+
+def stable_hash(key: Any) -> int:
+    # 32-bit hash which is the same in all worker processes.
+    # crc32 is in stdlib, so all workers agree on it regardless of installed packages
+    return _fmix32(zlib.crc32(_key_bytes(key)))
+
+
+def stable_hash64(key: Any) -> int:
+    # 64-bit variant for sketches (e.g. HyperLogLog), where 32 bits collide at large cardinalities
+    return int.from_bytes(hashlib.blake2b(_key_bytes(key), digest_size=8).digest(), 'little')
+
+
+def key_group_for_key(key: Any, num_key_groups: int = DEFAULT_NUM_KEY_GROUPS) -> int:
+    return stable_hash(key) % num_key_groups
+
+
+def task_for_key_group(key_group: int, parallelism: int, num_key_groups: int = DEFAULT_NUM_KEY_GROUPS) -> int:
+    return key_group * parallelism // num_key_groups
+
+
+def key_group_range(task_index: int, parallelism: int, num_key_groups: int = DEFAULT_NUM_KEY_GROUPS) -> Tuple[int, int]:
+    # [start, end) of key groups owned by the task, inverse of task_for_key_group
+    start = (task_index * num_key_groups + parallelism - 1) // parallelism
+    end = ((task_index + 1) * num_key_groups + parallelism - 1) // parallelism
+    return start, end
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Any, List
 
+from volga.streaming.api.partition.key_group import DEFAULT_NUM_KEY_GROUPS, key_group_for_key, task_for_key_group
+
 
 class Partition(ABC):
 
@@ -23,14 +25,18 @@ class BroadcastPartition(Partition):
 
 
 class KeyPartition(Partition):
-    """Partition the record by the key."""
+    """Partition the record by the key: key is hashed to one of num_key_groups key groups,
+    each downstream task owns a contiguous range of key groups."""
 
-    def __init__(self):
+    def __init__(self, num_key_groups: int = DEFAULT_NUM_KEY_GROUPS):
         self.__partitions = [-1]
+        self.num_key_groups = num_key_groups
 
     def partition(self, record: Any, num_partition: int) -> List[int]:
-        # TODO support key group
-        self.__partitions[0] = abs(hash(record.key)) % num_partition
+        if num_partition > self.num_key_groups:
+            raise RuntimeError(f'Parallelism {num_partition} of keyed operator exceeds number of key groups {self.num_key_groups}')
+        key_group = key_group_for_key(record.key, self.num_key_groups)
+        self.__partitions[0] = task_for_key_group(key_group, num_partition, self.num_key_groups)
         return self.__partitions
 
 
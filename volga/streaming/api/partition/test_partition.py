@@ -0,0 +1,80 @@
+import datetime
+import os
+import subprocess
+import sys
+import unittest
+from collections import Counter
+from decimal import Decimal
+from enum import Enum
+
+import numpy as np
+
+from volga.streaming.api.message.message import KeyRecord
+from volga.streaming.api.partition.key_group import stable_hash, key_group_range, task_for_key_group, \
+    DEFAULT_NUM_KEY_GROUPS
+from volga.streaming.api.partition.partition import KeyPartition
+
+class _Color(Enum):
+    RED = 'red'
+
+
+KEYS = [
+    'user_1', b'bytes', 42, -7, 2 ** 70, 1.5, ('a', 1), None, frozenset(['a', 'b', 'c', 'd']),
+    datetime.date(2024, 1, 1), datetime.datetime(2024, 1, 1, 10, 30), datetime.time(10, 30), datetime.timedelta(days=1)
+]
+
+
+class TestKeyPartition(unittest.TestCase):
+
+    def test_stable_across_processes(self):
+        # builtin str hash differs between processes, stable hash should not
+        script = f'import datetime; from volga.streaming.api.partition.key_group import stable_hash; ' \
+                 f'print([stable_hash(k) for k in {KEYS!r}])'
+        outputs = set()
+        for seed in ['1', '2', '3']:
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            outputs.add(subprocess.check_output([sys.executable, '-c', script], env=env).decode().strip())
+        assert len(outputs) == 1
+        assert outputs.pop() == str([stable_hash(k) for k in KEYS])
+        # equal keys are the same key
+        assert stable_hash(1) == stable_hash(1.0) == stable_hash(True)
+        assert stable_hash(1) != stable_hash('1')
+        assert stable_hash(np.int64(1)) == stable_hash(Decimal(1)) == stable_hash(1)
+        assert stable_hash(np.float32(1.5)) == stable_hash(Decimal('1.5')) == stable_hash(1.5)
+        assert stable_hash({'a', 'b'}) == stable_hash(frozenset(['b', 'a'])) != stable_hash(('a', 'b'))
+        assert stable_hash(_Color.RED) == stable_hash('red')
+        utc = datetime.datetime(2024, 1, 1, 10, 30, tzinfo=datetime.timezone.utc)
+        assert stable_hash(utc) == stable_hash(utc.astimezone(datetime.timezone(datetime.timedelta(hours=3))))
+        assert stable_hash(datetime.date(2024, 1, 1)) != stable_hash(datetime.datetime(2024, 1, 1))
+
+        # no stable encoding, e.g. default repr contains object address
+        with self.assertRaises(TypeError):
+            stable_hash(object())
+        with self.assertRaises(TypeError):
+            KeyPartition().partition(KeyRecord(key={'a': 1}, value=None), 2)
+
+    def test_key_groups(self):
+        partition = KeyPartition()
+        counts = Counter()
+        for i in range(10000):
+            counts[partition.partition(KeyRecord(key=f'k{i}', value=None), 4)[0]] += 1
+        assert sorted(counts.keys()) == [0, 1, 2, 3]
+        assert min(counts.values()) > 2000
+
+        # every key group is owned by exactly one task
+        for parallelism in [1, 3, 7, DEFAULT_NUM_KEY_GROUPS]:
+            owned = []
+            for task_index in range(parallelism):
+                start, end = key_group_range(task_index, parallelism)
+                assert all(task_for_key_group(g, parallelism) == task_index for g in range(start, end))
+                owned.extend(range(start, end))
+            assert owned == list(range(DEFAULT_NUM_KEY_GROUPS))
+
+        with self.assertRaises(RuntimeError):
+            KeyPartition(num_key_groups=2).partition(KeyRecord(key=1, value=None), 3)
+
+
+if __name__ == '__main__':
+    t = TestKeyPartition()
+    t.test_stable_across_processes()
+    t.test_key_groups()
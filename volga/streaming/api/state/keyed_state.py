@@ -0,0 +1,262 @@
+import enum
+import os
+import pickle
+import sqlite3
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ray import cloudpickle
+
+# keys are compared by their pickled form in on-disk states, so keys which are equal but have
+# different types (1 and 1.0) are different keys there
+KEY_PICKLE_PROTOCOL = 4
+
+
+class StateBackendType(str, enum.Enum):
+    IN_MEMORY = 'in_memory'
+    SQLITE = 'sqlite'  # on-disk state in a per-task SQLite file with LRU cache in front
+
+
+class KeyedState(ABC):
+    # Per-operator map of key -> state value.
+    # Values returned by get may be copies (e.g. when read from disk), so a value modified in place
+    # should be put back for the change to be kept
+
+    @abstractmethod
+    def get(self, key: Any, default: Any = None) -> Any:
+        pass
+
+    @abstractmethod
+    def put(self, key: Any, value: Any):
+        pass
+
+    def put_all(self, items: List[Tuple[Any, Any]]):
+        for key, value in items:
+            self.put(key, value)
+
+    @abstractmethod
+    def delete(self, key: Any):
+        pass
+
+    @abstractmethod
+    def __contains__(self, key: Any) -> bool:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        pass
+
+    def keys(self) -> Iterator[Any]:
+        for key, _ in self.items():
+            yield key
+
+    def flush(self):
+        pass
+
+
+class InMemoryKeyedState(KeyedState):
+
+    def __init__(self):
+        self._data: Dict[Any, Any] = {}
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def put(self, key: Any, value: Any):
+        self._data[key] = value
+
+    def delete(self, key: Any):
+        self._data.pop(key, None)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        return iter(list(self._data.items()))
+
+
+class SqliteKeyedState(KeyedState):
+    # Table in a task's SQLite file, keys and values are pickled
+
+    def __init__(self, conn: sqlite3.Connection, table: str):
+        self._conn = conn
+        self._table = table
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (k BLOB PRIMARY KEY, v BLOB) WITHOUT ROWID')
+
+    @staticmethod
+    def _key(key: Any) -> bytes:
+        return pickle.dumps(key, protocol=KEY_PICKLE_PROTOCOL)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        row = self._conn.execute(f'SELECT v FROM {self._table} WHERE k = ?', (self._key(key),)).fetchone()
+        if row is None:
+            return default
+        return cloudpickle.loads(row[0])
+
+    def put(self, key: Any, value: Any):
+        self.put_all([(key, value)])
+
+    def put_all(self, items: List[Tuple[Any, Any]]):
+        self._conn.executemany(
+            f'INSERT OR REPLACE INTO {self._table} (k, v) VALUES (?, ?)',
+            [(self._key(key), cloudpickle.dumps(value)) for key, value in items]
+        )
+
+    def delete(self, key: Any):
+        self._conn.execute(f'DELETE FROM {self._table} WHERE k = ?', (self._key(key),))
+
+    def __contains__(self, key: Any) -> bool:
+        row = self._conn.execute(f'SELECT 1 FROM {self._table} WHERE k = ?', (self._key(key),)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._conn.execute(f'SELECT COUNT(*) FROM {self._table}').fetchone()[0]
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        for k, v in self._conn.execute(f'SELECT k, v FROM {self._table}').fetchall():
+            yield pickle.loads(k), cloudpickle.loads(v)
+
+
+class CachedKeyedState(KeyedState):
+    # LRU cache of up to capacity values in front of a slower state. Changes are written to
+    # the backing state only when values are evicted from cache (in batches) or on flush,
+    # so hot keys are never serialized
+
+    def __init__(self, backing: KeyedState, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f'Cache capacity should be positive, {capacity} given')
+        self.backing = backing
+        self.capacity = capacity
+        # evict this many values at once, so writes to backing state are batched
+        self._evict_batch_size = max(1, capacity // 10)
+        self._cache: OrderedDict = OrderedDict()
+        self._dirty = set()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.num_hits += 1
+            return self._cache[key]
+        self.num_misses += 1
+        missing = object()
+        value = self.backing.get(key, missing)
+        if value is missing:
+            return default
+        self._cache[key] = value
+        self._maybe_evict()
+        return value
+
+    def put(self, key: Any, value: Any):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        self._dirty.add(key)
+        self._maybe_evict()
+
+    def delete(self, key: Any):
+        self._cache.pop(key, None)
+        self._dirty.discard(key)
+        self.backing.delete(key)
+
+    def _maybe_evict(self):
+        if len(self._cache) <= self.capacity:
+            return
+        evicted = []
+        for _ in range(min(self._evict_batch_size, len(self._cache))):
+            key, value = self._cache.popitem(last=False)
+            if key in self._dirty:
+                self._dirty.remove(key)
+                evicted.append((key, value))
+        if len(evicted) != 0:
+            self.backing.put_all(evicted)
+
+    def flush(self):
+        if len(self._dirty) != 0:
+            self.backing.put_all([(key, self._cache[key]) for key in self._dirty])
+            self._dirty.clear()
+        self.backing.flush()
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._cache or key in self.backing
+
+    def __len__(self) -> int:
+        self.flush()
+        return len(self.backing)
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        self.flush()
+        for key, value in self.backing.items():
+            # cached value is the one operator may hold a reference to
+            yield key, self._cache.get(key, value)
+
+
+class KeyedStateBackend(ABC):
+    # Creates named keyed states for operators of a task, accessed via RuntimeContext.state_backend
+
+    @abstractmethod
+    def create_state(self, name: str) -> KeyedState:
+        pass
+
+    def close(self):
+        pass
+
+
+class InMemoryKeyedStateBackend(KeyedStateBackend):
+
+    def create_state(self, name: str) -> KeyedState:
+        return InMemoryKeyedState()
+
+
+class SqliteKeyedStateBackend(KeyedStateBackend):
+    # State which can exceed memory: values are kept in a SQLite file per task, with up to cache_capacity
+    # most recently used values per state kept in memory. File is a spill area and is deleted on close,
+    # so durability is traded for write speed (no journal, no fsync)
+
+    def __init__(self, cache_capacity: int, state_dir: Optional[str] = None):
+        if state_dir is None:
+            state_dir = tempfile.gettempdir()
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f'volga_state_{uuid.uuid4().hex[:16]}.db')
+        self.cache_capacity = cache_capacity
+        # operators access state only from task thread, but backend is created and closed from actor thread
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=OFF')
+        self._conn.execute('PRAGMA synchronous=OFF')
+        self._states: Dict[str, CachedKeyedState] = {}
+
+    def create_state(self, name: str) -> KeyedState:
+        if name in self._states:
+            raise RuntimeError(f'Duplicate state name {name}')
+        # table names are generated, so state names do not need escaping
+        state = CachedKeyedState(SqliteKeyedState(self._conn, f'state_{len(self._states)}'), self.cache_capacity)
+        self._states[name] = state
+        return state
+
+    def close(self):
+        self._conn.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def create_state_backend(
+    backend_type: StateBackendType,
+    cache_capacity: int,
+    state_dir: Optional[str] = None
+) -> KeyedStateBackend:
+    if backend_type == StateBackendType.IN_MEMORY:
+        return InMemoryKeyedStateBackend()
+    elif backend_type == StateBackendType.SQLITE:
+        return SqliteKeyedStateBackend(cache_capacity=cache_capacity, state_dir=state_dir)
+    else:
+        raise RuntimeError(f'Unsupported state backend {backend_type}')
@@ -0,0 +1,78 @@
+import os
+import random
+import unittest
+
+from volga.common.time_utils import NANOS_PER_SECOND
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.function.aggregate_function import AggregationType
+from volga.streaming.api.function.sliding_aggregate_function import SLIDING_AGGREGATION_TYPES
+from volga.streaming.api.message.message import KeyRecord, Record
+from volga.streaming.api.operator.window_operator import MultiWindowOperator, SlidingWindowConfig
+from volga.streaming.api.state.keyed_state import InMemoryKeyedState, SqliteKeyedStateBackend, CachedKeyedState
+
+
+class ListCollector(Collector):
+
+    def __init__(self):
+        self.records = []
+
+    def collect(self, record: Record):
+        self.records.append(record)
+
+
+class TestKeyedState(unittest.TestCase):
+
+    def test_cached_sqlite_state(self):
+        random.seed(5)
+        backend = SqliteKeyedStateBackend(cache_capacity=20)
+        state = backend.create_state('s')
+        expected = InMemoryKeyedState()
+        for _ in range(5000):
+            key = random.choice([random.randint(0, 100), f'k{random.randint(0, 100)}', (1, random.randint(0, 5))])
+            op = random.random()
+            if op < 0.5:
+                value = {'v': random.randint(0, 1000), 'l': [1, 2]}
+                state.put(key, value)
+                expected.put(key, value)
+            elif op < 0.6:
+                state.delete(key)
+                expected.delete(key)
+            else:
+                assert state.get(key) == expected.get(key)
+                assert (key in state) == (key in expected)
+        assert isinstance(state, CachedKeyedState)
+        assert len(state._cache) <= 20
+        assert len(state) == len(expected)
+        assert dict(state.items()) == dict(expected.items())
+        assert state.num_hits > 0 and state.num_misses > 0
+
+        with self.assertRaises(RuntimeError):
+            backend.create_state('s')
+        backend.close()
+        assert not os.path.exists(backend.path)
+
+    def test_window_state_spill(self):
+        # window buffers (including user functions) survive spill to disk
+        configs = [
+            SlidingWindowConfig(duration='10s', agg_type=t, agg_on_func=(lambda e: e['v'])) for t in SLIDING_AGGREGATION_TYPES
+        ]
+        results = []
+        for backend in [None, SqliteKeyedStateBackend(cache_capacity=3)]:
+            op = MultiWindowOperator(configs)
+            collector = ListCollector()
+            op.open([collector], RuntimeContext(
+                task_id=0, task_index=0, parallelism=1, operator_id=0, operator_name='window', state_backend=backend
+            ))
+            for i in range(500):
+                op.process_element(KeyRecord(key=i % 10, value={'v': i}, event_time=(i // 10) * NANOS_PER_SECOND))
+            results.append([r.value for r in collector.records])
+            if backend is not None:
+                backend.close()
+        assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    t = TestKeyedState()
+    t.test_cached_sqlite_state()
+    t.test_window_state_spill()
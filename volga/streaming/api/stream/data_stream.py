@@ -1,9 +1,13 @@
 from typing import List, Callable, Union, Optional
 
+from volga.common.time_utils import Duration, duration_to_s, duration_to_ns
+from volga.streaming.api.function.aggregate_function import AggregateFunction
 from volga.streaming.api.function.function import SimpleMapFunction, SimpleFlatMapFunction, \
-    SimpleFilterFunction, SimpleKeyFunction, SimpleJoinFunction, SimpleReduceFunction, SimpleSinkFunction, Function
+    SimpleFilterFunction, SimpleKeyFunction, SimpleJoinFunction, SimpleReduceFunction, SimpleSinkFunction, Function, \
+    SimpleBatchMapFunction, SimpleBatchFilterFunction
 from volga.streaming.api.operator.operator import MapOperator, FlatMapOperator, FilterOperator, \
-    ReduceOperator, StreamOperator, JoinOperator, KeyByOperator, SinkOperator
+    ReduceOperator, StreamOperator, JoinOperator, KeyByOperator, SinkOperator, AggregateOperator
+from volga.streaming.api.operator.timed_join_operator import IntervalJoinOperator, AsOfJoinOperator
 from volga.streaming.api.operator.window_operator import MultiWindowOperator, SlidingWindowConfig, OutputWindowFunc
 from volga.streaming.api.partition.partition import KeyPartition
 from volga.streaming.api.stream.stream import Stream
@@ -12,6 +16,10 @@ from volga.streaming.api.stream.stream_sink import StreamSink
 FunctionOrCallable = Union[Function, Callable]
 
 
+def _interval_s(interval: Optional[Duration]) -> Optional[float]:
+    return None if interval is None else float(duration_to_s(interval))
+
+
 class DataStream(Stream):
 
     def map(self, map_func: FunctionOrCallable) -> 'DataStream':
@@ -22,6 +30,16 @@ class DataStream(Stream):
             stream_operator=MapOperator(map_func),
         )
 
+    def map_batch(self, map_func: FunctionOrCallable, columnar: bool = False) -> 'DataStream':
+        # map_func takes a list of values (or field -> values if columnar) and returns mapped values
+        # in the same form, e.g. to use NumPy/pandas on a whole batch of records
+        if isinstance(map_func, Callable):
+            map_func = SimpleBatchMapFunction(map_func, columnar=columnar)
+        return DataStream(
+            input_stream=self,
+            stream_operator=MapOperator(map_func),
+        )
+
     def flat_map(self, flat_map_func: FunctionOrCallable) -> 'DataStream':
         if isinstance(flat_map_func, Callable):
             flat_map_func = SimpleFlatMapFunction(flat_map_func)
@@ -38,6 +56,15 @@ class DataStream(Stream):
             stream_operator=FilterOperator(filter_func),
         )
 
+    def filter_batch(self, filter_func: FunctionOrCallable, columnar: bool = False) -> 'DataStream':
+        # filter_func takes a list of values (or field -> values if columnar) and returns a boolean mask
+        if isinstance(filter_func, Callable):
+            filter_func = SimpleBatchFilterFunction(filter_func, columnar=columnar)
+        return DataStream(
+            input_stream=self,
+            stream_operator=FilterOperator(filter_func),
+        )
+
     def key_by(self, key_by_func: FunctionOrCallable) -> 'KeyDataStream':
         if isinstance(key_by_func, Callable):
             key_by_func = SimpleKeyFunction(key_by_func)
@@ -65,8 +92,11 @@ class JoinStream(DataStream):
         self,
         left_stream: DataStream,
         right_stream: DataStream,
+        join_operator: Optional[StreamOperator] = None
     ):
-        super().__init__(input_stream=left_stream, stream_operator=JoinOperator())
+        if join_operator is None:
+            join_operator = JoinOperator()
+        super().__init__(input_stream=left_stream, stream_operator=join_operator)
         self.right_stream = right_stream
 
     def with_func(self, join_func: FunctionOrCallable) -> DataStream:
@@ -86,10 +116,15 @@ class KeyDataStream(DataStream):
     ):
         super().__init__(input_stream=input_stream, stream_operator=stream_operator, partition=KeyPartition())
 
-    def reduce(self, reduce_func: FunctionOrCallable) -> DataStream:
+    def reduce(self, reduce_func: FunctionOrCallable, combine_interval: Optional[Duration] = None) -> DataStream:
+        # combine_interval enables per key pre-reduction before the shuffle, downstream then emits
+        # once per partial instead of once per record
         if isinstance(reduce_func, Callable):
             reduce_func = SimpleReduceFunction(reduce_func)
-        return DataStream(input_stream=self, stream_operator=ReduceOperator(reduce_func))
+        return DataStream(
+            input_stream=self,
+            stream_operator=ReduceOperator(reduce_func, combine_interval_s=_interval_s(combine_interval))
+        )
 
     def join(self, other: 'KeyDataStream') -> 'JoinStream':
         return JoinStream(
@@ -97,9 +132,29 @@ class KeyDataStream(DataStream):
             right_stream=other
         )
 
-    def aggregate(self, aggregate_func: FunctionOrCallable) -> DataStream:
-        # TODO implement keyed aggregation
-        raise NotImplementedError()
+    def interval_join(self, other: 'KeyDataStream', before: Duration, after: Duration) -> 'JoinStream':
+        # joins with other's records within [event_time - before, event_time + after], state is evicted by watermarks
+        return JoinStream(
+            left_stream=self,
+            right_stream=other,
+            join_operator=IntervalJoinOperator(before_ns=duration_to_ns(before), after_ns=duration_to_ns(after))
+        )
+
+    def as_of_join(self, other: 'KeyDataStream', tolerance: Optional[Duration] = None) -> 'JoinStream':
+        # joins with other's latest record not later than event_time, once watermark passes event_time.
+        # State is evicted by watermarks
+        return JoinStream(
+            left_stream=self,
+            right_stream=other,
+            join_operator=AsOfJoinOperator(tolerance_ns=None if tolerance is None else duration_to_ns(tolerance))
+        )
+
+    def aggregate(self, aggregate_func: AggregateFunction, combine_interval: Optional[Duration] = None) -> DataStream:
+        # combine_interval enables per key pre-aggregation before the shuffle, accumulators should be mergeable
+        return DataStream(
+            input_stream=self,
+            stream_operator=AggregateOperator(aggregate_func, combine_interval_s=_interval_s(combine_interval))
+        )
 
     def multi_window_agg(self, configs: List[SlidingWindowConfig], output_func: Optional[OutputWindowFunc] = None) -> DataStream:
         return DataStream(input_stream=self, stream_operator=MultiWindowOperator(configs, output_func))
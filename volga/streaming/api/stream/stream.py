@@ -39,6 +39,14 @@ class Stream(ABC):
         else:
             self.partition = partition
 
+        # if False, operator always runs in its own task, see JobGraphOptimizer
+        self.chaining_enabled = True
+
     def set_parallelism(self, parallelism: int) -> 'Stream':
         self.parallelism = parallelism
         return self
+
+    def disable_chaining(self) -> 'Stream':
+        # e.g. to give an expensive operator its own tasks and parallelism
+        self.chaining_enabled = False
+        return self
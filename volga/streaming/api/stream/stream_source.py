@@ -1,6 +1,7 @@
 from volga.streaming.api.function.function import SourceFunction
 from volga.streaming.api.operator.operator import SourceOperator
 from volga.streaming.api.operator.timestamp_assigner import TimestampAssigner
+from volga.streaming.api.operator.watermark_generator import WatermarkGenerator
 from volga.streaming.api.stream.data_stream import DataStream
 
 
@@ -16,3 +17,9 @@ class StreamSource(DataStream):
         assert isinstance(self.stream_operator, SourceOperator)
         self.stream_operator.set_timestamp_assigner(timestamp_assigner=timestamp_assigner)
         return self
+
+    def watermark_generator(self, watermark_generator: WatermarkGenerator) -> 'StreamSource':
+        # requires timestamp assigner, watermarks are derived from assigned event times
+        assert isinstance(self.stream_operator, SourceOperator)
+        self.stream_operator.set_watermark_generator(watermark_generator=watermark_generator)
+        return self
@@ -0,0 +1,13 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from volga.streaming.api.state.keyed_state import StateBackendType
+
+
+class StateConfig(BaseModel):
+    # backend for keyed operator state. With on-disk backends up to cache_capacity most recently used
+    # values per state are kept in memory, the rest is in a per-task file in state_dir (system temp dir if not set)
+    backend: StateBackendType = StateBackendType.IN_MEMORY
+    cache_capacity: int = 100000
+    state_dir: Optional[str] = None
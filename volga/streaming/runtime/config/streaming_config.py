@@ -4,10 +4,13 @@ from pydantic import BaseModel
 
 from volga.streaming.common.config.resource_config import ResourceConfig
 from volga.streaming.runtime.config.scheduler_config import SchedulerConfig
+from volga.streaming.runtime.config.state_config import StateConfig
+from volga.streaming.runtime.config.transfer_config import TransferConfig
 
 
 class StreamingWorkerConfig(BaseModel):
-    pass
+    transfer_config: TransferConfig = TransferConfig()
+    state_config: StateConfig = StateConfig()
 
 
 class StreamingMasterConfig(BaseModel):
@@ -21,4 +24,4 @@ class StreamingConfig(BaseModel):
 
     @classmethod
     def from_dict(cls, config: Dict) -> 'StreamingConfig':
-        return StreamingConfig(**config)
\ No newline at end of file
+        return StreamingConfig(**config)
@@ -1,5 +1,61 @@
 from pydantic import BaseModel
 
+from volga.streaming.runtime.transfer.codec import CodecType
+from volga.streaming.runtime.transfer.compression import CompressionType
+
 
 class TransferConfig(BaseModel):
-    pass
\ No newline at end of file
+    # serialization format for channel messages, should be the same for all workers of a job
+    codec: CodecType = CodecType.MSGPACK
+
+    # DataWriter accumulates messages per channel and sends them as a single frame
+    # when either of the limits is reached. batch_max_records = 1 disables batching
+    batch_max_records: int = 1000
+    batch_max_bytes: int = 64 * 1024
+    batch_linger_ms: float = 1
+    # on close, DataWriter waits at most writer_close_timeout_ms for pending batches to be sent
+    # (downstream may be gone already), batches which could not be sent by then are dropped
+    writer_close_timeout_ms: int = 1000
+
+    # DataReader blocks on all input channels at most reader_poll_timeout_ms at a time (to check if it is closed),
+    # and receives at most reader_max_frames_per_channel frames from a channel per wake-up
+    reader_poll_timeout_ms: int = 100
+    reader_max_frames_per_channel: int = 8
+
+    # credit-based flow control (transfer v2): writer keeps up to buffer_pool_capacity_bytes of frames
+    # per channel and sends a frame only after reader grants a credit for it,
+    # credits_per_channel is the max number of in-flight frames per channel
+    credit_based_flow_control: bool = False
+    buffer_pool_capacity_bytes: int = 4 * 1024 * 1024
+    credits_per_channel: int = 16
+
+    # if set, channels between workers on the same node pass frames through a shared memory ring buffer
+    # of shared_memory_capacity_bytes, frames which do not fit fall back to the socket. Each local channel has
+    # its own ring in /dev/shm (N x M rings for N x M shuffle), channels fall back to the socket if it is short on space
+    shared_memory_local_channels: bool = False
+    shared_memory_capacity_bytes: int = 2 * 1024 * 1024
+
+    # channels between workers on different nodes go through per-node TransferActors, which share
+    # one connection per pair of nodes between all channels. Not supported with credit-based flow control.
+    # A TransferActor queues up to multiplexer_max_pending_frames frames per blocked destination before
+    # it stops reading the input feeding it, so a slow reader does not stall channels of other readers
+    multiplex_remote_channels: bool = False
+    multiplexer_max_pending_frames: int = 1024
+
+    # all sockets of a worker process share one zmq context with zmq_io_threads I/O threads.
+    # HWMs bound per-socket queues (in frames, 0 is unlimited), kernel buffer sizes are in bytes, 0 keeps OS defaults
+    zmq_io_threads: int = 1
+    zmq_sndhwm: int = 100
+    zmq_rcvhwm: int = 100
+    zmq_sndbuf: int = 0
+    zmq_rcvbuf: int = 0
+
+    # batch frames of at least compression_min_bytes are compressed on channels between different nodes,
+    # shared memory channels are never compressed
+    compression: CompressionType = CompressionType.NONE
+    compression_min_bytes: int = 1024
+    compress_local_channels: bool = False
+
+    # batches of messages with the same structure are sent column-wise, field names are sent once per channel.
+    # Messages are encoded on flush instead of on write, so nested field values should not be modified after emit
+    columnar_batches: bool = False
@@ -1,7 +1,7 @@
 from typing import List
 
 from volga.streaming.api.collector.collector import Collector
-from volga.streaming.api.message.message import Record
+from volga.streaming.api.message.message import Record, Watermark
 from volga.streaming.api.partition.partition import Partition
 from volga.streaming.runtime.transfer.data_writer import DataWriter
 
@@ -22,3 +22,8 @@ class OutputCollector(Collector):
         partitions = self.partition. partition(record=record, num_partition=len(self.output_channel_ids))
         for partition in partitions:
             self.data_writer.write_record(self.output_channel_ids[partition], record)
+
+    def emit_watermark(self, watermark: Watermark):
+        # watermarks are not partitioned, every downstream task should see event time progress
+        for channel_id in self.output_channel_ids:
+            self.data_writer.write_watermark(channel_id, watermark)
@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from ray.actor import ActorHandle
 
@@ -8,6 +8,7 @@ from volga.streaming.api.operator.operator import StreamOperator
 from volga.streaming.api.partition.partition import RoundRobinPartition, Partition, ForwardPartition
 
 from volga.streaming.common.config.resource_config import ResourceConfig
+from volga.streaming.runtime.config.streaming_config import StreamingWorkerConfig
 from volga.streaming.runtime.master.resource_manager.resource_manager import \
     Resources, RESOURCE_KEY_CPU, RESOURCE_KEY_GPU, RESOURCE_KEY_MEM
 from volga.streaming.runtime.transfer.channel import Channel
@@ -22,11 +23,13 @@ class ExecutionEdge:
         self,
         source_execution_vertex: 'ExecutionVertex',
         target_execution_vertex: 'ExecutionVertex',
-        partition: Partition
+        partition: Partition,
+        is_join_right_edge: bool = False
     ):
         self.source_execution_vertex = source_execution_vertex
         self.target_execution_vertex = target_execution_vertex
         self.partition = partition
+        self.is_join_right_edge = is_join_right_edge
         self.id = self._gen_id()
         self.channel = None
 
@@ -59,6 +62,7 @@ class ExecutionVertex:
         self.output_edges: List[ExecutionEdge] = []
         self.worker = None
         self.worker_network_info = None
+        self.worker_config = StreamingWorkerConfig()
 
     def _gen_id(self) -> str:
         return f'{self.job_vertex.vertex_id}_{self.execution_vertex_index}'
@@ -69,6 +73,22 @@ class ExecutionVertex:
     def get_input_channels(self) -> List[Channel]:
         return [e.channel for e in self.input_edges]
 
+    def get_join_stream_names(self) -> Tuple[str, str]:
+        # (left, right) stream names of a two input vertex, right input comes over edges marked as join right edges,
+        # stream name is the id of the (possibly chained) upstream job vertex
+        left_ids = set()
+        right_ids = set()
+        for input_edge in self.input_edges:
+            vertex_id = input_edge.source_execution_vertex.job_vertex.vertex_id
+            if input_edge.is_join_right_edge:
+                right_ids.add(vertex_id)
+            else:
+                left_ids.add(vertex_id)
+        if len(left_ids) != 1 or len(right_ids) != 1:
+            raise RuntimeError(f'Two input vertex should have exactly 1 left and 1 right input, '
+                               f'{len(left_ids)} left and {len(right_ids)} right given')
+        return str(left_ids.pop()), str(right_ids.pop())
+
     def set_worker(self, worker: ActorHandle):
         self.worker = worker
 
@@ -78,6 +98,9 @@ class ExecutionVertex:
     def set_worker_network_info(self, info: 'WorkerNetworkInfo'):
         self.worker_network_info = info
 
+    def set_worker_config(self, worker_config: StreamingWorkerConfig):
+        self.worker_config = worker_config
+
 
 class ExecutionGraph:
 
@@ -128,7 +151,8 @@ class ExecutionGraph:
                     edge = ExecutionEdge(
                         source_execution_vertex=source_exec_vertex,
                         target_execution_vertex=target_exec_vertex,
-                        partition=partition
+                        partition=partition,
+                        is_join_right_edge=job_edge.is_join_right_edge
                     )
                     source_exec_vertex.output_edges.append(edge)
                     target_exec_vertex.input_edges.append(edge)
@@ -183,5 +207,9 @@ class ExecutionGraph:
             execution_vertex.set_resources(resources)
         logger.info(f'Set execution graph resources')
 
+    def set_worker_config(self, worker_config: StreamingWorkerConfig):
+        for execution_vertex in self.execution_vertices_by_id.values():
+            execution_vertex.set_worker_config(worker_config)
+
 
 
@@ -4,6 +4,7 @@ import unittest
 from volga.streaming.api.context.streaming_context import StreamingContext
 from volga.streaming.api.job_graph.job_graph import JobGraph
 from volga.streaming.api.job_graph.job_graph_builder import JobGraphBuilder
+from volga.streaming.api.job_graph.job_graph_optimizer import JobGraphOptimizer
 from volga.streaming.api.partition.partition import RoundRobinPartition
 from volga.streaming.runtime.core.execution_graph.execution_graph import ExecutionGraph
 
@@ -21,6 +22,37 @@ class TestExecutionGraph(unittest.TestCase):
         assert len(eg.execution_vertices_by_id.values()) == 6
         assert isinstance(eg.execution_vertices_by_id['2_1'].output_edges[0].partition, RoundRobinPartition)
 
+    def test_join_stream_names(self):
+        # right stream is created first, so it has lower ids than the left one
+        ctx = StreamingContext()
+        right = ctx.from_values((1, 'b'), (2, 'b')).set_parallelism(2).key_by(lambda x: x[0])
+        left = ctx.from_values((1, 'a'), (2, 'a')).set_parallelism(2).key_by(lambda x: x[0])
+        assert right.id < left.id
+        sink = left.join(right).with_func(lambda x, y: (x, y)).set_parallelism(2).sink(lambda x: logger.info(x))
+        eg = ExecutionGraph.from_job_graph(JobGraphBuilder(stream_sinks=[sink]).build())
+        join_vertices = self._join_vertices(eg)
+        assert len(join_vertices) == 2
+        for join_vertex in join_vertices:
+            assert join_vertex.get_join_stream_names() == (str(left.id), str(right.id))
+
+    def test_join_stream_names_chained_left(self):
+        # left input is chained with its source, its stream name is the id of the merged vertex
+        ctx = StreamingContext()
+        left_source = ctx.from_values((1, 'a'), (2, 'a'))
+        left = left_source.map(lambda x: x).key_by(lambda x: x[0])
+        right = ctx.from_values((1, 'b'), (2, 'b')).key_by(lambda x: x[0])
+        sink = left.join(right).with_func(lambda x, y: (x, y)).sink(lambda x: logger.info(x))
+        jg = JobGraphOptimizer(JobGraphBuilder(stream_sinks=[sink]).build()).optimize()
+        eg = ExecutionGraph.from_job_graph(jg)
+        [join_vertex] = self._join_vertices(eg)
+        [left_vertex] = [e.source_execution_vertex for e in join_vertex.input_edges if not e.is_join_right_edge]
+        assert len(left_vertex.stream_operator.operators) == 3
+        # merged vertex writes records with its operator id
+        assert left_vertex.stream_operator.id == left.id
+        assert join_vertex.get_join_stream_names() == (str(left.id), str(right.id))
+
+    def _join_vertices(self, eg: ExecutionGraph):
+        return [v for v in eg.execution_vertices_by_id.values() if any(e.is_join_right_edge for e in v.input_edges)]
 
     def _build_sample_job_graph(self) -> JobGraph:
         ctx = StreamingContext()
@@ -35,4 +67,6 @@ class TestExecutionGraph(unittest.TestCase):
 
 if __name__ == '__main__':
     t = TestExecutionGraph()
-    t.test_from_job_graph()
\ No newline at end of file
+    t.test_from_job_graph()
+    t.test_join_stream_names()
+    t.test_join_stream_names_chained_left()
\ No newline at end of file
@@ -1,9 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
 from volga.streaming.api.collector.collector import Collector
 from volga.streaming.api.context.runtime_context import RuntimeContext
-from volga.streaming.api.message.message import Record
+from volga.streaming.api.message.message import Record, Watermark
 from volga.streaming.api.operator.operator import OneInputOperator, Operator, SourceOperator, \
     StreamOperator, OperatorType
 
@@ -18,6 +18,10 @@ class Processor(ABC):
     def process(self, record: Record):
         pass
 
+    def process_batch(self, records: List[Record]):
+        for record in records:
+            self.process(record)
+
     @abstractmethod
     def close(self):
         pass
@@ -51,6 +55,15 @@ class StreamProcessor(Processor, ABC):
         self.runtime_context = runtime_context
         self.operator.open(collectors=collectors, runtime_context=runtime_context)
 
+    def process_watermark(self, watermark: Watermark):
+        self.operator.advance_watermark(watermark)
+
+    def process_processing_time(self, now: float):
+        self.operator.advance_processing_time(now)
+
+    def next_processing_time(self) -> Optional[float]:
+        return self.operator.next_processing_time()
+
     def close(self):
         self.operator.close()
 
@@ -65,6 +78,9 @@ class OneInputProcessor(StreamProcessor):
     def process(self, record: Record):
         self.operator.process_element(record)
 
+    def process_batch(self, records: List[Record]):
+        self.operator.process_batch(records)
+
 
 class TwoInputProcessor(StreamProcessor):
     def __init__(self, two_input_operator: OneInputOperator):
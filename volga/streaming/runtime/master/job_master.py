@@ -21,6 +21,7 @@ class JobMaster:
     def __init__(self, job_config: Optional[Dict]):
         streaming_config = StreamingConfig.from_dict(job_config)
         self.master_config = streaming_config.master_config
+        self.worker_config = streaming_config.worker_config_template
         self.runtime_context = JobMasterRuntimeContext(streaming_config)
         self.job_scheduler = JobScheduler(
             job_master=ray.get_runtime_context().current_actor,
@@ -39,6 +40,9 @@ class JobMaster:
         # set resources
         execution_graph.set_resources(self.master_config.resource_config)
 
+        # set worker configs
+        execution_graph.set_worker_config(self.worker_config)
+
         self.runtime_context.execution_graph = execution_graph
         self.runtime_context.job_graph = job_graph
 
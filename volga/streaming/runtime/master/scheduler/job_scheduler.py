@@ -14,7 +14,10 @@ class JobScheduler:
 
     def __init__(self, job_master: ActorHandle, runtime_context: JobMasterRuntimeContext):
         self.runtime_context = runtime_context
-        self.worker_lifecycle_controller = WorkerLifecycleController(job_master)
+        self.worker_lifecycle_controller = WorkerLifecycleController(
+            job_master,
+            runtime_context.streaming_config.worker_config_template.transfer_config
+        )
 
     def schedule_job(self) -> bool:
         self._prepare_job_submission()
@@ -46,4 +49,5 @@ class JobScheduler:
         self.worker_lifecycle_controller.delete_workers(
             list(self.runtime_context.execution_graph.execution_vertices_by_id.values())
         )
+        self.worker_lifecycle_controller.delete_transfer_actors()
         return True
@@ -72,6 +72,24 @@ class TestStreamingJobE2E(unittest.TestCase):
         # assert expected == sorted(res, key=lambda x: x[0][0])
         print('assert ok')
 
+    def test_join_streams_right_first(self):
+        # right stream is created before the left one and left input is chained with a map,
+        # join function should still get (left, right) pairs
+        num_events = 100
+        right = self.ctx.from_collection([(i + 1, f'b{i + 1}') for i in range(num_events)]).key_by(lambda x: x[0])
+        left_source = self.ctx.from_collection([(i, f'a{i}') for i in range(num_events)])
+
+        sink_cache = SinkCacheActor.remote()
+        left_source.map(lambda x: (x[0], x[1].upper())) \
+            .key_by(lambda x: x[0]) \
+            .join(right) \
+            .with_func(lambda x, y: (x[0], x[1], y[1])) \
+            .sink(SinkToCacheFunction(sink_cache))
+        ctx.execute()
+        res = ray.get(sink_cache.get_values.remote())
+        assert sorted(tuple(r) for r in res) == [(i, f'A{i}', f'b{i}') for i in range(1, num_events)]
+        print('assert ok')
+
     def test_window(self):
         s = self.ctx.from_collection([
             *[('k1', i) for i in range(100)],
@@ -131,6 +149,7 @@ if __name__ == '__main__':
         t = TestStreamingJobE2E(ctx)
         # TODO should reset context on each call
         t.test_join_streams()
+        # t.test_join_streams_right_first()
         # t.test_window()
         # t.test_delayed_collection_source()
         # t.test_parallel_collection_source()
@@ -1,13 +1,18 @@
 import logging
+import tempfile
 import time
+import uuid
 from random import randint
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
 import ray
 from ray.actor import ActorHandle
+from ray.util.scheduling_strategies import NodeAffinitySchedulingStrategy
 
+from volga.streaming.runtime.config.transfer_config import TransferConfig
 from volga.streaming.runtime.core.execution_graph.execution_graph import ExecutionGraph, ExecutionVertex
-from volga.streaming.runtime.transfer.channel import Channel
+from volga.streaming.runtime.transfer.channel import Channel, TransportType
+from volga.streaming.runtime.transfer.v2.transfer_actor import TransferActor
 from volga.streaming.runtime.worker.job_worker import JobWorker
 
 VALID_PORT_RANGE = (30000, 65000)
@@ -28,9 +33,14 @@ class WorkerNetworkInfo:
 
 class WorkerLifecycleController:
 
-    def __init__(self, job_master: ActorHandle):
+    def __init__(self, job_master: ActorHandle, transfer_config: Optional[TransferConfig] = None):
         self.job_master = job_master
+        if transfer_config is None:
+            transfer_config = TransferConfig()
+        self.transfer_config = transfer_config
         self._used_ports = {}
+        # node_id -> (actor, address for local writers, address for other nodes' actors)
+        self._transfer_actors: Dict[str, Tuple[ActorHandle, str, str]] = {}
 
     def create_workers(self, execution_graph: ExecutionGraph):
         workers = {}
@@ -76,22 +86,86 @@ class WorkerLifecycleController:
         logger.info(f'Created {len(workers)} workers')
         logger.info(f'Workers writer network info: {worker_infos}')
 
+        if self.transfer_config.multiplex_remote_channels:
+            if self.transfer_config.credit_based_flow_control:
+                raise RuntimeError('Multiplexing remote channels is not supported with credit-based flow control')
+            self._create_transfer_actors(execution_graph)
+
+    def _create_transfer_actors(self, execution_graph: ExecutionGraph):
+        # one TransferActor per node with workers
+        nodes = {}
+        for vertex in execution_graph.execution_vertices_by_id.values():
+            ni: WorkerNetworkInfo = vertex.worker_network_info
+            nodes[ni.node_id] = ni.node_ip
+        for node_id in nodes:
+            node_ip = nodes[node_id]
+            local_addr = f'ipc://{tempfile.gettempdir()}/volga_mux_{uuid.uuid4().hex[:16]}'
+            remote_port = self._gen_port(node_ip)
+            actor = TransferActor.options(
+                num_cpus=0,
+                scheduling_strategy=NodeAffinitySchedulingStrategy(node_id=node_id, soft=False)
+            ).remote(
+                name=f'transfer_actor_{node_ip}',
+                local_addr=local_addr,
+                remote_port=remote_port,
+                config=self.transfer_config
+            )
+            self._transfer_actors[node_id] = (actor, local_addr, f'tcp://{node_ip}:{remote_port}')
+        logger.info(f'Created {len(self._transfer_actors)} transfer actors')
+
     # construct channels based on Ray assigned actor IPs and update execution_graph
     def connect_and_init_workers(self, execution_graph: ExecutionGraph):
         logger.info(f'Initing {len(execution_graph.execution_vertices_by_id)} workers...')
 
+        # per-node routing tables for transfer actors, channel_id -> next hop address
+        routes: Dict[str, Dict[str, str]] = {node_id: {} for node_id in self._transfer_actors}
+        reader_addrs: Dict[str, str] = {}
+
         # create channels
         for edge in execution_graph.execution_edges:
             worker_network_info: WorkerNetworkInfo = edge.source_execution_vertex.worker_network_info
             if worker_network_info is None:
                 raise RuntimeError(f'Vertex {edge.source_execution_vertex.job_vertex.get_name()} has no worker network info')
 
+            target_network_info: WorkerNetworkInfo = edge.target_execution_vertex.worker_network_info
+
+            # co-located workers exchange frames via shared memory, sockets are used for signaling only
+            is_local = target_network_info is not None and target_network_info.node_id == worker_network_info.node_id
+            transport_type = TransportType.ZMQ_PUSH_PULL
+            shm_name = None
+            if self.transfer_config.shared_memory_local_channels and is_local:
+                transport_type = TransportType.RAY_SHARED_MEM
+                shm_name = f'volga_{uuid.uuid4().hex[:16]}'
+
+            # cross-node channels go through transfer actors of source and target nodes
+            multiplexer_addr = None
+            reader_addr = None
+            if len(self._transfer_actors) != 0 and target_network_info is not None and not is_local:
+                transport_type = TransportType.MULTIPLEXED
+                target_vertex_id = edge.target_execution_vertex.execution_vertex_id
+                if target_vertex_id not in reader_addrs:
+                    reader_addrs[target_vertex_id] = f'ipc://{tempfile.gettempdir()}/volga_reader_{uuid.uuid4().hex[:16]}'
+                reader_addr = reader_addrs[target_vertex_id]
+                _, multiplexer_addr, _ = self._transfer_actors[worker_network_info.node_id]
+                _, _, target_actor_addr = self._transfer_actors[target_network_info.node_id]
+                routes[worker_network_info.node_id][edge.id] = target_actor_addr
+                routes[target_network_info.node_id][edge.id] = reader_addr
+
             edge.set_channel(Channel(
                 channel_id=edge.id,
                 source_ip=worker_network_info.node_ip,
-                source_port=worker_network_info.out_edges_ports[edge.id]
+                source_port=worker_network_info.out_edges_ports[edge.id],
+                transport_type=transport_type,
+                shm_name=shm_name,
+                multiplexer_addr=multiplexer_addr,
+                reader_addr=reader_addr,
+                is_local=is_local
             ))
 
+        # start transfer actors before workers so writers can connect to them
+        if len(self._transfer_actors) != 0:
+            ray.get([self._transfer_actors[node_id][0].start.remote(routes[node_id]) for node_id in routes])
+
         # init workers
         f = []
         for execution_vertex in execution_graph.execution_vertices_by_id.values():
@@ -141,6 +215,15 @@ class WorkerLifecycleController:
         for w in workers:
             w.exit.remote()
 
+    def delete_transfer_actors(self):
+        if len(self._transfer_actors) == 0:
+            return
+        actors = [self._transfer_actors[node_id][0] for node_id in self._transfer_actors]
+        ray.wait([a.close.remote() for a in actors], timeout=5, num_returns=len(actors))
+        for a in actors:
+            ray.kill(a)
+        self._transfer_actors = {}
+
     def _gen_port(self, node_id) -> int:
         while True:
             port = randint(VALID_PORT_RANGE[0], VALID_PORT_RANGE[1])
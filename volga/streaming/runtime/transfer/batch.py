@@ -0,0 +1,39 @@
+import struct
+from typing import List, Union
+
+# Frame layout:
+# | flags: uint8 | num_messages: uint32 | len_0 ... len_n-1: uint32 | payload_0 ... payload_n-1 |
+# all ints are little-endian, payloads are codec-encoded channel messages.
+# Lower bits of flags hold compression id, in compressed frames everything after the header is compressed.
+# COLUMNAR_FLAG marks frames with columnar body (see columnar.py) instead of lengths and payloads
+
+BATCH_HEADER = struct.Struct('<BI')
+COMPRESSION_MASK = 0x0F
+COLUMNAR_FLAG = 0x10
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def encode_batch(payloads: List[bytes], flags: int = 0) -> bytes:
+    n = len(payloads)
+    lengths = struct.pack(f'<{n}I', *map(len, payloads))
+    return b''.join([BATCH_HEADER.pack(flags, n), lengths, *payloads])
+
+
+def decode_batch(data: BytesLike) -> List[memoryview]:
+    # returns zero-copy views into data, one per message
+    flags, n = BATCH_HEADER.unpack_from(data, 0)
+    if flags & COMPRESSION_MASK != 0:
+        raise RuntimeError('Batch is compressed, it should be decompressed first')
+    if flags & COLUMNAR_FLAG != 0:
+        raise RuntimeError('Batch is columnar')
+    lengths = struct.unpack_from(f'<{n}I', data, BATCH_HEADER.size)
+    view = memoryview(data)
+    offset = BATCH_HEADER.size + 4 * n
+    res = []
+    for length in lengths:
+        res.append(view[offset: offset + length])
+        offset += length
+    if offset != len(view):
+        raise RuntimeError(f'Malformed batch: expected {offset} bytes, got {len(view)}')
+    return res
@@ -1,17 +1,42 @@
-from typing import Any, Dict
+import enum
+from typing import Any, Dict, Optional
 
 ChannelMessage = Dict[str, Any]
 
 
+class TransportType(enum.Enum):
+    ZMQ_PUSH_PULL = 1
+    ZMQ_PUB_SUB = 2
+    RAY_SHARED_MEM = 3
+    # frames go through per-node TransferActors which share connections between channels
+    MULTIPLEXED = 4
+
+
 class Channel:
     def __init__(
         self,
         channel_id: str, # should be exec_edge_id?
         source_ip: str,
         source_port: int,
+        transport_type: TransportType = TransportType.ZMQ_PUSH_PULL,
+        shm_name: Optional[str] = None,
+        multiplexer_addr: Optional[str] = None,
+        reader_addr: Optional[str] = None,
+        is_local: bool = False
     ):
         self.channel_id = channel_id
         self.source_ip = source_ip
         self.source_port = source_port
-
-
+        self.transport_type = transport_type
+        # name of shared memory segment for RAY_SHARED_MEM channels
+        self.shm_name = shm_name
+        # for MULTIPLEXED channels writer sends to source node's TransferActor at multiplexer_addr
+        # and reader receives from target node's TransferActor at reader_addr
+        self.multiplexer_addr = multiplexer_addr
+        self.reader_addr = reader_addr
+        # source and target workers are on the same node
+        self.is_local = is_local
+        if transport_type == TransportType.RAY_SHARED_MEM and shm_name is None:
+            raise RuntimeError(f'Channel {channel_id} uses shared memory transport but has no shm_name')
+        if transport_type == TransportType.MULTIPLEXED and (multiplexer_addr is None or reader_addr is None):
+            raise RuntimeError(f'Channel {channel_id} uses multiplexed transport but has no addresses')
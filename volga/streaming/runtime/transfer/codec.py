@@ -0,0 +1,124 @@
+import datetime
+import enum
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Any, Callable, Dict, Type, Tuple
+
+import msgpack
+import simplejson
+
+from volga.streaming.runtime.transfer.channel import ChannelMessage
+
+
+class CodecType(str, enum.Enum):
+    JSON = 'json'
+    MSGPACK = 'msgpack'
+
+
+class Codec(ABC):
+    # Serializes channel messages to bytes sent over the wire and back
+
+    @abstractmethod
+    def encode(self, message: ChannelMessage) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> ChannelMessage:
+        pass
+
+
+class JsonCodec(Codec):
+    # legacy text codec, note that Decimals are decoded back as floats
+
+    def encode(self, message: ChannelMessage) -> bytes:
+        return simplejson.dumps(message).encode()
+
+    def decode(self, data: bytes) -> ChannelMessage:
+        # data can be a memoryview into a batch frame
+        return simplejson.loads(bytes(data))
+
+
+ExtEncoder = Callable[[Any], bytes]
+ExtDecoder = Callable[[bytes], Any]
+
+# msgpack ext type code -> (type, encoder, decoder)
+_ext_types: Dict[int, Tuple[Type, ExtEncoder, ExtDecoder]] = {}
+_ext_codes: Dict[Type, int] = {}
+
+
+def register_ext_type(code: int, cls: Type, encoder: ExtEncoder, decoder: ExtDecoder):
+    """
+    Registers custom type for binary codecs. Registration is process-local, so it should happen
+    at import time of a module which is imported by both writing and reading workers.
+
+    Args:
+        code: msgpack ext type code, 0 - 127
+        cls: python type to handle
+        encoder: serializes instance of cls to bytes
+        decoder: restores instance of cls from bytes
+    """
+    if code < 0 or code > 127:
+        raise ValueError(f'Ext type code should be in [0, 127], {code} given')
+    if code in _ext_types and _ext_types[code][0] is not cls:
+        raise ValueError(f'Ext type code {code} is already registered for {_ext_types[code][0]}')
+    _ext_types[code] = (cls, encoder, decoder)
+    _ext_codes[cls] = code
+
+
+def _ext_default(obj: Any) -> msgpack.ExtType:
+    code = _ext_codes.get(type(obj))
+    if code is None:
+        # subclasses of registered types
+        for cls in _ext_codes:
+            if isinstance(obj, cls):
+                code = _ext_codes[cls]
+                break
+    if code is None:
+        raise TypeError(f'Can not serialize object of type {type(obj)}, use register_ext_type')
+    encoder = _ext_types[code][1]
+    return msgpack.ExtType(code, encoder(obj))
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code not in _ext_types:
+        return msgpack.ExtType(code, data)
+    decoder = _ext_types[code][2]
+    return decoder(data)
+
+
+register_ext_type(1, Decimal, lambda d: str(d).encode(), lambda b: Decimal(b.decode()))
+register_ext_type(
+    2,
+    datetime.datetime,
+    lambda dt: dt.isoformat().encode(),
+    lambda b: datetime.datetime.fromisoformat(b.decode())
+)
+register_ext_type(
+    3,
+    datetime.date,
+    lambda d: d.isoformat().encode(),
+    lambda b: datetime.date.fromisoformat(b.decode())
+)
+
+
+class MsgpackCodec(Codec):
+    # binary codec, custom types are handled via register_ext_type
+
+    def __init__(self):
+        # packer keeps internal buffer between calls, so it is not thread safe
+        self._packer = msgpack.Packer(default=_ext_default, use_bin_type=True)
+
+    def encode(self, message: ChannelMessage) -> bytes:
+        return self._packer.pack(message)
+
+    def decode(self, data: bytes) -> ChannelMessage:
+        return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def get_codec(codec_type: CodecType) -> Codec:
+    if codec_type == CodecType.JSON:
+        return JsonCodec()
+    elif codec_type == CodecType.MSGPACK:
+        return MsgpackCodec()
+    else:
+        raise RuntimeError(f'Unsupported codec {codec_type}')
@@ -0,0 +1,168 @@
+from typing import List, Tuple, Optional, Dict, Any, Union
+
+from volga.streaming.api.message.message import Record, KeyRecord
+from volga.streaming.runtime.transfer.batch import BATCH_HEADER, BytesLike, COLUMNAR_FLAG
+from volga.streaming.runtime.transfer.channel import ChannelMessage
+from volga.streaming.runtime.transfer.codec import Codec
+
+# Columnar frame layout:
+# | flags: uint8 (COLUMNAR_FLAG set) | num_messages: uint32 | body |
+# body is codec-encoded [schema_id, schema or None, const_mask, columns].
+#
+# Schema is the structure shared by all messages of a batch: message keys plus value field names
+# (if value is a dict). It is sent only with the first frame which uses it, after that frames refer to
+# it by id, so field names are not re-serialized. Columns whose values are the same for the whole batch
+# (e.g. stream_name) are sent as a single value, marked in const_mask.
+# Batches with non-uniform messages are sent in row format.
+
+VALUE_KEY = 'value'
+
+# (message keys, value field names or None if value is not a dict)
+Schema = Tuple[Tuple[str, ...], Optional[Tuple[str, ...]]]
+
+# message keys of records and keyed records, see Record.to_channel_message
+_RECORD_KEYS = frozenset(['value', 'stream_name', 'event_time'])
+_KEY_RECORD_KEYS = frozenset(['key', 'value', 'stream_name', 'event_time'])
+
+
+def is_columnar(data: BytesLike) -> bool:
+    return data[0] & COLUMNAR_FLAG != 0
+
+
+def _get_schema(message: ChannelMessage) -> Schema:
+    value = message.get(VALUE_KEY)
+    value_fields = tuple(value.keys()) if isinstance(value, dict) else None
+    return tuple(message.keys()), value_fields
+
+
+def _is_const(column: List[Any]) -> bool:
+    first = column[0]
+    t = type(first)
+    for v in column:
+        # compare types as well, so 1 and True are not merged
+        if type(v) is not t or v != first:
+            return False
+    return True
+
+
+class ColumnarEncoder:
+    # Per channel, remembers schemas already sent to the reader
+
+    def __init__(self, codec: Codec):
+        self.codec = codec
+        self._schema_ids: Dict[Schema, int] = {}
+
+    def encode(self, messages: List[ChannelMessage]) -> Optional[bytes]:
+        # returns None if messages do not share the same schema
+        if len(messages) == 0:
+            return None
+        schema = _get_schema(messages[0])
+        keys, value_fields = schema
+        for message in messages:
+            if _get_schema(message) != schema:
+                return None
+
+        columns = []
+        for key in keys:
+            if key == VALUE_KEY and value_fields is not None:
+                values = [m[VALUE_KEY] for m in messages]
+                for field in value_fields:
+                    columns.append([v[field] for v in values])
+            else:
+                columns.append([m[key] for m in messages])
+
+        const_mask = 0
+        for i in range(len(columns)):
+            if len(messages) > 1 and _is_const(columns[i]):
+                const_mask |= 1 << i
+                columns[i] = columns[i][0]
+
+        schema_def = None
+        if schema not in self._schema_ids:
+            self._schema_ids[schema] = len(self._schema_ids)
+            schema_def = [list(keys), None if value_fields is None else list(value_fields)]
+        body = self.codec.encode([self._schema_ids[schema], schema_def, const_mask, columns])
+        return b''.join([BATCH_HEADER.pack(COLUMNAR_FLAG, len(messages)), body])
+
+
+class ColumnarDecoder:
+    # Per channel, keeps schemas announced by the writer
+
+    def __init__(self, codec: Codec):
+        self.codec = codec
+        self._schemas: Dict[int, Schema] = {}
+
+    def _decode_body(self, data: BytesLike) -> Tuple[int, Schema, int, List[Any]]:
+        _, n = BATCH_HEADER.unpack_from(data, 0)
+        schema_id, schema_def, const_mask, columns = self.codec.decode(memoryview(data)[BATCH_HEADER.size:])
+        if schema_def is not None:
+            keys, value_fields = schema_def
+            self._schemas[schema_id] = (tuple(keys), None if value_fields is None else tuple(value_fields))
+        if schema_id not in self._schemas:
+            raise RuntimeError(f'Unknown columnar schema id {schema_id}')
+        return n, self._schemas[schema_id], const_mask, columns
+
+    def decode_columns(self, data: BytesLike) -> Tuple[int, Dict[str, Any]]:
+        # returns number of messages and columns by name without building per-message dicts,
+        # const columns are single values, value fields are named 'value.<field>'
+        n, (keys, value_fields), _, columns = self._decode_body(data)
+        names = []
+        for key in keys:
+            if key == VALUE_KEY and value_fields is not None:
+                names.extend(f'{VALUE_KEY}.{field}' for field in value_fields)
+            else:
+                names.append(key)
+        return n, dict(zip(names, columns))
+
+    @staticmethod
+    def _expand_const_columns(n: int, const_mask: int, columns: List[Any]):
+        for i in range(len(columns)):
+            if const_mask & (1 << i):
+                columns[i] = [columns[i]] * n
+
+    def decode_records(self, data: BytesLike) -> List[Union[Record, ChannelMessage]]:
+        # same as decode, but batches of records are built straight from columns into Record/KeyRecord
+        # objects without intermediate per-message dicts, other messages (e.g. watermarks) are dicts
+        n, (keys, value_fields), const_mask, columns = self._decode_body(data)
+        self._expand_const_columns(n, const_mask, columns)
+        key_set = frozenset(keys)
+        if key_set != _RECORD_KEYS and key_set != _KEY_RECORD_KEYS:
+            return self._to_messages(n, keys, value_fields, columns)
+        by_key = {}
+        i = 0
+        for key in keys:
+            if key == VALUE_KEY and value_fields is not None:
+                value_columns = columns[i: i + len(value_fields)]
+                if len(value_columns) == 0:
+                    by_key[key] = [{} for _ in range(n)]
+                else:
+                    by_key[key] = [dict(zip(value_fields, row)) for row in zip(*value_columns)]
+                i += len(value_fields)
+            else:
+                by_key[key] = columns[i]
+                i += 1
+        if 'key' in key_set:
+            return list(map(KeyRecord, by_key['key'], by_key[VALUE_KEY], by_key['event_time'], by_key['stream_name']))
+        return list(map(Record, by_key[VALUE_KEY], by_key['event_time'], by_key['stream_name']))
+
+    def decode(self, data: BytesLike) -> List[ChannelMessage]:
+        n, (keys, value_fields), const_mask, columns = self._decode_body(data)
+        self._expand_const_columns(n, const_mask, columns)
+        return self._to_messages(n, keys, value_fields, columns)
+
+    @staticmethod
+    def _to_messages(n: int, keys: Tuple[str, ...], value_fields: Optional[Tuple[str, ...]], columns: List[Any]) -> List[ChannelMessage]:
+        rows = zip(*columns) if len(columns) != 0 else [()] * n
+
+        if value_fields is None:
+            return [dict(zip(keys, row)) for row in rows]
+
+        messages = []
+        value_start = keys.index(VALUE_KEY)
+        value_end = value_start + len(value_fields)
+        for row in rows:
+            message = dict(zip(keys[:value_start], row[:value_start]))
+            message[VALUE_KEY] = dict(zip(value_fields, row[value_start:value_end]))
+            message.update(zip(keys[value_start + 1:], row[value_end:]))
+            messages.append(message)
+        return messages
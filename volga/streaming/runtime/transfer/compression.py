@@ -0,0 +1,146 @@
+import enum
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict
+
+from volga.streaming.runtime.transfer.batch import BytesLike, BATCH_HEADER, COMPRESSION_MASK
+
+
+class CompressionType(str, enum.Enum):
+    NONE = 'none'
+    ZLIB = 'zlib'
+    LZ4 = 'lz4'  # requires lz4 package
+    ZSTD = 'zstd'  # requires zstandard package
+
+
+class Compressor(ABC):
+    # id is stored in batch frame flags, so reader knows how to decompress
+    id: int
+    compression_type: CompressionType
+
+    @abstractmethod
+    def compress(self, data: BytesLike) -> bytes:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def decompress(self, data: BytesLike) -> bytes:
+        raise NotImplementedError()
+
+
+class ZlibCompressor(Compressor):
+    id = 1
+    compression_type = CompressionType.ZLIB
+
+    def __init__(self, level: int = 1):
+        self.level = level
+
+    def compress(self, data: BytesLike) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: BytesLike) -> bytes:
+        return zlib.decompress(data)
+
+
+class Lz4Compressor(Compressor):
+    id = 2
+    compression_type = CompressionType.LZ4
+
+    def __init__(self):
+        try:
+            import lz4.frame
+        except ImportError:
+            raise RuntimeError('lz4 compression requires lz4 package, install volga[compression]')
+        self._lz4 = lz4.frame
+
+    def compress(self, data: BytesLike) -> bytes:
+        return self._lz4.compress(data)
+
+    def decompress(self, data: BytesLike) -> bytes:
+        return self._lz4.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    id = 3
+    compression_type = CompressionType.ZSTD
+
+    def __init__(self, level: int = 1):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError('zstd compression requires zstandard package, install volga[compression]')
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: BytesLike) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: BytesLike) -> bytes:
+        # frames written by ZstdCompressor.compress always have content size
+        return self._decompressor.decompress(data)
+
+
+_COMPRESSORS = {
+    CompressionType.ZLIB: ZlibCompressor,
+    CompressionType.LZ4: Lz4Compressor,
+    CompressionType.ZSTD: ZstdCompressor,
+}
+
+_COMPRESSORS_BY_ID = {c.id: c for c in _COMPRESSORS.values()}
+
+# decompressors are stateless, so they are shared by all readers of a process
+_decompressors: Dict[int, Compressor] = {}
+
+
+def get_compressor(compression_type: CompressionType) -> Compressor:
+    if compression_type not in _COMPRESSORS:
+        raise RuntimeError(f'Unsupported compression {compression_type}')
+    return _COMPRESSORS[compression_type]()
+
+
+def get_decompressor(compressor_id: int) -> Compressor:
+    if compressor_id not in _decompressors:
+        if compressor_id not in _COMPRESSORS_BY_ID:
+            raise RuntimeError(f'Unknown compression id {compressor_id}')
+        _decompressors[compressor_id] = _COMPRESSORS_BY_ID[compressor_id]()
+    return _decompressors[compressor_id]
+
+
+def compress_batch(frame: bytes, compressor: Compressor) -> bytes:
+    # compresses everything after the header, header keeps number of messages and gets compressor id in flags
+    flags, n = BATCH_HEADER.unpack_from(frame, 0)
+    body = compressor.compress(memoryview(frame)[BATCH_HEADER.size:])
+    return b''.join([BATCH_HEADER.pack(flags | compressor.id, n), body])
+
+
+def is_compressed(data: BytesLike) -> bool:
+    return data[0] & COMPRESSION_MASK != 0
+
+
+def decompress_batch(data: BytesLike) -> bytes:
+    flags, n = BATCH_HEADER.unpack_from(data, 0)
+    decompressor = get_decompressor(flags & COMPRESSION_MASK)
+    body = decompressor.decompress(memoryview(data)[BATCH_HEADER.size:])
+    return b''.join([BATCH_HEADER.pack(flags & ~COMPRESSION_MASK, n), body])
+
+
+@dataclass
+class CompressionStats:
+    num_frames: int = 0
+    raw_bytes: int = 0
+    compressed_bytes: int = 0
+    time_s: float = 0
+
+    @property
+    def ratio(self) -> float:
+        return 1.0 if self.compressed_bytes == 0 else self.raw_bytes / self.compressed_bytes
+
+    def record(self, raw_bytes: int, compressed_bytes: int, start_ts: float):
+        self.num_frames += 1
+        self.raw_bytes += raw_bytes
+        self.compressed_bytes += compressed_bytes
+        self.time_s += time.perf_counter() - start_ts
+
+    def __str__(self):
+        return f'{self.num_frames} frames, ratio {self.ratio:.2f}, {self.time_s:.3f}s'
@@ -1,77 +1,257 @@
 import logging
-from typing import List, Optional
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Deque, Dict
 
-from volga.streaming.runtime.transfer.channel import Channel, ChannelMessage
-from volga.streaming.runtime.transfer.data_writer import TransportType
+from volga.streaming.api.message.message import is_watermark_message, record_from_channel_message
+from volga.streaming.runtime.config.transfer_config import TransferConfig
+from volga.streaming.runtime.transfer.batch import decode_batch, BytesLike
+from volga.streaming.runtime.transfer.channel import Channel, ChannelMessage, TransportType
+from volga.streaming.runtime.transfer.codec import get_codec
+from volga.streaming.runtime.transfer.columnar import ColumnarDecoder, is_columnar
+from volga.streaming.runtime.transfer.compression import CompressionStats, is_compressed, decompress_batch
+from volga.streaming.runtime.transfer.shared_memory import SharedMemoryRingBuffer
+from volga.streaming.runtime.transfer.zmq_context import get_context, create_socket
 
 import zmq
-import simplejson
 
 
 logger = logging.getLogger("ray")
 
 
+@dataclass
+class ReaderStats:
+    start_ts: float
+    idle_time_s: float = 0
+    num_frames: int = 0
+    num_messages: int = 0
+
+    # time spent outside waiting for data, i.e. processing messages by the task
+    @property
+    def busy_time_s(self) -> float:
+        return max(0.0, time.perf_counter() - self.start_ts - self.idle_time_s)
+
+    @property
+    def idle_ratio(self) -> float:
+        total = time.perf_counter() - self.start_ts
+        return 0.0 if total == 0 else self.idle_time_s / total
+
+
 class DataReader:
+
+    supported_transports = [TransportType.ZMQ_PUSH_PULL, TransportType.RAY_SHARED_MEM, TransportType.MULTIPLEXED]
+
     def __init__(
         self,
         name: str,
         input_channels: List[Channel],
-        transport_type: TransportType = TransportType.ZMQ_PUSH_PULL
+        config: Optional[TransferConfig] = None,
+        decode_records: bool = False
     ):
-        if transport_type not in [
-            TransportType.ZMQ_PUSH_PULL,
-        ]:
-            raise RuntimeError(f'Unsupported transport {transport_type}')
+        for channel in input_channels:
+            if channel.transport_type not in self.supported_transports:
+                raise RuntimeError(f'Unsupported transport {channel.transport_type}')
 
         self.name = name
+        if config is None:
+            config = TransferConfig()
+        self.config = config
+        self.codec = get_codec(config.codec)
         self.input_channels = input_channels
-        self.cur_read_id = 0
+        # if set, record messages are returned as Record objects, other messages as dicts
+        self.decode_records = decode_records
         self.running = True
+        self.stats = ReaderStats(start_ts=time.perf_counter())
+
+        # messages from already received batches
+        self._pending: Deque[ChannelMessage] = deque()
+        # [channel_id, number of its messages still in _pending] per received frame, in arrival order
+        self._pending_frames: Deque[List] = deque()
 
-        # TODO buffering
-        # buffer pool impl https://github.com/Naman-Bhalla/dbms-buffer-pool-manager-python/tree/master/src
-        self.sockets_and_contexts = {}
+        self.context = get_context(config.zmq_io_threads)
+        self.sockets: Dict[str, zmq.Socket] = {}
+        self._socket_to_channel_id = {}
+        # shared memory rings are attached on first notification since writer may not have created them yet
+        self._shm_channels = {c.channel_id: c for c in input_channels if c.transport_type == TransportType.RAY_SHARED_MEM}
+        self._rings: Dict[str, SharedMemoryRingBuffer] = {}
+        self.decompression_stats: Dict[str, CompressionStats] = {}
+        self._columnar_decoders: Dict[str, ColumnarDecoder] = {}
+        self._poller = zmq.Poller()
+        # multiplexed channels share a single socket, TransferActor prefixes each frame with channel_id
+        self._multiplexed_sockets = {}
         for channel in self.input_channels:
-            context = zmq.Context()
-            # TODO set HWM
-            socket = context.socket(zmq.PULL)
-            socket.setsockopt(zmq.LINGER, 0)
-            socket.connect(f'tcp://{channel.source_ip}:{channel.source_port}')
-            self.sockets_and_contexts[channel.channel_id] = (socket, context)
-
-    # TODO set timeout
-    def read_message(self) -> Optional[ChannelMessage]:
-        # TODO this should use a buffer?
-
-        # round-robin read
-        channel_id = None
-        json_str = None
-        while self.running and json_str is None:
-            channel_id = self.input_channels[self.cur_read_id].channel_id
-            socket = self.sockets_and_contexts[channel_id][0]
+            if channel.transport_type == TransportType.MULTIPLEXED:
+                if channel.reader_addr not in self._multiplexed_sockets:
+                    socket = create_socket(self.context, zmq.PULL, config)
+                    socket.bind(channel.reader_addr)
+                    self._multiplexed_sockets[channel.reader_addr] = socket
+                    self._socket_to_channel_id[socket] = None
+                    self._poller.register(socket, zmq.POLLIN)
+                self.sockets[channel.channel_id] = self._multiplexed_sockets[channel.reader_addr]
+                continue
+            socket = self._create_socket(channel)
+            self.sockets[channel.channel_id] = socket
+            self._socket_to_channel_id[socket] = channel.channel_id
+            self._poller.register(socket, zmq.POLLIN)
+
+    def _create_socket(self, channel: Channel) -> zmq.Socket:
+        socket = create_socket(self.context, zmq.PULL, self.config)
+        socket.connect(f'tcp://{channel.source_ip}:{channel.source_port}')
+        return socket
+
+    def read_message(self, timeout_s: Optional[float] = None) -> Optional[ChannelMessage]:
+        """
+        Blocks until a message arrives on any of the input channels.
+
+        Args:
+            timeout_s: max time to wait for a message, None to wait until reader is closed
+
+        Returns:
+            message or None if timed out or the reader was closed
+        """
+        if not self._wait_for_messages(timeout_s):
+            return None
+        message = self._pending.popleft()
+        self._consume(1)
+        return message
+
+    def read_messages(self, timeout_s: Optional[float] = None) -> List[ChannelMessage]:
+        """
+        Same as read_message, but returns all messages received so far in arrival order,
+        so that they can be processed as a batch.
+
+        Returns:
+            messages or empty list if timed out or the reader was closed
+        """
+        if not self._wait_for_messages(timeout_s):
+            return []
+        messages = list(self._pending)
+        self._pending.clear()
+        self._consume(len(messages))
+        return messages
+
+    def _consume(self, num_messages: int):
+        # messages are handed to the caller in arrival order, frames are done once all their messages are
+        frames = self._pending_frames
+        while num_messages != 0:
+            frame = frames[0]
+            taken = min(num_messages, frame[1])
+            frame[1] -= taken
+            num_messages -= taken
+            if frame[1] != 0:
+                return
+            frames.popleft()
+            self._on_frame(frame[0])
+
+    def _wait_for_messages(self, timeout_s: Optional[float]) -> bool:
+        # blocks until there are pending messages, returns False on timeout or close
+        if len(self._pending) != 0:
+            return True
+
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while self.running:
+            poll_timeout_ms = self.config.reader_poll_timeout_ms
+            if deadline is not None:
+                poll_timeout_ms = min(poll_timeout_ms, max(0, int((deadline - time.monotonic()) * 1000)))
+            t = time.perf_counter()
             try:
-                json_str = socket.recv_string(zmq.NOBLOCK)
+                events = self._poller.poll(timeout=poll_timeout_ms)
+                self.stats.idle_time_s += time.perf_counter() - t
+                for socket, _ in events:
+                    self._recv_frames(socket)
             except zmq.error.ContextTerminated:
                 logger.info('zmq recv interrupt due to ContextTerminated')
-                json_str = None
-            except Exception as e:
-                json_str = None
-            self.cur_read_id = (self.cur_read_id + 1) % len(self.input_channels)
+                break
+
+            if len(self._pending) != 0:
+                return True
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
 
         # reader was stopped
-        if json_str is None:
-            assert self.running is False
-            return None
+        return False
+
+    def _recv_frames(self, socket: zmq.Socket):
+        # drains up to reader_max_frames_per_channel frames so a single busy channel does not starve others
+        # None for multiplexed sockets
+        socket_channel_id = self._socket_to_channel_id[socket]
+        for _ in range(self.config.reader_max_frames_per_channel):
+            try:
+                if socket_channel_id is None:
+                    channel_id, data = socket.recv_multipart(zmq.NOBLOCK)
+                    channel_id = channel_id.decode()
+                else:
+                    data = socket.recv(zmq.NOBLOCK)
+                    channel_id = socket_channel_id
+            except zmq.error.Again:
+                return
+            if len(data) == 0:
+                # notification about a frame in shared memory
+                ring = self._get_ring(channel_id)
+                frame = ring.read()
+                if frame is None:
+                    raise RuntimeError(f'Channel {channel_id} got notification but shared memory ring is empty')
+                messages = self._decode_frame(channel_id, frame)
+                del frame
+                ring.release()
+            else:
+                messages = self._decode_frame(channel_id, data)
+            self.stats.num_frames += 1
+            self.stats.num_messages += len(messages)
+            if len(messages) == 0:
+                self._on_frame(channel_id)
+                continue
+            self._pending.extend(messages)
+            self._pending_frames.append([channel_id, len(messages)])
 
-        # TODO serialization perf
-        msg = simplejson.loads(json_str)
-        return msg
+    def _decode_frame(self, channel_id: str, data: BytesLike) -> List[ChannelMessage]:
+        if is_compressed(data):
+            data = self._decompress(channel_id, data)
+        if is_columnar(data):
+            if channel_id not in self._columnar_decoders:
+                self._columnar_decoders[channel_id] = ColumnarDecoder(self.codec)
+            if self.decode_records:
+                return self._columnar_decoders[channel_id].decode_records(data)
+            return self._columnar_decoders[channel_id].decode(data)
+        messages = list(map(self.codec.decode, decode_batch(data)))
+        if self.decode_records:
+            return [m if is_watermark_message(m) else record_from_channel_message(m) for m in messages]
+        return messages
 
-    def close(self):
+    def _decompress(self, channel_id: str, data: bytes) -> bytes:
+        t = time.perf_counter()
+        decompressed = decompress_batch(data)
+        if channel_id not in self.decompression_stats:
+            self.decompression_stats[channel_id] = CompressionStats()
+        self.decompression_stats[channel_id].record(len(decompressed), len(data), t)
+        return decompressed
+
+    def _get_ring(self, channel_id: str) -> SharedMemoryRingBuffer:
+        if channel_id not in self._rings:
+            self._rings[channel_id] = SharedMemoryRingBuffer.attach(self._shm_channels[channel_id].shm_name)
+        return self._rings[channel_id]
+
+    def _on_frame(self, channel_id: str):
+        # called for every received frame once all its messages were handed to the caller
+        pass
+
+    def stop(self):
+        # can be called from any thread, reading thread returns within reader_poll_timeout_ms
         self.running = False
-        # cleanup sockets and contexts for all channels
-        for channel_id in self.sockets_and_contexts:
-            socket = self.sockets_and_contexts[channel_id][0]
-            context = self.sockets_and_contexts[channel_id][1]
+
+    def close(self):
+        # zmq sockets are not thread safe and frames are decoded in place from shared memory,
+        # so this should be called by the reading thread or after it stopped (see stop)
+        self.stop()
+        logger.info(f'Reader {self.name} closed, received {self.stats.num_messages} messages in '
+                    f'{self.stats.num_frames} frames, busy {self.stats.busy_time_s:.2f}s, idle {self.stats.idle_time_s:.2f}s')
+        if len(self.decompression_stats) != 0:
+            stats = {c: str(s) for c, s in self.decompression_stats.items()}
+            logger.info(f'Reader {self.name} decompression per channel: {stats}')
+        # context is shared by the process, so only sockets are closed, multiplexed channels share them
+        for socket in set(self.sockets.values()):
             socket.close(linger=0)
-            context.destroy(linger=0)
+        for ring in self._rings.values():
+            ring.close()
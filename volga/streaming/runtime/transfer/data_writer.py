@@ -1,50 +1,112 @@
-import enum
-import simplejson
-from typing import List
+import logging
+import time
+from threading import Thread, Lock, Event
+from typing import List, Optional, Dict, Any
 
-from volga.streaming.api.message.message import Record
-from volga.streaming.runtime.transfer.channel import Channel, ChannelMessage
+from volga.streaming.api.message.message import Record, Watermark, watermark_to_channel_message
+from volga.streaming.runtime.config.transfer_config import TransferConfig
+from volga.streaming.runtime.transfer.batch import encode_batch
+from volga.streaming.runtime.transfer.channel import Channel, ChannelMessage, TransportType
+from volga.streaming.runtime.transfer.codec import get_codec
+from volga.streaming.runtime.transfer.columnar import ColumnarEncoder, VALUE_KEY
+from volga.streaming.runtime.transfer.compression import CompressionType, Compressor, CompressionStats, \
+    get_compressor, compress_batch
+from volga.streaming.runtime.transfer.shared_memory import SharedMemoryRingBuffer, has_room_for_ring
+from volga.streaming.runtime.transfer.zmq_context import get_context, create_socket
 
 import zmq
 
-
-class TransportType(enum.Enum):
-    ZMQ_PUSH_PULL = 1
-    ZMQ_PUB_SUB = 2
-    RAY_SHARED_MEM = 3
+logger = logging.getLogger("ray")
 
 
 class DataWriter:
 
+    supported_transports = [TransportType.ZMQ_PUSH_PULL, TransportType.RAY_SHARED_MEM, TransportType.MULTIPLEXED]
+
     def __init__(
         self,
         name: str,
         source_stream_name: str,
         output_channels: List[Channel],
-        transport_type: TransportType = TransportType.ZMQ_PUSH_PULL
+        config: Optional[TransferConfig] = None
     ):
-        if transport_type not in [
-            TransportType.ZMQ_PUSH_PULL,
-        ]:
-            raise RuntimeError(f'Unsupported transport: {transport_type}')
         self.name = name
+        if config is None:
+            config = TransferConfig()
+        self.config = config
+        self.codec = get_codec(config.codec)
 
         self.source_stream_name = source_stream_name
         self.out_channels = output_channels
-        # TODO buffering
-        # buffer pool impl https://github.com/Naman-Bhalla/dbms-buffer-pool-manager-python/tree/master/src
 
-        self.sockets_and_contexts = {}
+        # per-channel pending batches, flushed on size, count or linger time,
+        # lock guards pending state and sockets since both writer and flusher threads send
+        self._lock = Lock()
+        # encoded messages, or messages as is for columnar channels
+        self._pending: Dict[str, List[Any]] = {}
+        self._pending_bytes: Dict[str, int] = {}
+        self._pending_since: Dict[str, float] = {}
+        self._has_pending = Event()
+        self._linger_s = config.batch_linger_ms / 1000
+
+        self.context = get_context(config.zmq_io_threads)
+        self.sockets: Dict[str, zmq.Socket] = {}
+        self._rings: Dict[str, SharedMemoryRingBuffer] = {}
+        self._compressors: Dict[str, Compressor] = {}
+        self.compression_stats: Dict[str, CompressionStats] = {}
+        self._columnar_encoders: Dict[str, ColumnarEncoder] = {}
+        # estimated encoded message size per channel, used for batch_max_bytes of columnar batches
+        self._message_size: Dict[str, int] = {}
+        # multiplexed channels share a single connection to the node's TransferActor
+        self._multiplexed_channel_ids: Dict[str, bytes] = {}
+        multiplexer_sockets = {}
         for channel in self.out_channels:
-            if channel.channel_id in self.sockets_and_contexts:
+            if channel.channel_id in self.sockets:
                 raise RuntimeError('duplicate channel ids')
-            context = zmq.Context()
+            if channel.transport_type not in self.supported_transports:
+                raise RuntimeError(f'Unsupported transport: {channel.transport_type}')
+            if channel.transport_type == TransportType.MULTIPLEXED:
+                if channel.multiplexer_addr not in multiplexer_sockets:
+                    socket = create_socket(self.context, zmq.PUSH, config)
+                    socket.connect(channel.multiplexer_addr)
+                    multiplexer_sockets[channel.multiplexer_addr] = socket
+                self.sockets[channel.channel_id] = multiplexer_sockets[channel.multiplexer_addr]
+                self._multiplexed_channel_ids[channel.channel_id] = channel.channel_id.encode()
+            else:
+                self.sockets[channel.channel_id] = self._create_socket(channel)
+            if channel.transport_type == TransportType.RAY_SHARED_MEM:
+                if has_room_for_ring(config.shared_memory_capacity_bytes):
+                    self._rings[channel.channel_id] = SharedMemoryRingBuffer.create(
+                        channel.shm_name, config.shared_memory_capacity_bytes
+                    )
+                else:
+                    # frames without ring are sent inline, reader handles both
+                    logger.warning(f'Writer {self.name} has no room in shared memory for channel {channel.channel_id}, '
+                                   f'frames are sent through socket')
+            if self._should_compress(channel):
+                self._compressors[channel.channel_id] = get_compressor(config.compression)
+                self.compression_stats[channel.channel_id] = CompressionStats()
+            if config.columnar_batches:
+                self._columnar_encoders[channel.channel_id] = ColumnarEncoder(self.codec)
+            self._pending[channel.channel_id] = []
+            self._pending_bytes[channel.channel_id] = 0
+
+        self.running = True
+        self._flusher_thread = None
+        if config.batch_max_records > 1:
+            self._flusher_thread = Thread(target=self._flusher_loop, daemon=True)
+            self._flusher_thread.start()
 
-            # TODO set HWM
-            socket = context.socket(zmq.PUSH)
-            socket.setsockopt(zmq.LINGER, 0)
-            socket.bind(f'tcp://127.0.0.1:{channel.source_port}')
-            self.sockets_and_contexts[channel.channel_id] = (socket, context)
+    def _should_compress(self, channel: Channel) -> bool:
+        # local channels are not network bound, so compression cpu cost is not worth it
+        if self.config.compression == CompressionType.NONE or channel.transport_type == TransportType.RAY_SHARED_MEM:
+            return False
+        return not channel.is_local or self.config.compress_local_channels
+
+    def _create_socket(self, channel: Channel) -> zmq.Socket:
+        socket = create_socket(self.context, zmq.PUSH, self.config)
+        socket.bind(f'tcp://127.0.0.1:{channel.source_port}')
+        return socket
 
     def write_record(self, channel_id: str, record: Record):
         # add sender operator_id
@@ -52,18 +114,141 @@ class DataWriter:
         message = record.to_channel_message()
         self._write_message(channel_id, message)
 
+    def write_watermark(self, channel_id: str, watermark: Watermark):
+        # goes through the same batch as records, so it is never delivered ahead of records emitted before it
+        message = watermark_to_channel_message(watermark, self.source_stream_name, channel_id)
+        self._write_message(channel_id, message)
+
     def _write_message(self, channel_id: str, message: ChannelMessage):
-        # TODO this should use a buffer?
-        # TODO serialization perf
-        json_str = simplejson.dumps(message)
-        socket = self.sockets_and_contexts[channel_id][0]
-        # TODO depending on socket type, this can block or just throw exception, test this
-        socket.send_string(json_str)
+        columnar = channel_id in self._columnar_encoders
+        if columnar:
+            # columnar batches are built on flush, copy value so later changes by the operator are not sent
+            data = dict(message)
+            if isinstance(data.get(VALUE_KEY), dict):
+                data[VALUE_KEY] = dict(data[VALUE_KEY])
+        else:
+            data = self.codec.encode(message)
+        with self._lock:
+            pending = self._pending[channel_id]
+            if len(pending) == 0:
+                self._pending_since[channel_id] = time.monotonic()
+                self._has_pending.set()
+                if columnar:
+                    self._message_size[channel_id] = len(self.codec.encode(message))
+            pending.append(data)
+            self._pending_bytes[channel_id] += self._message_size[channel_id] if columnar else len(data)
+            if len(pending) >= self.config.batch_max_records or \
+                    self._pending_bytes[channel_id] >= self.config.batch_max_bytes or \
+                    time.monotonic() - self._pending_since[channel_id] >= self._linger_s:
+                self._flush_channel(channel_id)
+
+    def _flush_channel(self, channel_id: str, timeout_ms: Optional[int] = None):
+        # should be called under lock, timeout_ms None blocks until the batch is sent
+        pending = self._pending[channel_id]
+        if len(pending) == 0:
+            return
+        encoder = self._columnar_encoders.get(channel_id)
+        if encoder is not None:
+            frame = encoder.encode(pending)
+            if frame is None:
+                # messages have different structure
+                frame = encode_batch(list(map(self.codec.encode, pending)))
+        else:
+            frame = encode_batch(pending)
+        compressor = self._compressors.get(channel_id)
+        if compressor is not None and len(frame) >= self.config.compression_min_bytes:
+            t = time.perf_counter()
+            compressed = compress_batch(frame, compressor)
+            self.compression_stats[channel_id].record(len(frame), len(compressed), t)
+            # incompressible frames are sent as is
+            if len(compressed) < len(frame):
+                frame = compressed
+        self._pending[channel_id] = []
+        self._pending_bytes[channel_id] = 0
+        sent = self._send_frame(channel_id, frame, timeout_ms)
+        if not sent:
+            logger.warning(f'Writer {self.name} dropped {len(pending)} pending messages for channel {channel_id}')
+
+    def _send_frame(self, channel_id: str, frame: bytes, timeout_ms: Optional[int]) -> bool:
+        # returns False if frame could not be sent within timeout_ms
+        if timeout_ms is None:
+            self._transmit(channel_id, frame)
+            return True
+        socket = self.sockets[channel_id]
+        # make sure notification can be sent before putting frame to shared memory
+        if socket.poll(timeout_ms, zmq.POLLOUT) == 0:
+            return False
+        try:
+            self._transmit(channel_id, frame, flags=zmq.NOBLOCK)
+            return True
+        except zmq.error.Again:
+            return False
+
+    def _transmit(self, channel_id: str, frame: bytes, flags: int = 0):
+        # for shared memory channels the frame is put to the ring and socket carries only an empty
+        # notification, reader decodes the frame in place. Frames which do not fit are sent inline,
+        # both go through the same socket so ordering is preserved
+        socket = self.sockets[channel_id]
+        if channel_id in self._multiplexed_channel_ids:
+            socket.send_multipart([self._multiplexed_channel_ids[channel_id], frame], flags=flags, copy=False)
+            return
+        ring = self._rings.get(channel_id)
+        if ring is not None and ring.try_write(frame):
+            socket.send(b'', flags=flags)
+            return
+        socket.send(frame, flags=flags, copy=False)
+
+    def flush(self, timeout_ms: Optional[int] = None):
+        # timeout_ms bounds the whole flush, None blocks until all batches are sent
+        deadline = None if timeout_ms is None else time.monotonic() + timeout_ms / 1000
+        with self._lock:
+            for channel_id in self._pending:
+                remaining_ms = None if deadline is None else max(0, int((deadline - time.monotonic()) * 1000))
+                self._flush_channel(channel_id, remaining_ms)
+
+    def _flusher_loop(self):
+        # flushes batches which were not filled up in time
+        while self.running:
+            self._has_pending.wait()
+            time.sleep(self._linger_s)
+            now = time.monotonic()
+            with self._lock:
+                if not self.running:
+                    break
+                has_pending = False
+                for channel_id in self._pending:
+                    if len(self._pending[channel_id]) == 0:
+                        continue
+                    if now - self._pending_since[channel_id] >= self._linger_s:
+                        self._flush_channel(channel_id)
+                    else:
+                        has_pending = True
+                if not has_pending:
+                    self._has_pending.clear()
 
     def close(self):
-        # cleanup sockets and contexts for all channels
-        for channel_id in self.sockets_and_contexts:
-            socket = self.sockets_and_contexts[channel_id][0]
-            context = self.sockets_and_contexts[channel_id][1]
+        # downstream may be gone already, so the last flush is bounded
+        self.flush(timeout_ms=self.config.writer_close_timeout_ms)
+        with self._lock:
+            self.running = False
+        self._has_pending.set()
+        if self._flusher_thread is not None:
+            self._flusher_thread.join(timeout=5)
+        self._log_compression_stats()
+        if self._flusher_thread is not None and self._flusher_thread.is_alive():
+            # sockets are not thread safe
+            logger.warning(f'Writer {self.name} flusher thread did not stop, sockets are not closed')
+            return
+        self._close_sockets()
+
+    def _log_compression_stats(self):
+        if len(self.compression_stats) != 0:
+            stats = {c: str(s) for c, s in self.compression_stats.items()}
+            logger.info(f'Writer {self.name} compression per channel: {stats}')
+
+    def _close_sockets(self):
+        # context is shared by the process, so only sockets are closed, multiplexed channels share them
+        for socket in set(self.sockets.values()):
             socket.close(linger=0)
-            context.destroy(linger=0)
+        for ring in self._rings.values():
+            ring.close()
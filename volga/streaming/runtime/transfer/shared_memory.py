@@ -0,0 +1,128 @@
+import os
+import struct
+from multiprocessing import shared_memory, resource_tracker
+from typing import Optional
+
+# Single-producer single-consumer ring buffer of frames in a named shared memory segment.
+#
+# Layout:
+# | write_pos: uint64 | pad | read_pos: uint64 | pad | data ... |
+# positions are monotonically growing byte counters, index in data region is pos % capacity.
+# Each frame is stored contiguously as | length: uint32 | payload |, if it does not fit before the end
+# of the data region, the rest of the region is skipped (marked with WRAP_MARKER if there is room for it).
+#
+# Only writer updates write_pos and only reader updates read_pos, both are published after the payload is
+# copied/consumed. Frames are read in place, so the reader decodes them without copying.
+
+POS = struct.Struct('<Q')
+LEN = struct.Struct('<I')
+WRITE_POS_OFFSET = 0
+READ_POS_OFFSET = 64  # separate cache line
+DATA_OFFSET = 128
+WRAP_MARKER = 0xFFFFFFFF
+
+# segments created by this process, they are already tracked (and unlinked) by the owner
+_created_names = set()
+
+# on Linux segments are files in tmpfs, which is shared with Ray object store and may be small (64MB in Docker by default)
+SHM_DIR = '/dev/shm'
+
+
+def has_room_for_ring(capacity_bytes: int) -> bool:
+    # writing to a segment when tmpfs is full crashes the process with SIGBUS,
+    # so a ring should take at most half of the free space
+    if not os.path.isdir(SHM_DIR):
+        return True
+    stat = os.statvfs(SHM_DIR)
+    return DATA_OFFSET + capacity_bytes <= stat.f_bavail * stat.f_frsize // 2
+
+
+class SharedMemoryRingBuffer:
+
+    def __init__(self, shm: shared_memory.SharedMemory, is_owner: bool):
+        self._shm = shm
+        self._buf = shm.buf
+        self.is_owner = is_owner
+        self.capacity = shm.size - DATA_OFFSET
+        self._pending_read_pos: Optional[int] = None
+
+    @classmethod
+    def create(cls, name: str, capacity_bytes: int) -> 'SharedMemoryRingBuffer':
+        shm = shared_memory.SharedMemory(name=name, create=True, size=DATA_OFFSET + capacity_bytes)
+        POS.pack_into(shm.buf, WRITE_POS_OFFSET, 0)
+        POS.pack_into(shm.buf, READ_POS_OFFSET, 0)
+        _created_names.add(name)
+        return cls(shm, is_owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedMemoryRingBuffer':
+        shm = shared_memory.SharedMemory(name=name, create=False)
+        # segment is owned (and unlinked) by the writer, prevent this process's tracker from unlinking it on exit
+        if name not in _created_names:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, is_owner=False)
+
+    def _write_pos(self) -> int:
+        return POS.unpack_from(self._buf, WRITE_POS_OFFSET)[0]
+
+    def _read_pos(self) -> int:
+        return POS.unpack_from(self._buf, READ_POS_OFFSET)[0]
+
+    def try_write(self, frame: bytes) -> bool:
+        # returns False if there is not enough free space, caller should fall back to other transport
+        need = LEN.size + len(frame)
+        if need > self.capacity:
+            return False
+        write_pos = self._write_pos()
+        free = self.capacity - (write_pos - self._read_pos())
+        idx = write_pos % self.capacity
+        skip = 0
+        if idx + need > self.capacity:
+            skip = self.capacity - idx
+        if skip + need > free:
+            return False
+        if skip != 0:
+            if skip >= LEN.size:
+                LEN.pack_into(self._buf, DATA_OFFSET + idx, WRAP_MARKER)
+            write_pos += skip
+            idx = 0
+        start = DATA_OFFSET + idx
+        LEN.pack_into(self._buf, start, len(frame))
+        self._buf[start + LEN.size: start + need] = frame
+        # publish
+        POS.pack_into(self._buf, WRITE_POS_OFFSET, write_pos + need)
+        return True
+
+    def read(self) -> Optional[memoryview]:
+        # returns view of the next frame, it stays valid until release() is called
+        if self._pending_read_pos is not None:
+            raise RuntimeError('Previous frame was not released')
+        read_pos = self._read_pos()
+        if read_pos == self._write_pos():
+            return None
+        idx = read_pos % self.capacity
+        if self.capacity - idx < LEN.size:
+            read_pos += self.capacity - idx
+            idx = 0
+        else:
+            length = LEN.unpack_from(self._buf, DATA_OFFSET + idx)[0]
+            if length == WRAP_MARKER:
+                read_pos += self.capacity - idx
+                idx = 0
+        start = DATA_OFFSET + idx
+        length = LEN.unpack_from(self._buf, start)[0]
+        self._pending_read_pos = read_pos + LEN.size + length
+        return self._buf[start + LEN.size: start + LEN.size + length]
+
+    def release(self):
+        if self._pending_read_pos is None:
+            raise RuntimeError('No frame to release')
+        POS.pack_into(self._buf, READ_POS_OFFSET, self._pending_read_pos)
+        self._pending_read_pos = None
+
+    def close(self):
+        self._buf.release()
+        self._shm.close()
+        if self.is_owner:
+            self._shm.unlink()
+            _created_names.discard(self._shm.name)
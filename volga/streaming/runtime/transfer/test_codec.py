@@ -0,0 +1,87 @@
+import datetime
+import time
+import unittest
+
+from volga.common.time_utils import NANOS_PER_SECOND
+from volga.streaming.api.message.message import KeyRecord, record_from_channel_message
+from volga.streaming.runtime.transfer.codec import CodecType, get_codec, register_ext_type, MsgpackCodec
+
+
+class _Point:
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+
+register_ext_type(
+    100,
+    _Point,
+    lambda p: f'{p.x},{p.y}'.encode(),
+    lambda b: _Point(*map(int, b.decode().split(',')))
+)
+
+
+def _sample_message(i: int):
+    record = KeyRecord(
+        key=f'user_{i % 100}',
+        value={
+            'user_id': f'user_{i % 100}',
+            'product_id': f'prod_{i}',
+            'product_type': 'ON_SALE' if i % 2 == 0 else 'NORMAL',
+            'purchased_at': '2024-05-07 14:08:26.519626',
+            'product_price': 100.0 + i,
+        },
+        event_time=1715090906519626000 + i * NANOS_PER_SECOND
+    )
+    record.set_stream_name('3')
+    return record.to_channel_message()
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_msgpack_round_trip(self):
+        codec = get_codec(CodecType.MSGPACK)
+        msg = _sample_message(1)
+        decoded = codec.decode(codec.encode(msg))
+        assert decoded == msg
+
+        # event time should stay exact int nanoseconds
+        record = record_from_channel_message(decoded)
+        assert type(record.event_time) is int
+        assert record.event_time == 1715090907519626000
+
+    def test_ext_types(self):
+        codec = MsgpackCodec()
+        dt = datetime.datetime(2024, 5, 7, 14, 8, 26, 519626)
+        msg = {'dt': dt, 'date': dt.date(), 'int_key': {1: 'a'}, 'point': _Point(1, 2)}
+        decoded = codec.decode(codec.encode(msg))
+        assert decoded['dt'] == dt
+        assert decoded['date'] == dt.date()
+        assert decoded['int_key'] == {1: 'a'}
+        assert decoded['point'].x == 1 and decoded['point'].y == 2
+
+        with self.assertRaises(TypeError):
+            codec.encode({'unknown': object()})
+
+    def test_throughput(self):
+        num_messages = 20000
+        messages = [_sample_message(i) for i in range(num_messages)]
+        res = {}
+        for codec_type in [CodecType.JSON, CodecType.MSGPACK]:
+            codec = get_codec(codec_type)
+            t = time.perf_counter()
+            encoded = [codec.encode(m) for m in messages]
+            decoded = [codec.decode(e) for e in encoded]
+            took = time.perf_counter() - t
+            size = sum(map(len, encoded))
+            res[codec_type] = took
+            assert len(decoded) == num_messages
+            print(f'{codec_type.value}: {int(num_messages/took)} msg/s round-trip, {size/num_messages:.1f} bytes/msg')
+        print(f'msgpack speedup: {res[CodecType.JSON]/res[CodecType.MSGPACK]:.2f}x')
+
+
+if __name__ == '__main__':
+    t = TestCodec()
+    t.test_msgpack_round_trip()
+    t.test_ext_types()
+    t.test_throughput()
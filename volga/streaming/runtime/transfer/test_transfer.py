@@ -1,12 +1,24 @@
+import tempfile
 import time
 import unittest
+from threading import Thread
 from typing import List, Dict, Any
 
-from volga.streaming.runtime.transfer.channel import Channel
+from volga.streaming.api.message.message import Record, Watermark, is_watermark_message
+from volga.streaming.runtime.config.transfer_config import TransferConfig
+from volga.streaming.runtime.transfer.batch import encode_batch, decode_batch
+from volga.streaming.runtime.transfer.channel import Channel, TransportType
+from volga.streaming.runtime.transfer.codec import get_codec, CodecType
+from volga.streaming.runtime.transfer.columnar import ColumnarEncoder, ColumnarDecoder
+from volga.streaming.runtime.transfer.compression import CompressionType, get_compressor, compress_batch, \
+    decompress_batch, is_compressed
 from volga.streaming.runtime.transfer.data_reader import DataReader
 from volga.streaming.runtime.transfer.data_writer import DataWriter
+from volga.streaming.runtime.transfer.shared_memory import SharedMemoryRingBuffer, has_room_for_ring
+from volga.streaming.runtime.transfer.v2.transfer_actor import TransferActor
 
 import ray
+import zmq
 
 TERMINAL_MESSAGE = {'data': 'done'}
 
@@ -76,7 +88,439 @@ class TestTransfer(unittest.TestCase):
 
         ray.shutdown()
 
+    def test_batch_framing(self):
+        payloads = [b'', b'a', b'bc' * 1000, bytes(range(256))]
+        frame = encode_batch(payloads)
+        assert [bytes(p) for p in decode_batch(frame)] == payloads
+        assert decode_batch(encode_batch([])) == []
+        with self.assertRaises(RuntimeError):
+            decode_batch(frame + b'x')
+
+    def test_batching_throughput(self):
+        num_items = 50000
+        items = [{'data': f'{i}', 'payload': 'a' * 100} for i in range(num_items)]
+        configs = {
+            'unbatched': TransferConfig(batch_max_records=1),
+            'batched': TransferConfig(),
+        }
+        port = 4322
+        for name, config in configs.items():
+            channel = Channel(channel_id='1', source_ip='127.0.0.1', source_port=port)
+            port += 1
+            data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=[channel], config=config)
+            data_reader = DataReader(name='test_reader', input_channels=[channel], config=config)
+
+            def _write():
+                for item in items:
+                    data_writer._write_message(channel.channel_id, item)
+                data_writer._write_message(channel.channel_id, TERMINAL_MESSAGE)
+
+            t = time.perf_counter()
+            writer_thread = Thread(target=_write)
+            writer_thread.start()
+            received = []
+            while True:
+                item = data_reader.read_message()
+                if item == TERMINAL_MESSAGE:
+                    break
+                received.append(item)
+            took = time.perf_counter() - t
+            writer_thread.join()
+            data_writer.close()
+            data_reader.close()
+            assert received == items
+            print(f'{name}: {int(num_items/took)} msg/s')
+
+    def test_reader_poll(self):
+        config = TransferConfig(batch_max_records=1, reader_max_frames_per_channel=2)
+        channels = [Channel(channel_id=f'{i}', source_ip='127.0.0.1', source_port=4340 + i) for i in range(2)]
+        writers = [
+            DataWriter(name=f'test_writer_{i}', source_stream_name='0', output_channels=[channels[i]], config=config)
+            for i in range(2)
+        ]
+        data_reader = DataReader(name='test_reader', input_channels=channels, config=config)
+
+        # nothing to read, reader blocks for timeout without spinning
+        t = time.perf_counter()
+        assert data_reader.read_message(timeout_s=0.2) is None
+        assert time.perf_counter() - t >= 0.2
+        assert data_reader.stats.idle_time_s >= 0.19
+
+        # busy channel should not starve the other one
+        for i in range(100):
+            writers[0]._write_message('0', {'ch': 0, 'i': i})
+        writers[1]._write_message('1', {'ch': 1, 'i': 0})
+        time.sleep(0.2)
+        received = [data_reader.read_message(timeout_s=1) for _ in range(101)]
+        assert {'ch': 1, 'i': 0} in received[:2 * config.reader_max_frames_per_channel]
+        assert [m for m in received if m['ch'] == 0] == [{'ch': 0, 'i': i} for i in range(100)]
+        assert data_reader.stats.num_messages == 101
+
+        # stopped reader returns from blocking read within poll timeout, then it is closed by owning thread
+        res = []
+        reader_thread = Thread(target=lambda: res.append(data_reader.read_message()))
+        reader_thread.start()
+        time.sleep(0.1)
+        data_reader.stop()
+        reader_thread.join(timeout=1)
+        assert not reader_thread.is_alive() and res == [None]
+
+        for w in writers:
+            w.close()
+        data_reader.close()
+
+    def test_close_flush(self):
+        # pending batch is not ready yet on close, reader connects while writer is closing
+        config = TransferConfig(batch_linger_ms=1000, writer_close_timeout_ms=2000)
+        channel = Channel(channel_id='1', source_ip='127.0.0.1', source_port=4360)
+        data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=[channel], config=config)
+        for i in range(5):
+            data_writer._write_message('1', {'i': i})
+        readers = []
+        reader_thread = Thread(target=lambda: (time.sleep(0.3), readers.append(
+            DataReader(name='test_reader', input_channels=[channel], config=config)
+        )))
+        reader_thread.start()
+        data_writer.close()
+        reader_thread.join()
+        received = [readers[0].read_message(timeout_s=1) for _ in range(5)]
+        assert received == [{'i': i} for i in range(5)]
+        readers[0].close()
+
+        # nobody reads, close gives up after timeout
+        config = TransferConfig(batch_linger_ms=1000, writer_close_timeout_ms=200)
+        channel = Channel(channel_id='1', source_ip='127.0.0.1', source_port=4361)
+        data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=[channel], config=config)
+        data_writer._write_message('1', {'i': 0})
+        t = time.perf_counter()
+        data_writer.close()
+        assert time.perf_counter() - t < 1.5
+
+    def test_compression(self):
+        payloads = [f'{{"field_{i % 10}": {i}}}'.encode() for i in range(1000)]
+        frame = encode_batch(payloads)
+        compressed = compress_batch(frame, get_compressor(CompressionType.ZLIB))
+        assert is_compressed(compressed) and not is_compressed(frame)
+        assert len(compressed) < len(frame)
+        with self.assertRaises(RuntimeError):
+            decode_batch(compressed)
+        assert [bytes(p) for p in decode_batch(decompress_batch(compressed))] == payloads
+
+        config = TransferConfig(compression=CompressionType.ZLIB)
+        items = [{'key': i % 10, 'value': f'value_{i}', 'feature': 'a' * 50} for i in range(10000)]
+        remote_channel = Channel(channel_id='remote', source_ip='127.0.0.1', source_port=4380)
+        local_channel = Channel(channel_id='local', source_ip='127.0.0.1', source_port=4381, is_local=True)
+        data_writer = DataWriter(
+            name='test_writer', source_stream_name='0', output_channels=[remote_channel, local_channel], config=config
+        )
+        data_reader = DataReader(name='test_reader', input_channels=[remote_channel, local_channel], config=config)
+        for item in items:
+            data_writer._write_message('remote', item)
+        data_writer._write_message('local', items[0])
+        data_writer.flush()
+        received = [data_reader.read_message(timeout_s=1) for _ in range(len(items) + 1)]
+        assert received.count(items[0]) == 2
+        assert [m for m in received if m['value'] != 'value_0'] == items[1:]
+
+        # local channels are not compressed
+        assert set(data_writer.compression_stats.keys()) == {'remote'}
+        stats = data_writer.compression_stats['remote']
+        assert stats.ratio > 2
+        assert data_reader.decompression_stats['remote'].num_frames == stats.num_frames
+        print(f'zlib: {stats}')
+        data_writer.close()
+        data_reader.close()
+
+    def test_columnar_batches(self):
+        codec = get_codec(CodecType.MSGPACK)
+        encoder = ColumnarEncoder(codec)
+        decoder = ColumnarDecoder(codec)
+        messages = [
+            {'key': i % 3, 'value': {'user_id': i, 'amount': i * 1.5, 'flag': True}, 'stream_name': '1', 'event_time': i}
+            for i in range(100)
+        ]
+        row_frame = encode_batch(list(map(codec.encode, messages)))
+        first_frame = encoder.encode(messages)
+        second_frame = encoder.encode(messages)
+        # schema is sent only once
+        assert len(second_frame) < len(first_frame) < len(row_frame)
+        assert decoder.decode(first_frame) == messages
+        assert decoder.decode(second_frame) == messages
+        n, columns = decoder.decode_columns(second_frame)
+        assert n == 100
+        assert columns['value.user_id'] == list(range(100))
+        assert columns['stream_name'] == '1'
+
+        # non-uniform batches are not encoded
+        assert encoder.encode([{'value': 1}, {'value': {'a': 1}}]) is None
+        assert decoder.decode(encoder.encode([{'value': {}}])) == [{'value': {}}]
+        # unknown schema
+        with self.assertRaises(RuntimeError):
+            ColumnarDecoder(codec).decode(second_frame)
+
+        config = TransferConfig(columnar_batches=True, batch_max_records=30)
+        channel = Channel(channel_id='1', source_ip='127.0.0.1', source_port=4390)
+        data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=[channel], config=config)
+        data_reader = DataReader(name='test_reader', input_channels=[channel], config=config)
+        for message in messages:
+            data_writer._write_message('1', message)
+        data_writer._write_message('1', {'value': 'other'})
+        data_writer.flush()
+        received = [data_reader.read_message(timeout_s=1) for _ in range(len(messages) + 1)]
+        assert received == messages + [{'value': 'other'}]
+        data_writer.close()
+        data_reader.close()
+
+    def test_watermarks(self):
+        config = TransferConfig(batch_max_records=10)
+        channels = [Channel(channel_id=str(i), source_ip='127.0.0.1', source_port=4395 + i) for i in range(2)]
+        data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=channels, config=config)
+        data_reader = DataReader(name='test_reader', input_channels=channels, config=config)
+        for i in range(5):
+            data_writer.write_record('0', Record(value=i, event_time=i))
+        data_writer.write_watermark('0', Watermark(4))
+        data_writer.write_watermark('1', Watermark(4))
+        data_writer.flush()
+        received = []
+        while len(received) != 7:
+            received.append(data_reader.read_message(timeout_s=1))
+        channel_0 = [m for m in received if m.get('channel_id', '0') == '0']
+        # watermark is delivered after records written before it
+        assert [m['value'] for m in channel_0[:5]] == list(range(5))
+        assert channel_0[5] == {'watermark': 4, 'stream_name': '0', 'channel_id': '0'}
+        assert is_watermark_message(channel_0[5])
+        data_writer.close()
+        data_reader.close()
+
+    def test_shared_memory_ring(self):
+        ring = SharedMemoryRingBuffer.create('volga_test_ring', 64)
+        reader_ring = SharedMemoryRingBuffer.attach('volga_test_ring')
+        assert reader_ring.read() is None
+        sent = []
+        received = []
+        for i in range(100):
+            frame = bytes([i]) * (i % 20 + 1)
+            if ring.try_write(frame):
+                sent.append(frame)
+            else:
+                # full, drain and retry
+                while (view := reader_ring.read()) is not None:
+                    received.append(bytes(view))
+                    del view
+                    reader_ring.release()
+                assert ring.try_write(frame)
+                sent.append(frame)
+        while (view := reader_ring.read()) is not None:
+            received.append(bytes(view))
+            del view
+            reader_ring.release()
+        assert received == sent
+        assert not ring.try_write(b'a' * 100)
+        reader_ring.close()
+        ring.close()
+
+        assert has_room_for_ring(1024 * 1024)
+        assert not has_room_for_ring(2 ** 60)
+
+        # no room for ring, channel falls back to socket
+        config = TransferConfig(shared_memory_capacity_bytes=2 ** 60)
+        channel = Channel(
+            channel_id='1', source_ip='127.0.0.1', source_port=4352,
+            transport_type=TransportType.RAY_SHARED_MEM, shm_name='volga_test_no_room'
+        )
+        data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=[channel], config=config)
+        data_reader = DataReader(name='test_reader', input_channels=[channel], config=config)
+        assert len(data_writer._rings) == 0
+        data_writer._write_message('1', {'i': 0})
+        data_writer.flush()
+        assert data_reader.read_message(timeout_s=1) == {'i': 0}
+        data_writer.close()
+        data_reader.close()
+
+    def test_shared_memory_transfer(self):
+        num_items = 50000
+        items = [{'data': f'{i}', 'payload': 'a' * 100} for i in range(num_items)]
+        # small ring so some frames do not fit and go inline through the socket
+        config = TransferConfig(shared_memory_capacity_bytes=256 * 1024)
+        port = 4350
+        for transport_type in [TransportType.ZMQ_PUSH_PULL, TransportType.RAY_SHARED_MEM]:
+            channel = Channel(
+                channel_id='1',
+                source_ip='127.0.0.1',
+                source_port=port,
+                transport_type=transport_type,
+                shm_name='volga_test_channel' if transport_type == TransportType.RAY_SHARED_MEM else None
+            )
+            port += 1
+            data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=[channel], config=config)
+            data_reader = DataReader(name='test_reader', input_channels=[channel], config=config)
+
+            def _write():
+                for item in items:
+                    data_writer._write_message(channel.channel_id, item)
+                data_writer._write_message(channel.channel_id, TERMINAL_MESSAGE)
+
+            t = time.perf_counter()
+            writer_thread = Thread(target=_write)
+            writer_thread.start()
+            received = []
+            while True:
+                item = data_reader.read_message()
+                if item == TERMINAL_MESSAGE:
+                    break
+                received.append(item)
+            took = time.perf_counter() - t
+            writer_thread.join()
+            data_writer.close()
+            data_reader.close()
+            assert received == items
+            print(f'{transport_type.name}: {int(num_items/took)} msg/s')
+
+    def test_shared_context(self):
+        config = TransferConfig(zmq_sndhwm=10, zmq_rcvhwm=20, zmq_sndbuf=64 * 1024)
+        channels = [Channel(channel_id=f'{i}', source_ip='127.0.0.1', source_port=4370 + i) for i in range(2)]
+        data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=channels, config=config)
+        data_reader = DataReader(name='test_reader', input_channels=channels, config=config)
+
+        # all sockets of the process share one context
+        assert data_writer.context is data_reader.context
+        assert data_writer.sockets['0'].context is data_writer.sockets['1'].context is data_writer.context
+        assert data_writer.sockets['0'].getsockopt(zmq.SNDHWM) == 10
+        assert data_writer.sockets['0'].getsockopt(zmq.SNDBUF) == 64 * 1024
+        assert data_reader.sockets['0'].getsockopt(zmq.RCVHWM) == 20
+
+        data_writer._write_message('1', {'i': 1})
+        data_writer.flush()
+        assert data_reader.read_message(timeout_s=1) == {'i': 1}
+        data_writer.close()
+        data_reader.close()
+        assert not data_writer.context.closed
+
+    def test_multiplexed_transfer(self):
+        # 2 writers on 'node 0' send to 2 readers on 'node 1', all 4 channels share one actor-to-actor connection
+        ray.init()
+        tmp = tempfile.gettempdir()
+        local_addrs = [f'ipc://{tmp}/volga_test_mux_{i}' for i in range(2)]
+        remote_ports = [4360, 4361]
+        actors = [
+            TransferActor.remote(name=f'test_actor_{i}', local_addr=local_addrs[i], remote_port=remote_ports[i])
+            for i in range(2)
+        ]
+        reader_addrs = [f'ipc://{tmp}/volga_test_reader_{i}' for i in range(2)]
+        channels = {}
+        for w in range(2):
+            for r in range(2):
+                channel_id = f'{w}-{r}'
+                channels[channel_id] = Channel(
+                    channel_id=channel_id,
+                    source_ip='127.0.0.1',
+                    source_port=0,
+                    transport_type=TransportType.MULTIPLEXED,
+                    multiplexer_addr=local_addrs[0],
+                    reader_addr=reader_addrs[r]
+                )
+        ray.get(actors[0].start.remote({channel_id: f'tcp://127.0.0.1:{remote_ports[1]}' for channel_id in channels}))
+        ray.get(actors[1].start.remote({channel_id: reader_addrs[int(channel_id[-1])] for channel_id in channels}))
+
+        writers = [
+            DataWriter(name=f'test_writer_{w}', source_stream_name='0', output_channels=[channels[f'{w}-{r}'] for r in range(2)])
+            for w in range(2)
+        ]
+        readers = [
+            DataReader(name=f'test_reader_{r}', input_channels=[channels[f'{w}-{r}'] for w in range(2)])
+            for r in range(2)
+        ]
+        num_items = 1000
+        for w in range(2):
+            for r in range(2):
+                for i in range(num_items):
+                    writers[w]._write_message(f'{w}-{r}', {'w': w, 'r': r, 'i': i})
+            writers[w].flush()
+
+        for r in range(2):
+            received = [readers[r].read_message(timeout_s=5) for _ in range(2 * num_items)]
+            for w in range(2):
+                # per channel order is preserved
+                assert [m for m in received if m['w'] == w] == [{'w': w, 'r': r, 'i': i} for i in range(num_items)]
+
+        stats = ray.get(actors[0].get_stats.remote())
+        assert set(stats.keys()) == set(channels.keys())
+        for w in writers:
+            w.close()
+        for r in readers:
+            r.close()
+        ray.get([a.close.remote() for a in actors])
+        ray.shutdown()
+
+    def test_multiplexed_slow_reader(self):
+        # channels to a slow and a fast reader share actors, the fast reader should not wait for the slow one
+        ray.init()
+        config = TransferConfig(batch_max_records=1, zmq_sndhwm=10, zmq_rcvhwm=10,
+                                zmq_sndbuf=4 * 1024, zmq_rcvbuf=4 * 1024)
+        tmp = tempfile.gettempdir()
+        local_addrs = [f'ipc://{tmp}/volga_test_mux_slow_{i}' for i in range(2)]
+        remote_ports = [4362, 4363]
+        actors = [
+            TransferActor.remote(name=f'test_actor_{i}', local_addr=local_addrs[i], remote_port=remote_ports[i], config=config)
+            for i in range(2)
+        ]
+        reader_addrs = [f'ipc://{tmp}/volga_test_slow_reader_{r}' for r in range(2)]
+        channels = [
+            Channel(
+                channel_id=f'ch_{r}',
+                source_ip='127.0.0.1',
+                source_port=0,
+                transport_type=TransportType.MULTIPLEXED,
+                multiplexer_addr=local_addrs[0],
+                reader_addr=reader_addrs[r]
+            )
+            for r in range(2)
+        ]
+        ray.get(actors[0].start.remote({c.channel_id: f'tcp://127.0.0.1:{remote_ports[1]}' for c in channels}))
+        ray.get(actors[1].start.remote({channels[r].channel_id: reader_addrs[r] for r in range(2)}))
+
+        writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=channels, config=config)
+        slow_reader = DataReader(name='test_slow_reader', input_channels=[channels[0]], config=config)
+        fast_reader = DataReader(name='test_fast_reader', input_channels=[channels[1]], config=config)
+        num_items = 500
+        payload = 'a' * 1000
+
+        def _write():
+            for i in range(num_items):
+                for c in channels:
+                    writer._write_message(c.channel_id, {'i': i, 'p': payload})
+            writer.flush()
+
+        wt = Thread(target=_write, daemon=True)
+        wt.start()
+        # slow reader does not read at all until fast reader got everything
+        for i in range(num_items):
+            msg = fast_reader.read_message(timeout_s=5)
+            assert msg is not None and msg['i'] == i
+        for i in range(num_items):
+            msg = slow_reader.read_message(timeout_s=5)
+            assert msg is not None and msg['i'] == i
+        wt.join(timeout=5)
+
+        writer.close()
+        slow_reader.close()
+        fast_reader.close()
+        ray.get([a.close.remote() for a in actors])
+        ray.shutdown()
+
 
 if __name__ == '__main__':
     t = TestTransfer()
-    t.test_one_to_one_transfer()
\ No newline at end of file
+    t.test_one_to_one_transfer()
+    t.test_batch_framing()
+    t.test_batching_throughput()
+    t.test_reader_poll()
+    t.test_close_flush()
+    t.test_compression()
+    t.test_columnar_batches()
+    t.test_watermarks()
+    t.test_shared_memory_ring()
+    t.test_shared_memory_transfer()
+    t.test_shared_context()
+    t.test_multiplexed_transfer()
+    t.test_multiplexed_slow_reader()
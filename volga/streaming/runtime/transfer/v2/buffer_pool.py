@@ -1,20 +1,63 @@
-from typing import List
+import time
+from threading import Condition
+from typing import Optional
 
 
-# TODO make thread safe
 class BufferPool:
+    # Thread-safe fixed-capacity byte budget, writer threads acquire memory for queued frames
+    # and block when the budget is exhausted, sender thread releases it once frames are sent
 
     def __init__(self, capacity_bytes: int):
+        if capacity_bytes <= 0:
+            raise ValueError(f'BufferPool capacity should be positive, {capacity_bytes} given')
         self.capacity_bytes = capacity_bytes
+        self._used_bytes = 0
+        self._cond = Condition()
 
-    def can_acquire(self, amount: int):
-        pass
+        # stats
+        self.num_blocked_acquires = 0
+        self.blocked_time_s = 0.0
 
-    def acquire(self, amount: int):
-        pass
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
 
-    def release(self, amount: int):
-        pass
+    @property
+    def available_bytes(self) -> int:
+        return max(0, self.capacity_bytes - self._used_bytes)
+
+    def _can_acquire(self, amount: int) -> bool:
+        # oversized amounts are allowed when the pool is empty so they do not get stuck forever
+        return self._used_bytes + amount <= self.capacity_bytes or self._used_bytes == 0
+
+    def can_acquire(self, amount: int) -> bool:
+        with self._cond:
+            return self._can_acquire(amount)
 
-def msg_to_buffers(s: str) -> List[bytearray]:
-    pass
+    def try_acquire(self, amount: int) -> bool:
+        with self._cond:
+            if not self._can_acquire(amount):
+                return False
+            self._used_bytes += amount
+            return True
+
+    def acquire(self, amount: int, timeout_s: Optional[float] = None) -> bool:
+        # blocks until amount can be acquired, returns False on timeout
+        with self._cond:
+            if self._can_acquire(amount):
+                self._used_bytes += amount
+                return True
+            self.num_blocked_acquires += 1
+            t = time.monotonic()
+            acquired = self._cond.wait_for(lambda: self._can_acquire(amount), timeout=timeout_s)
+            self.blocked_time_s += time.monotonic() - t
+            if acquired:
+                self._used_bytes += amount
+            return acquired
+
+    def release(self, amount: int):
+        with self._cond:
+            if amount > self._used_bytes:
+                raise RuntimeError(f'Releasing {amount} bytes while only {self._used_bytes} are used')
+            self._used_bytes -= amount
+            self._cond.notify_all()
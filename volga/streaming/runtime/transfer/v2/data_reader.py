@@ -0,0 +1,52 @@
+from typing import List, Optional, Dict
+
+from volga.streaming.runtime.config.transfer_config import TransferConfig
+from volga.streaming.runtime.transfer.channel import Channel, TransportType
+from volga.streaming.runtime.transfer.data_reader import DataReader as DataReaderV1
+from volga.streaming.runtime.transfer.v2.data_writer import CREDIT_MESSAGE
+from volga.streaming.runtime.transfer.zmq_context import create_socket
+
+import zmq
+
+
+class DataReader(DataReaderV1):
+    # Grants credits to writers for each consumed frame (all its messages were read by the task), so at most
+    # credits_per_channel frames are in flight or buffered by the reader per channel and a slow consumer
+    # throttles its upstream
+
+    # credits need a direct connection to the writer
+    supported_transports = [TransportType.ZMQ_PUSH_PULL, TransportType.RAY_SHARED_MEM]
+
+    def __init__(
+        self,
+        name: str,
+        input_channels: List[Channel],
+        config: Optional[TransferConfig] = None,
+        decode_records: bool = False
+    ):
+        super().__init__(
+            name=name,
+            input_channels=input_channels,
+            config=config,
+            decode_records=decode_records
+        )
+        # announce credits in batches to reduce number of control messages
+        self._credit_batch = max(1, self.config.credits_per_channel // 2)
+        self._consumed_frames: Dict[str, int] = {}
+        for channel_id in self.sockets:
+            socket = self.sockets[channel_id]
+            self._consumed_frames[channel_id] = 0
+            # initial credits
+            socket.send(CREDIT_MESSAGE.pack(self.config.credits_per_channel))
+
+    def _create_socket(self, channel: Channel) -> zmq.Socket:
+        socket = create_socket(self.context, zmq.DEALER, self.config)
+        socket.connect(f'tcp://{channel.source_ip}:{channel.source_port}')
+        return socket
+
+    def _on_frame(self, channel_id: str):
+        self._consumed_frames[channel_id] += 1
+        if self._consumed_frames[channel_id] >= self._credit_batch:
+            socket = self.sockets[channel_id]
+            socket.send(CREDIT_MESSAGE.pack(self._consumed_frames[channel_id]))
+            self._consumed_frames[channel_id] = 0
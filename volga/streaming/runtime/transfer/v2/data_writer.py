@@ -1,92 +1,190 @@
-from queue import Queue
+import logging
+import struct
+import time
+from collections import deque
+from dataclasses import dataclass
 from threading import Thread
+from typing import List, Dict, Optional, Deque
 
-import simplejson
-from typing import List, Dict
-
-from volga.streaming.api.message.message import Record
-from volga.streaming.runtime.transfer.channel import Channel, ChannelMessage
+from volga.streaming.runtime.config.transfer_config import TransferConfig
+from volga.streaming.runtime.transfer.channel import Channel, TransportType
+from volga.streaming.runtime.transfer.data_writer import DataWriter as DataWriterV1
+from volga.streaming.runtime.transfer.v2.buffer_pool import BufferPool
+from volga.streaming.runtime.transfer.zmq_context import create_socket
 
 import zmq
 
-from volga.streaming.runtime.transfer.v2.buffer_pool import BufferPool, msg_to_buffers
+logger = logging.getLogger("ray")
+
+# reader -> writer message granting permission to send that many more frames
+CREDIT_MESSAGE = struct.Struct('<I')
+
+SENDER_POLL_TIMEOUT_MS = 100
+ACQUIRE_TIMEOUT_S = 0.1
+CLOSE_DRAIN_TIMEOUT_S = 1
+
+
+@dataclass
+class ChannelBackpressure:
+    channel_id: str
+    credits: int
+    queued_frames: int
+    used_bytes: int
+    capacity_bytes: int
+    num_blocked_writes: int
+    blocked_time_s: float
 
+    # writer has data for the channel but the reader has not granted credits for it
+    @property
+    def backpressured(self) -> bool:
+        return self.credits == 0 and self.queued_frames > 0
 
-class DataWriter:
+
+class DataWriter(DataWriterV1):
+    # Frames are queued per channel within a fixed size buffer pool and are sent only when the reader
+    # has granted credits for them, so a slow reader blocks write_record instead of growing socket queues
+
+    # credits need a direct connection to the reader
+    supported_transports = [TransportType.ZMQ_PUSH_PULL, TransportType.RAY_SHARED_MEM]
 
     def __init__(
         self,
         name: str,
         source_stream_name: str,
         output_channels: List[Channel],
+        config: Optional[TransferConfig] = None
     ):
-        self.name = name
+        # DEALER sockets are bidirectional, readers announce credits back on the same connection
+        super().__init__(
+            name=name,
+            source_stream_name=source_stream_name,
+            output_channels=output_channels,
+            config=config
+        )
         self._buffer_pools: Dict[str, BufferPool] = {}
-        self._buffer_queues: Dict[str, Queue] = {}
-        self.running = False
-        self._flusher_thread = Thread(target=self._flusher_loop)
+        self._buffer_queues: Dict[str, Deque[bytes]] = {}
+        self._credits: Dict[str, int] = {}
+        self._closing = False
+        for channel in self.out_channels:
+            self._buffer_pools[channel.channel_id] = BufferPool(self.config.buffer_pool_capacity_bytes)
+            self._buffer_queues[channel.channel_id] = deque()
+            self._credits[channel.channel_id] = 0
 
-        self.source_stream_name = source_stream_name
-        self.out_channels = output_channels
+        # writer threads notify sender about new frames via inproc socket pair,
+        # so sender can block on a single poller for both frames and credits
+        wakeup_addr = f'inproc://writer-wakeup-{id(self)}'
+        self._wakeup_recv = self.context.socket(zmq.PAIR)
+        self._wakeup_recv.bind(wakeup_addr)
+        self._wakeup_send = self.context.socket(zmq.PAIR)
+        self._wakeup_send.connect(wakeup_addr)
 
-        self.sockets_and_contexts = {}
-        for channel in self.out_channels:
-            if channel.channel_id in self.sockets_and_contexts:
-                raise RuntimeError('duplicate channel ids')
-            context = zmq.Context()
-
-            # TODO set HWM
-            socket = context.socket(zmq.PUSH)
-            socket.setsockopt(zmq.LINGER, 0)
-            socket.bind(f'tcp://127.0.0.1:{channel.source_port}')
-            self.sockets_and_contexts[channel.channel_id] = (socket, context)
-
-    def start(self):
-        self.running = True
-        self._flusher_thread.start()
-
-    def write_record(self, channel_id: str, record: Record):
-        # add sender operator_id
-        record.set_stream_name(self.source_stream_name)
-        message = record.to_channel_message()
-        self._write_message(channel_id, message)
-
-    def _write_message(self, channel_id: str, message: ChannelMessage):
-        # TODO serialization perf
-        json_str = simplejson.dumps(message)
-        buffers = msg_to_buffers(json_str) # this should augment with length, msg_id header
-        length_bytes = sum(list(map(lambda b: len(b), buffers)))
+        self._sender_thread = Thread(target=self._sender_loop, daemon=True)
+        self._sender_thread.start()
+
+    def _create_socket(self, channel: Channel) -> zmq.Socket:
+        socket = create_socket(self.context, zmq.DEALER, self.config)
+        socket.bind(f'tcp://127.0.0.1:{channel.source_port}')
+        return socket
+
+    def _send_frame(self, channel_id: str, frame: bytes, timeout_ms: Optional[int]) -> bool:
+        # called under self._lock by writer or linger-flusher thread, this is where backpressure blocks the writer
         buffer_pool = self._buffer_pools[channel_id]
-        buffer_queue = self._buffer_queues[channel_id]
-        if buffer_pool.can_acquire(length_bytes):
-            buffer_pool.acquire(length_bytes)
-            for buffer in buffers:
-                # TODO we can merge pending buffers in case they are not full
-                buffer_queue.put(buffer)
-        else:
-            # TODO indicate buffer pool backpressure
+        if timeout_ms is None:
+            while not buffer_pool.acquire(len(frame), timeout_s=ACQUIRE_TIMEOUT_S):
+                if self._closing:
+                    return False
+        elif not buffer_pool.acquire(len(frame), timeout_s=timeout_ms / 1000):
+            return False
+        self._buffer_queues[channel_id].append(frame)
+        try:
+            self._wakeup_send.send(b'', flags=zmq.NOBLOCK)
+        except zmq.error.Again:
+            # sender has not consumed previous wakeups yet, so it will see this frame as well
             pass
+        return True
+
+    def _sender_loop(self):
+        poller = zmq.Poller()
+        poller.register(self._wakeup_recv, zmq.POLLIN)
+        socket_to_channel_id = {}
+        for channel_id in self.sockets:
+            socket = self.sockets[channel_id]
+            socket_to_channel_id[socket] = channel_id
+            poller.register(socket, zmq.POLLIN)
 
-    def _flusher_loop(self):
-        # we continuously flush all messages without delay
-        # downstream receiver (either local data reader or transfer actor) will handle all the scheduling
         while self.running:
-            for channel_id in self._buffer_queues:
-                _buffer_queue = self._buffer_queues[channel_id]
-                _buffer_pool = self._buffer_pools[channel_id]
-                socket = self.sockets_and_contexts[channel_id][0]
-                while not _buffer_queue.empty():
-                    buffer = _buffer_queue.get()
-                    socket.send(buffer) # TODO indicate socket/channel backpressure if this blocks
-                    _buffer_pool.release(len(buffer))
+            try:
+                events = dict(poller.poll(timeout=SENDER_POLL_TIMEOUT_MS))
+            except zmq.error.ContextTerminated:
+                break
+            for socket in events:
+                if socket is self._wakeup_recv:
+                    self._drain(socket)
+                else:
+                    channel_id = socket_to_channel_id[socket]
+                    for credit_msg in self._drain(socket):
+                        self._credits[channel_id] += CREDIT_MESSAGE.unpack(credit_msg)[0]
+            self._send_credited()
+
+    def _send_credited(self):
+        for channel_id in self._buffer_queues:
+            queue = self._buffer_queues[channel_id]
+            while self._credits[channel_id] > 0 and len(queue) != 0:
+                frame = queue.popleft()
+                self._transmit(channel_id, frame)
+                self._credits[channel_id] -= 1
+                self._buffer_pools[channel_id].release(len(frame))
+
+    @staticmethod
+    def _drain(socket: zmq.Socket) -> List[bytes]:
+        res = []
+        while True:
+            try:
+                res.append(socket.recv(zmq.NOBLOCK))
+            except zmq.error.Again:
+                return res
+
+    def get_backpressure(self) -> Dict[str, ChannelBackpressure]:
+        res = {}
+        for channel_id in self._buffer_queues:
+            pool = self._buffer_pools[channel_id]
+            res[channel_id] = ChannelBackpressure(
+                channel_id=channel_id,
+                credits=self._credits[channel_id],
+                queued_frames=len(self._buffer_queues[channel_id]),
+                used_bytes=pool.used_bytes,
+                capacity_bytes=pool.capacity_bytes,
+                num_blocked_writes=pool.num_blocked_acquires,
+                blocked_time_s=pool.blocked_time_s
+            )
+        return res
 
     def close(self):
-        self.running = False
-        self._flusher_thread.join(timeout=5)
-        # TODO wait for buffer queues to get empty?
-        # cleanup sockets and contexts for all channels
-        for channel_id in self.sockets_and_contexts:
-            socket = self.sockets_and_contexts[channel_id][0]
-            context = self.sockets_and_contexts[channel_id][1]
-            socket.close(linger=0)
-            context.destroy(linger=0)
+        # unblock writer thread in case it waits for buffer pool
+        self._closing = True
+
+        # downstream may be gone already, so the last flush is bounded
+        self.flush(timeout_ms=self.config.writer_close_timeout_ms)
+
+        # give sender some time to push out already credited frames
+        t = time.monotonic()
+        while time.monotonic() - t < CLOSE_DRAIN_TIMEOUT_S and \
+                any(len(self._buffer_queues[c]) != 0 and self._credits[c] > 0 for c in self._buffer_queues):
+            time.sleep(0.01)
+        with self._lock:
+            self.running = False
+        self._has_pending.set()
+        if self._flusher_thread is not None:
+            self._flusher_thread.join(timeout=5)
+        self._sender_thread.join(timeout=5)
+        dropped = {c: len(self._buffer_queues[c]) for c in self._buffer_queues if len(self._buffer_queues[c]) != 0}
+        if len(dropped) != 0:
+            logger.info(f'Writer {self.name} closed with unsent frames: {dropped}')
+        self._log_compression_stats()
+        if self._sender_thread.is_alive() or (self._flusher_thread is not None and self._flusher_thread.is_alive()):
+            # sockets are not thread safe
+            logger.warning(f'Writer {self.name} threads did not stop, sockets are not closed')
+            return
+        self._wakeup_send.close(linger=0)
+        self._wakeup_recv.close(linger=0)
+        self._close_sockets()
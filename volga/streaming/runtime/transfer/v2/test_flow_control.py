@@ -0,0 +1,121 @@
+import time
+import unittest
+from threading import Thread
+
+from volga.streaming.runtime.config.transfer_config import TransferConfig
+from volga.streaming.runtime.transfer.channel import Channel
+from volga.streaming.runtime.transfer.v2.buffer_pool import BufferPool
+from volga.streaming.runtime.transfer.v2.data_reader import DataReader
+from volga.streaming.runtime.transfer.v2.data_writer import DataWriter
+
+TERMINAL_MESSAGE = {'data': 'done'}
+
+
+class TestFlowControl(unittest.TestCase):
+
+    def test_buffer_pool(self):
+        pool = BufferPool(capacity_bytes=100)
+        assert pool.try_acquire(60)
+        assert not pool.can_acquire(60)
+        assert not pool.try_acquire(60)
+        assert not pool.acquire(60, timeout_s=0.01)
+
+        # blocked acquire is woken up by release from another thread
+        releaser = Thread(target=lambda: (time.sleep(0.1), pool.release(60)))
+        releaser.start()
+        assert pool.acquire(60, timeout_s=5)
+        releaser.join()
+        assert pool.used_bytes == 60
+        assert pool.num_blocked_acquires == 2
+        pool.release(60)
+
+        # oversized amounts are accepted only by an empty pool
+        assert pool.try_acquire(1000)
+        assert not pool.try_acquire(1)
+        pool.release(1000)
+        assert pool.available_bytes == 100
+
+        with self.assertRaises(RuntimeError):
+            pool.release(1)
+
+    def test_slow_reader_backpressure(self):
+        num_items = 2000
+        items = [{'data': f'{i}', 'payload': 'a' * 100} for i in range(num_items)]
+        config = TransferConfig(
+            credit_based_flow_control=True,
+            batch_max_records=10,
+            credits_per_channel=2,
+            buffer_pool_capacity_bytes=4 * 1024
+        )
+        channel = Channel(channel_id='1', source_ip='127.0.0.1', source_port=4331)
+        data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=[channel], config=config)
+        data_reader = DataReader(name='test_reader', input_channels=[channel], config=config)
+
+        def _write():
+            for item in items:
+                data_writer._write_message(channel.channel_id, item)
+            data_writer._write_message(channel.channel_id, TERMINAL_MESSAGE)
+            data_writer.flush()
+
+        writer_thread = Thread(target=_write)
+        writer_thread.start()
+
+        # reader has not consumed anything yet, writer should be throttled
+        time.sleep(0.5)
+        backpressure = data_writer.get_backpressure()[channel.channel_id]
+        assert backpressure.backpressured
+        assert backpressure.used_bytes <= backpressure.capacity_bytes
+        assert writer_thread.is_alive()
+
+        received = []
+        while True:
+            item = data_reader.read_message()
+            if item == TERMINAL_MESSAGE:
+                break
+            received.append(item)
+        writer_thread.join(timeout=5)
+        assert received == items
+        assert data_writer.get_backpressure()[channel.channel_id].num_blocked_writes > 0
+
+        data_writer.close()
+        data_reader.close()
+
+    def test_credits_on_consume(self):
+        # frames received by the reader but not read by the task yet hold their credits
+        num_items = 200
+        config = TransferConfig(
+            credit_based_flow_control=True,
+            batch_max_records=1,
+            credits_per_channel=4,
+            reader_max_frames_per_channel=8
+        )
+        channel = Channel(channel_id='1', source_ip='127.0.0.1', source_port=4332)
+        data_writer = DataWriter(name='test_writer', source_stream_name='0', output_channels=[channel], config=config)
+        data_reader = DataReader(name='test_reader', input_channels=[channel], config=config)
+
+        def _write():
+            for i in range(num_items):
+                data_writer._write_message(channel.channel_id, {'i': i})
+
+        writer_thread = Thread(target=_write)
+        writer_thread.start()
+        received = []
+        max_buffered = 0
+        while len(received) != num_items:
+            received.append(data_reader.read_message(timeout_s=5))
+            # each frame is a single message
+            max_buffered = max(max_buffered, data_reader.stats.num_frames - len(received) + 1)
+            time.sleep(0.001)
+        writer_thread.join(timeout=5)
+        assert received == [{'i': i} for i in range(num_items)]
+        assert max_buffered <= config.credits_per_channel
+
+        data_writer.close()
+        data_reader.close()
+
+
+if __name__ == '__main__':
+    t = TestFlowControl()
+    t.test_buffer_pool()
+    t.test_slow_reader_backpressure()
+    t.test_credits_on_consume()
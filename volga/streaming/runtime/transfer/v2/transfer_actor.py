@@ -1,8 +1,135 @@
+import logging
+from collections import deque
+from threading import Thread
+from typing import Deque, Dict, List, Optional
+
 import ray
+import zmq
+
+from volga.streaming.runtime.config.transfer_config import TransferConfig
+from volga.streaming.runtime.transfer.zmq_context import get_context, create_socket
+
+logger = logging.getLogger("ray")
+
+POLL_TIMEOUT_MS = 100
+MAX_MESSAGES_PER_POLL = 64
+CLOSE_TIMEOUT_S = 5
 
 
 @ray.remote
 class TransferActor:
+    # Per-node network multiplexer. Local writers hand frames of their cross-node channels to the actor
+    # over a single IPC connection, the actor forwards them to target nodes' actors over one TCP connection
+    # per node pair, which in turn deliver them to local readers over IPC.
+    # Messages are | channel_id | frame | multiparts on all legs, so channels can share connections.
+    # Sends never block: frames for a destination at HWM are queued per destination and flushed on POLLOUT,
+    # an input is paused only while the destination of its last frame has a full queue.
+
+    def __init__(self, name: str, local_addr: str, remote_port: int, config: Optional[TransferConfig] = None):
+        self.name = name
+        if config is None:
+            config = TransferConfig()
+        self.config = config
+        self._context = get_context(config.zmq_io_threads)
+
+        # frames from local writers
+        self._local_in = create_socket(self._context, zmq.PULL, config)
+        self._local_in.bind(local_addr)
+
+        # frames from other nodes' actors
+        self._remote_in = create_socket(self._context, zmq.PULL, config)
+        self._remote_in.bind(f'tcp://*:{remote_port}')
+
+        # channel_id -> address of the next hop, either remote actor or local reader
+        self._routes: Dict[bytes, str] = {}
+        self._out_sockets: Dict[str, zmq.Socket] = {}
+        # addr -> frames not yet accepted by the destination socket
+        self._pending: Dict[str, Deque[List]] = {}
+        # paused input socket -> addr it waits on
+        self._paused_inputs: Dict[zmq.Socket, str] = {}
+
+        self.running = False
+        self._thread: Optional[Thread] = None
+        self._num_forwarded: Dict[bytes, int] = {}
+
+    def start(self, routes: Dict[str, str]):
+        for channel_id in routes:
+            addr = routes[channel_id]
+            self._routes[channel_id.encode()] = addr
+            if addr not in self._out_sockets:
+                socket = create_socket(self._context, zmq.PUSH, self.config)
+                socket.connect(addr)
+                self._out_sockets[addr] = socket
+                self._pending[addr] = deque()
+        self.running = True
+        self._thread = Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        logger.info(f'TransferActor {self.name} started with {len(self._routes)} channels '
+                    f'and {len(self._out_sockets)} outgoing connections')
+
+    def _loop(self):
+        poller = zmq.Poller()
+        inputs = [self._local_in, self._remote_in]
+        out_addrs = {self._out_sockets[addr]: addr for addr in self._out_sockets}
+        while self.running:
+            try:
+                for socket in inputs:
+                    poller.register(socket, 0 if socket in self._paused_inputs else zmq.POLLIN)
+                for addr in self._out_sockets:
+                    poller.register(self._out_sockets[addr], zmq.POLLOUT if self._pending[addr] else 0)
+                events = poller.poll(timeout=POLL_TIMEOUT_MS)
+                for socket, event in events:
+                    if event & zmq.POLLOUT:
+                        self._flush(out_addrs[socket])
+                    if event & zmq.POLLIN:
+                        self._forward(socket)
+            except zmq.error.ContextTerminated:
+                break
+
+    def _forward(self, socket: zmq.Socket):
+        for _ in range(MAX_MESSAGES_PER_POLL):
+            try:
+                channel_id, frame = socket.recv_multipart(zmq.NOBLOCK, copy=False)
+            except zmq.error.Again:
+                return
+            channel_id = channel_id.bytes
+            addr = self._routes.get(channel_id)
+            if addr is None:
+                logger.info(f'TransferActor {self.name} dropped frame for unknown channel {channel_id.decode()}')
+                continue
+            pending = self._pending[addr]
+            pending.append([channel_id, frame])
+            if len(pending) == 1:
+                self._flush(addr)
+            if len(pending) >= self.config.multiplexer_max_pending_frames:
+                self._paused_inputs[socket] = addr
+                return
+
+    def _flush(self, addr: str):
+        pending = self._pending[addr]
+        socket = self._out_sockets[addr]
+        while len(pending) > 0:
+            channel_id, frame = pending[0]
+            try:
+                socket.send_multipart([channel_id, frame], flags=zmq.NOBLOCK, copy=False)
+            except zmq.error.Again:
+                break
+            pending.popleft()
+            self._num_forwarded[channel_id] = self._num_forwarded.get(channel_id, 0) + 1
+        if len(pending) < self.config.multiplexer_max_pending_frames:
+            for socket in [s for s in self._paused_inputs if self._paused_inputs[s] == addr]:
+                del self._paused_inputs[socket]
+
+    def get_stats(self) -> Dict[str, int]:
+        # number of forwarded frames per channel
+        return {channel_id.decode(): n for channel_id, n in self._num_forwarded.items()}
 
-    def __init__(self):
-        pass
\ No newline at end of file
+    def close(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=CLOSE_TIMEOUT_S)
+        num_dropped = sum(len(pending) for pending in self._pending.values())
+        logger.info(f'TransferActor {self.name} closed, forwarded frames: {self.get_stats()}, '
+                    f'dropped pending frames: {num_dropped}')
+        for socket in [self._local_in, self._remote_in, *self._out_sockets.values()]:
+            socket.close(linger=0)
@@ -0,0 +1,32 @@
+from threading import Lock
+from typing import Dict
+
+from volga.streaming.runtime.config.transfer_config import TransferConfig
+
+import zmq
+
+# Contexts are shared by all readers/writers of a process, so a task with many channels
+# does not spawn an I/O thread per channel. Sockets should be closed by their owners,
+# contexts live as long as the process.
+
+_contexts: Dict[int, zmq.Context] = {}
+_lock = Lock()
+
+
+def get_context(io_threads: int = 1) -> zmq.Context:
+    with _lock:
+        if io_threads not in _contexts or _contexts[io_threads].closed:
+            _contexts[io_threads] = zmq.Context(io_threads=io_threads)
+        return _contexts[io_threads]
+
+
+def create_socket(context: zmq.Context, socket_type: int, config: TransferConfig) -> zmq.Socket:
+    socket = context.socket(socket_type)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.setsockopt(zmq.SNDHWM, config.zmq_sndhwm)
+    socket.setsockopt(zmq.RCVHWM, config.zmq_rcvhwm)
+    if config.zmq_sndbuf > 0:
+        socket.setsockopt(zmq.SNDBUF, config.zmq_sndbuf)
+    if config.zmq_rcvbuf > 0:
+        socket.setsockopt(zmq.RCVBUF, config.zmq_rcvbuf)
+    return socket
@@ -6,6 +6,7 @@ from typing import Tuple
 import ray
 from ray.actor import ActorHandle
 
+from volga.streaming.api.operator.chained_operator import ChainedOperator
 from volga.streaming.api.operator.operator import SourceOperator
 from volga.streaming.runtime.core.execution_graph.execution_graph import ExecutionVertex
 from volga.streaming.runtime.core.processor.processor import Processor, SourceProcessor, OneInputProcessor
@@ -47,6 +48,8 @@ class JobWorker:
             # currently only check source
             if isinstance(self.task, SourceStreamTask):
                 source_op = self.task.processor.operator
+                if isinstance(source_op, ChainedOperator):
+                    source_op = source_op.head_operator
                 assert isinstance(source_op, SourceOperator)
                 source_finished = source_op.source_context.finished
 
@@ -85,14 +88,7 @@ class JobWorker:
                 execution_vertex=self.execution_vertex
             )
         else:
-            input_op_ids = set()
-            for input_edge in self.execution_vertex.input_edges:
-                input_op_ids.add(input_edge.source_execution_vertex.job_vertex.vertex_id)
-            input_op_ids = list(input_op_ids)
-            if len(input_op_ids) != 2:
-                raise RuntimeError(f'Two input vertex should have exactly 2 edges, {len(input_op_ids)} given')
-            left_stream_name = str(input_op_ids[0])
-            right_stream_name = str(input_op_ids[1])
+            left_stream_name, right_stream_name = self.execution_vertex.get_join_stream_names()
             task = TwoInputStreamTask(
                 processor=stream_processor,
                 execution_vertex=self.execution_vertex,
@@ -1,17 +1,22 @@
 import logging
+import time
 from abc import ABC, abstractmethod
 from threading import Thread
 
 from ray.actor import ActorHandle
 
 from volga.streaming.api.job_graph.job_graph import VertexType
-from volga.streaming.api.message.message import Record, record_from_channel_message
+from volga.streaming.api.message.message import Record, is_watermark_message, \
+    WATERMARK_KEY, CHANNEL_ID_KEY
 from volga.streaming.runtime.core.execution_graph.execution_graph import ExecutionVertex
 from volga.streaming.runtime.worker.task.streaming_runtime_context import StreamingRuntimeContext
+from volga.streaming.runtime.worker.task.watermark_aligner import WatermarkAligner
 from volga.streaming.runtime.core.collector.output_collector import OutputCollector
 from volga.streaming.runtime.core.processor.processor import Processor, TwoInputProcessor
 from volga.streaming.runtime.transfer.data_reader import DataReader
 from volga.streaming.runtime.transfer.data_writer import DataWriter
+from volga.streaming.runtime.transfer.v2.data_reader import DataReader as DataReaderV2
+from volga.streaming.runtime.transfer.v2.data_writer import DataWriter as DataWriterV2
 
 
 logger = logging.getLogger("ray")
@@ -41,6 +46,8 @@ class StreamTask(ABC):
         self.thread.start()
 
     def _prepare_task(self):
+        transfer_config = self.execution_vertex.worker_config.transfer_config
+
         # writer
         if len(self.execution_vertex.output_edges) != 0:
             output_channels = self.execution_vertex.get_output_channels()
@@ -50,10 +57,12 @@ class StreamTask(ABC):
                 raise RuntimeError('Writer already inited')
             if self.execution_vertex.job_vertex.vertex_type != VertexType.SINK:
                 # sinks do not pass data downstream so no writer
-                self.writer = DataWriter(
+                writer_cls = DataWriterV2 if transfer_config.credit_based_flow_control else DataWriter
+                self.writer = writer_cls(
                     name=self.execution_vertex.execution_vertex_id,
                     source_stream_name=str(self.execution_vertex.stream_operator.id),
-                    output_channels=output_channels
+                    output_channels=output_channels,
+                    config=transfer_config
                 )
 
         # reader
@@ -65,9 +74,12 @@ class StreamTask(ABC):
                 raise RuntimeError('Reader already inited')
             if self.execution_vertex.job_vertex.vertex_type != VertexType.SOURCE:
                 # sources do not read data from upstream so no reader
-                self.reader = DataReader(
+                reader_cls = DataReaderV2 if transfer_config.credit_based_flow_control else DataReader
+                self.reader = reader_cls(
                     name=self.execution_vertex.execution_vertex_id,
-                    input_channels=input_channels
+                    input_channels=input_channels,
+                    config=transfer_config,
+                    decode_records=True
                 )
 
         self._open_processor()
@@ -105,16 +117,26 @@ class StreamTask(ABC):
     def close(self):
         # logger.info(f'Closing task {self.execution_vertex.execution_vertex_id}...')
         self.running = False
-        self.processor.close()
-        if self.writer is not None:
-            self.writer.close()
-            # logger.info(f'Closed writer for task {self.execution_vertex.execution_vertex_id}')
-
         if self.reader is not None:
-            self.reader.close()
-            # logger.info(f'Closed reader for task {self.execution_vertex.execution_vertex_id}')
-        if self.thread is not None:
+            # task thread returns from reading within reader_poll_timeout_ms
+            self.reader.stop()
+        if self.thread.is_alive():
             self.thread.join(timeout=5)
+        if self.thread.is_alive():
+            # operators (e.g. combiners), state backend and zmq sockets are not thread safe,
+            # so they are closed only once task thread stopped using them
+            logger.warning(f'Task {self.execution_vertex.execution_vertex_id} thread did not stop, operators, state, reader and writer are not closed')
+        else:
+            # may emit records (e.g. combiner partials), so writer is closed after it
+            self.processor.close()
+            if self.writer is not None:
+                self.writer.close()
+                # logger.info(f'Closed writer for task {self.execution_vertex.execution_vertex_id}')
+            if self.reader is not None:
+                self.reader.close()
+                # logger.info(f'Closed reader for task {self.execution_vertex.execution_vertex_id}')
+            if self.processor.runtime_context is not None:
+                self.processor.runtime_context.state_backend.close()
         logger.info(f'Closed task {self.execution_vertex.execution_vertex_id}')
 
 
@@ -122,20 +144,55 @@ class SourceStreamTask(StreamTask):
 
     def run(self):
         while self.running:
+            # operators chained to source may have processing time timers
+            next_timer_ts = self.processor.next_processing_time()
+            if next_timer_ts is not None and next_timer_ts <= time.time():
+                self.processor.process_processing_time(time.time())
             record = Record(value=None) # empty message, this will trigger sourceFunction.fetch()
             self.processor.process(record)
 
 
 class InputStreamTask(StreamTask):
 
+    def __init__(
+        self,
+        processor: Processor,
+        execution_vertex: ExecutionVertex
+    ):
+        super().__init__(processor=processor, execution_vertex=execution_vertex)
+        self.watermark_aligner = WatermarkAligner(
+            [ch.channel_id for ch in execution_vertex.get_input_channels()]
+        )
+
     def run(self):
         while self.running:
-            message = self.reader.read_message()
-            if message is None:
-                # TODO indicate special message
-                continue
-            record = record_from_channel_message(message)
-            self.processor.process(record)
+            # wake up for the next processing time timer even if there is no input
+            timeout_s = None
+            next_timer_ts = self.processor.next_processing_time()
+            if next_timer_ts is not None:
+                timeout_s = max(0.0, next_timer_ts - time.time())
+                if timeout_s == 0:
+                    self.processor.process_processing_time(time.time())
+                    continue
+            # all received messages are processed as a batch, split at watermarks so that
+            # records are processed before watermarks which followed them
+            messages = self.reader.read_messages(timeout_s)
+            records = []
+            for message in messages:
+                if isinstance(message, Record):
+                    records.append(message)
+                    continue
+                if is_watermark_message(message):
+                    watermark = self.watermark_aligner.on_watermark(message[CHANNEL_ID_KEY], message[WATERMARK_KEY])
+                    if watermark is not None:
+                        if len(records) != 0:
+                            self.processor.process_batch(records)
+                            records = []
+                        self.processor.process_watermark(watermark)
+                    continue
+                raise RuntimeError(f'Unexpected message {message}')
+            if len(records) != 0:
+                self.processor.process_batch(records)
 
 
 class OneInputStreamTask(InputStreamTask):
@@ -1,6 +1,7 @@
 from ray.actor import ActorHandle
 
 from volga.streaming.api.context.runtime_context import RuntimeContext
+from volga.streaming.api.state.keyed_state import create_state_backend
 from volga.streaming.runtime.core.execution_graph.execution_graph import ExecutionVertex
 
 
@@ -10,11 +11,17 @@ class StreamingRuntimeContext(RuntimeContext):
         self,
         execution_vertex: ExecutionVertex
     ):
+        state_config = execution_vertex.worker_config.state_config
         super().__init__(
             task_id=execution_vertex.execution_vertex_id,
             task_index=execution_vertex.execution_vertex_index,
             parallelism=execution_vertex.parallelism,
             operator_id=execution_vertex.job_vertex.vertex_id,
             operator_name=execution_vertex.job_vertex.get_name(),
-            job_config=execution_vertex.job_config
+            job_config=execution_vertex.job_config,
+            state_backend=create_state_backend(
+                backend_type=state_config.backend,
+                cache_capacity=state_config.cache_capacity,
+                state_dir=state_config.state_dir
+            )
         )
\ No newline at end of file
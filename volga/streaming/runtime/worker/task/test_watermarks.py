@@ -0,0 +1,64 @@
+import unittest
+from decimal import Decimal
+
+from volga.common.time_utils import NANOS_PER_SECOND
+from volga.streaming.api.collector.collector import Collector
+from volga.streaming.api.message.message import Record, Watermark, MAX_WATERMARK
+from volga.streaming.api.operator.operator import SourceOperator
+from volga.streaming.api.operator.timestamp_assigner import EventTimeAssigner
+from volga.streaming.api.operator.watermark_generator import BoundedOutOfOrdernessWatermarkGenerator
+from volga.streaming.runtime.worker.task.watermark_aligner import WatermarkAligner
+
+
+class ListCollector(Collector):
+
+    def __init__(self):
+        self.records = []
+        self.watermarks = []
+
+    def collect(self, record: Record):
+        self.records.append(record)
+
+    def emit_watermark(self, watermark: Watermark):
+        self.watermarks.append(watermark)
+
+
+class TestWatermarks(unittest.TestCase):
+
+    def test_source_watermarks(self):
+        collector = ListCollector()
+        context = SourceOperator.SourceContextImpl(
+            [collector],
+            runtime_context=None,
+            timestamp_assigner=EventTimeAssigner(lambda r: Decimal(r.value)),
+            num_records=5,
+            watermark_generator=BoundedOutOfOrdernessWatermarkGenerator(Decimal(2), interval_s=0)
+        )
+        for t in [10, 12, 11, 15, 14]:
+            context.collect(t)
+
+        # watermark trails max event time and never goes back, finished source flushes event time.
+        # Assigned seconds are converted to nanoseconds
+        assert collector.watermarks == [Watermark(t * NANOS_PER_SECOND) for t in [8, 10, 13]] + [MAX_WATERMARK]
+        assert context.finished
+
+    def test_alignment(self):
+        aligner = WatermarkAligner(['a', 'b'])
+        # waits for all inputs
+        assert aligner.on_watermark('a', 5) is None
+        assert aligner.on_watermark('b', 3) == Watermark(3)
+        # min input did not advance
+        assert aligner.on_watermark('a', 7) is None
+        assert aligner.on_watermark('b', 10) == Watermark(7)
+        # stale watermark is ignored
+        assert aligner.on_watermark('b', 9) is None
+        assert aligner.on_watermark('a', MAX_WATERMARK.event_time) == Watermark(10)
+        assert aligner.current_watermark == 10
+        with self.assertRaises(RuntimeError):
+            aligner.on_watermark('c', 1)
+
+
+if __name__ == '__main__':
+    t = TestWatermarks()
+    t.test_source_watermarks()
+    t.test_alignment()
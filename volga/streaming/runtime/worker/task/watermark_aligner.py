@@ -0,0 +1,30 @@
+from typing import Dict, List, Optional
+
+from volga.streaming.api.message.message import Watermark
+
+
+class WatermarkAligner:
+    # Task event time is the min of watermarks of all input channels: an input which is behind
+    # may still deliver records up to its own watermark. Task watermark advances only after
+    # every channel has reported one, and never goes back
+
+    def __init__(self, input_channel_ids: List[str]):
+        self.input_channel_ids = set(input_channel_ids)
+        self._channel_watermarks: Dict[str, int] = {}
+        self.current_watermark: Optional[int] = None
+
+    def on_watermark(self, channel_id: str, event_time: int) -> Optional[Watermark]:
+        # returns new task watermark if it advanced
+        if channel_id not in self.input_channel_ids:
+            raise RuntimeError(f'Watermark from unknown channel {channel_id}')
+        prev = self._channel_watermarks.get(channel_id)
+        if prev is not None and event_time <= prev:
+            return None
+        self._channel_watermarks[channel_id] = event_time
+        if len(self._channel_watermarks) != len(self.input_channel_ids):
+            return None
+        watermark = min(self._channel_watermarks.values())
+        if self.current_watermark is not None and watermark <= self.current_watermark:
+            return None
+        self.current_watermark = watermark
+        return Watermark(watermark)